@@ -0,0 +1,644 @@
+"""Autopilot for Snake Evolution: steers toward the nearest reachable fruit using
+distance maps that are repaired incrementally as the board changes."""
+import heapq
+from array import array
+from collections import deque
+
+from snake_core import DIRECTIONS, INPUT_QUEUE_SIZE
+
+UNREACHABLE = 1 << 30  # Distance of cells with no path to a target
+
+# Removing a target rebuilds the whole map instead of repairing the cells that
+# led to it once they are more than this fraction of the board
+REPAIR_LIMIT = 0.25
+
+# Most cells a snake can move in one tick; bounds the body diff between ticks
+MAX_MOVES_PER_TICK = 8
+
+
+class DistanceMap:
+    # Distance from every cell to its nearest target over a directed grid graph
+    # (portals make edges one-way), maintained like Lifelong Planning A* without a
+    # heuristic: blocking, unblocking or adding a target only marks the cells
+    # around it inconsistent, and queries repair just the inconsistent cells that
+    # are closer to a target than the cells asked about. Removing a target
+    # repairs the region of cells whose shortest path led to it right away.
+    def __init__(self, successors):
+        self.successors = successors
+        self.predecessors = [[] for _ in successors]
+        for cell, nexts in enumerate(successors):
+            for next_cell in nexts:
+                self.predecessors[next_cell].append(cell)
+        size = len(successors)
+        self.blocked = bytearray(size)
+        self.targets = bytearray(size)
+        self.distance = [UNREACHABLE] * size  # Settled distances
+        self.lookahead = [UNREACHABLE] * size  # One-step lookahead from successors
+        self.via = [-1] * size  # Successor the lookahead comes through
+        self.queued = [-1] * size  # Key each inconsistent cell is queued under
+        self.heap = []
+        self.raised = bytearray(size)  # Region being repaired by raise_removed
+
+    def rebuild(self):
+        # Breadth-first search backwards from every unblocked target
+        blocked = self.blocked
+        distance = self.distance = [UNREACHABLE] * len(self.successors)
+        via = self.via = [-1] * len(distance)
+        queue = deque(cell for cell, target in enumerate(self.targets) if target and not blocked[cell])
+        for cell in queue:
+            distance[cell] = 0
+        predecessors = self.predecessors
+        while queue:
+            cell = queue.popleft()
+            next_distance = distance[cell] + 1
+            for previous in predecessors[cell]:
+                if distance[previous] == UNREACHABLE and not blocked[previous]:
+                    distance[previous] = next_distance
+                    via[previous] = cell
+                    queue.append(previous)
+        self.lookahead = list(distance)
+        self.queued = [-1] * len(distance)
+        self.heap = []
+
+    def update(self, blocked=(), unblocked=(), added=(), removed=()):
+        # Record a batch of cell changes; repairs happen on the next query, except
+        # around removed targets
+        for cell in blocked:
+            self.blocked[cell] = 1
+        for cell in unblocked:
+            self.blocked[cell] = 0
+        for cell in added:
+            self.targets[cell] = 1
+        for cell in removed:
+            self.targets[cell] = 0
+        if removed:
+            self.raise_removed(removed)
+        for cell in (*blocked, *unblocked, *added):
+            self.update_cell(cell)
+            for previous in self.predecessors[cell]:
+                self.update_cell(previous)
+
+    def raise_removed(self, removed):
+        # Every cell whose shortest path led to a removed target, following the
+        # lookahead links backwards, restarts from what its neighbours outside
+        # that region (or a target inside it) give. One breadth-first pass over
+        # the region, merged with those starting distances in order, then lowers
+        # them to their new distances. Cells still waiting to be raised are
+        # roots of the region too, or cells behind them would restart from
+        # distances that are already too short.
+        distance = self.distance
+        lookahead = self.lookahead
+        via = self.via
+        queued = self.queued
+        predecessors = self.predecessors
+        blocked = self.blocked
+        targets = self.targets
+        raised = self.raised
+        region = []
+        for cell in (*removed, *(cell for key, cell in self.heap
+                                 if queued[cell] == key and distance[cell] < lookahead[cell])):
+            if not raised[cell]:
+                raised[cell] = 1
+                region.append(cell)
+        limit = len(distance) * REPAIR_LIMIT
+        for cell in region:  # Grows while it is walked
+            for previous in predecessors[cell]:
+                if via[previous] == cell and not raised[previous]:
+                    raised[previous] = 1
+                    region.append(previous)
+            if len(region) > limit:
+                # Too much of the board led there: one breadth-first pass is cheaper
+                for cell in region:
+                    raised[cell] = 0
+                self.rebuild()
+                return
+
+        successors = self.successors
+        starts = []
+        for cell in region:
+            start = UNREACHABLE
+            via[cell] = -1
+            if blocked[cell]:
+                pass
+            elif targets[cell]:
+                start = 0
+            else:
+                for next_cell in successors[cell]:
+                    if distance[next_cell] < start and not raised[next_cell] and not blocked[next_cell]:
+                        start = distance[next_cell]
+                        via[cell] = next_cell
+                if start != UNREACHABLE:
+                    start += 1
+            distance[cell] = start
+            if start != UNREACHABLE:
+                starts.append((start, cell))
+        starts.sort(reverse=True)
+        queue = deque()
+        while starts or queue:
+            if queue and (not starts or distance[queue[0]] <= starts[-1][0]):
+                cell = queue.popleft()
+            else:
+                start, cell = starts.pop()
+                if distance[cell] != start:
+                    continue  # Reached sooner from inside the region
+            next_distance = distance[cell] + 1
+            for previous in predecessors[cell]:
+                if raised[previous] and next_distance < distance[previous] and not blocked[previous]:
+                    distance[previous] = next_distance
+                    via[previous] = cell
+                    queue.append(previous)
+
+        # The region is consistent now; cells just outside it may not be
+        for cell in region:
+            lookahead[cell] = distance[cell]
+            queued[cell] = -1
+        for cell in region:
+            for previous in predecessors[cell]:
+                if not raised[previous]:
+                    self.update_cell(previous)
+        for cell in region:
+            raised[cell] = 0
+
+    def update_cell(self, cell):
+        # Recompute a cell's lookahead and queue it if it disagrees with its distance
+        best = -1
+        if self.blocked[cell]:
+            lookahead = UNREACHABLE
+        elif self.targets[cell]:
+            lookahead = 0
+        else:
+            distance = self.distance
+            blocked = self.blocked
+            lookahead = UNREACHABLE
+            for next_cell in self.successors[cell]:
+                if distance[next_cell] < lookahead and not blocked[next_cell]:
+                    lookahead = distance[next_cell]
+                    best = next_cell
+            if lookahead != UNREACHABLE:
+                lookahead += 1
+        self.lookahead[cell] = lookahead
+        self.via[cell] = best
+        current = self.distance[cell]
+        if lookahead != current:
+            key = min(current, lookahead)
+            if self.queued[cell] != key:
+                self.queued[cell] = key
+                heapq.heappush(self.heap, (key, cell))
+        else:
+            self.queued[cell] = -1
+
+    def query(self, cells):
+        # Settle inconsistent cells nearest first until the closest of the given
+        # cells is known exactly. Returns the distance of every settled cell and
+        # UNREACHABLE for the rest, which are no closer than the closest one.
+        distance = self.distance
+        lookahead = self.lookahead
+        via = self.via
+        queued = self.queued
+        heap = self.heap
+        predecessors = self.predecessors
+        blocked = self.blocked
+        while heap:
+            key, cell = heap[0]
+            if queued[cell] != key:
+                heapq.heappop(heap)  # Stale entry
+                continue
+            if any(distance[query] == lookahead[query] and distance[query] <= key for query in cells):
+                break
+            heapq.heappop(heap)
+            queued[cell] = -1
+            if distance[cell] > lookahead[cell]:
+                # Lowered: predecessors can only get closer, so only those it
+                # brings closer change, without rescanning their successors
+                distance[cell] = current = lookahead[cell]
+                next_distance = current + 1
+                for previous in predecessors[cell]:
+                    if next_distance < lookahead[previous] and not blocked[previous]:
+                        lookahead[previous] = next_distance
+                        via[previous] = cell
+                        current = distance[previous]
+                        if current == next_distance:
+                            queued[previous] = -1
+                        elif queued[previous] != (key := min(current, next_distance)):
+                            queued[previous] = key
+                            heapq.heappush(heap, (key, previous))
+            else:
+                distance[cell] = UNREACHABLE
+                self.update_cell(cell)
+                for previous in predecessors[cell]:
+                    self.update_cell(previous)
+        settled = heap[0][0] if heap else UNREACHABLE
+        return [distance[query] if distance[query] == lookahead[query] and distance[query] <= settled
+                else UNREACHABLE for query in cells]
+
+
+class Autopilot:
+    # Steers a game's snake toward the nearest reachable fruit, respecting maze
+    # walls, one-way portals, wrap around and the snake's own body. The move graph
+    # is rebuilt when the board size, walls, portals or settings change, the
+    # distance map when a new game starts, and the map is repaired in place as
+    # the snake moves and food is eaten or spawned.
+    def __init__(self, game):
+        self.game = game
+        self.snake = None
+        self.grid_count = None
+        self.walls = None
+        self.portals = None
+        self.settings = None
+        self.map = None
+        self.moves = []  # Per cell, the cell reached in each direction or -1
+        self.body = deque()  # Body cells as of the last sync, head first
+        self.body_count = []  # Body segments per cell as of the last sync
+        self.food = set()
+
+    def sync(self):
+        # Bring the distance map up to date with the game
+        game = self.game
+        enabled = game.config.settings
+        portals = tuple((portal.start_pos, portal.end_pos) for portal in game.portals
+                        if enabled['portal_mode'])
+        settings = (enabled['wrap_around'], enabled['ghost_mode'])
+        if self.walls is not game.maze_walls and self.walls == game.maze_walls:
+            self.walls = game.maze_walls  # The same walls in a new set, as after a reset
+        if (self.grid_count != game.free_cells.grid_count or self.walls is not game.maze_walls
+                or self.portals != portals or self.settings != settings):
+            self.rebuild(portals, settings)
+            return
+        if self.snake is not game.snake:
+            self.restart()  # A new game on the same board
+            return
+
+        self.sync_body()
+        grid_count = game.free_cells.grid_count
+        food = {x * grid_count + y for (x, y), _ in game.food.positions}
+        if food != self.food:
+            self.map.update(added=food - self.food, removed=self.food - food)
+            self.food = food
+
+    def sync_body(self):
+        # Diff the snake body against the last sync and block or unblock the cells
+        # it entered or left
+        if self.settings[1]:
+            return  # Ghost snakes pass through themselves
+        positions = self.game.snake.positions
+        body = self.body
+        old_head = body[0]
+        for moved in range(min(len(positions), MAX_MOVES_PER_TICK)):
+            if positions[moved] == old_head:
+                break
+        else:
+            moved = None
+        if moved is None or len(body) + moved < len(positions):
+            # Lost track of the body (a very short snake, or a restored game)
+            left = list(body)
+            entered = list(positions)
+            self.body = deque(positions)
+        else:
+            left = [body.pop() for _ in range(len(body) + moved - len(positions))]
+            entered = [positions[i] for i in range(moved)]
+            body.extendleft(reversed(entered))
+
+        grid_count = self.game.free_cells.grid_count
+        body_count = self.body_count
+        touched = set()
+        for x, y in left:
+            cell = x * grid_count + y
+            body_count[cell] -= 1
+            touched.add(cell)
+        for x, y in entered:
+            cell = x * grid_count + y
+            body_count[cell] += 1
+            touched.add(cell)
+
+        blocked = []
+        unblocked = []
+        was_blocked = self.map.blocked
+        for cell in touched:
+            if body_count[cell] and not was_blocked[cell]:
+                blocked.append(cell)
+            elif not body_count[cell] and was_blocked[cell]:
+                unblocked.append(cell)
+        if blocked or unblocked:
+            self.map.update(blocked=blocked, unblocked=unblocked)
+
+    def rebuild(self, portals, settings):
+        # Rebuild the move graph and distance map from scratch
+        game = self.game
+        grid_count = game.free_cells.grid_count
+        wrap_around = settings[0]
+        exits = {start[0] * grid_count + start[1]: end[0] * grid_count + end[1] for start, end in portals}
+        walls = {x * grid_count + y for x, y in game.maze_walls}
+
+        moves = []
+        for x in range(grid_count):
+            for y in range(grid_count):
+                cell_moves = []
+                for dx, dy in DIRECTIONS:
+                    nx, ny = x + dx, y + dy
+                    if wrap_around:
+                        nx %= grid_count
+                        ny %= grid_count
+                    elif not (0 <= nx < grid_count and 0 <= ny < grid_count):
+                        cell_moves.append(-1)
+                        continue
+                    cell = exits.get(nx * grid_count + ny, nx * grid_count + ny)
+                    cell_moves.append(-1 if cell in walls else cell)
+                moves.append(cell_moves)
+        self.moves = moves
+        self.map = DistanceMap([[cell for cell in cell_moves if cell >= 0] for cell_moves in moves])
+        self.grid_count = grid_count
+        self.walls = game.maze_walls
+        self.portals = portals
+        self.settings = settings
+        self.restart()
+
+    def restart(self):
+        # Fill the distance map in from the current snake and food
+        game = self.game
+        grid_count = self.grid_count
+        blocked = self.map.blocked
+        targets = self.map.targets
+        blocked[:] = targets[:] = bytes(len(blocked))
+        self.snake = game.snake
+        self.body = deque(game.snake.positions)
+        self.body_count = [0] * (grid_count * grid_count)
+        if not self.settings[1]:
+            for x, y in self.body:
+                cell = x * grid_count + y
+                self.body_count[cell] += 1
+                blocked[cell] = 1
+        self.food = {x * grid_count + y for (x, y), _ in game.food.positions}
+        for cell in self.food:
+            targets[cell] = 1
+        self.map.rebuild()
+
+    def plan(self):
+        # Directions for the snake's next few moves: downhill on the distance map,
+        # straight ahead on ties, and toward the most open cell when no fruit is
+        # reachable
+        snake = self.game.snake
+        grid_count = self.game.free_cells.grid_count
+        blocked = self.map.blocked
+
+        x, y = snake.positions[0]
+        cell = x * grid_count + y
+        direction = snake.direction
+        entered = set()
+        plan = []
+        for _ in range(INPUT_QUEUE_SIZE):
+            reverse = (-direction[0], -direction[1])
+            candidates = [direction] + [turn for turn in DIRECTIONS if turn != direction and turn != reverse]
+            options = []
+            for turn in candidates:
+                next_cell = self.moves[cell][DIRECTIONS.index(turn)]
+                if next_cell < 0 or next_cell in entered:
+                    continue
+                if blocked[next_cell]:
+                    continue  # Includes the tail: it only moves after the head
+                options.append((turn, next_cell))
+            best = None
+            best_score = None
+            distances = self.map.query([next_cell for _, next_cell in options])
+            for (turn, next_cell), distance in zip(options, distances):
+                if distance != UNREACHABLE:
+                    score = (0, distance)
+                else:
+                    # No fruit this way: prefer room to keep moving
+                    room = sum(1 for after in self.moves[next_cell]
+                               if after >= 0 and not blocked[after] and after not in entered)
+                    score = (1, -room)
+                if best_score is None or score < best_score:
+                    best, best_score = turn, score
+            if best is None:
+                break  # Boxed in
+            plan.append(best)
+            direction = best
+            cell = self.moves[cell][DIRECTIONS.index(best)]
+            entered.add(cell)
+        return plan
+
+    def steer(self):
+        # Replace the snake's queued moves with the autopilot's plan
+        self.sync()
+        self.game.plan_moves(self.plan())
+
+
+# Fraction of the cycle the snake may cover and still take shortcuts
+SHORTCUT_LIMIT = 0.5
+# Free cells kept between the head and the tail when shortcutting
+SHORTCUT_MARGIN = 4
+
+
+def hamiltonian_cycle(grid_count, walls):
+    # Cycle through every cell not in `walls`, as a list of (x, y). Built by tracing
+    # around a spanning tree of 2x2 blocks, so it exists only when the board side
+    # is even and the walls cover whole blocks that leave the rest connected.
+    # Returns None otherwise.
+    if grid_count % 2:
+        return None
+    blocks = grid_count // 2
+    usable = set()
+    for bx in range(blocks):
+        for by in range(blocks):
+            cells = [(2 * bx + dx, 2 * by + dy) for dx in (0, 1) for dy in (0, 1)]
+            walled = sum(cell in walls for cell in cells)
+            if walled == 0:
+                usable.add((bx, by))
+            elif walled < 4:
+                return None  # Free cells the cycle can't reach
+    if not usable:
+        return None
+
+    # Breadth-first spanning tree over usable blocks
+    root = min(usable)
+    tree = []
+    seen = {root}
+    queue = deque([root])
+    while queue:
+        bx, by = queue.popleft()
+        for neighbor in ((bx + 1, by), (bx, by + 1), (bx - 1, by), (bx, by - 1)):
+            if neighbor in usable and neighbor not in seen:
+                seen.add(neighbor)
+                tree.append(((bx, by), neighbor))
+                queue.append(neighbor)
+    if len(seen) != len(usable):
+        return None
+
+    # Go clockwise around every block, detouring into each child block
+    following = {}
+    for bx, by in usable:
+        x, y = 2 * bx, 2 * by
+        following[(x, y)] = (x + 1, y)
+        following[(x + 1, y)] = (x + 1, y + 1)
+        following[(x + 1, y + 1)] = (x, y + 1)
+        following[(x, y + 1)] = (x, y)
+    for first, second in tree:
+        (ax, ay), (bx, by) = sorted((first, second))
+        x, y = 2 * ax, 2 * ay
+        if bx > ax:
+            # Joined left to right
+            following[(x + 1, y)] = (x + 2, y)
+            following[(x + 2, y + 1)] = (x + 1, y + 1)
+        else:
+            # Joined top to bottom
+            following[(x + 1, y + 1)] = (x + 1, y + 2)
+            following[(x, y + 2)] = (x, y + 1)
+
+    cycle = [(root[0] * 2, root[1] * 2)]
+    for _ in range(len(following) - 1):
+        cycle.append(following[cycle[-1]])
+    return cycle
+
+
+class HamiltonianSolver:
+    # Follows a Hamiltonian cycle so the snake can fill the whole board, taking
+    # shortcuts toward food while it is short. Shortcuts only jump ahead in cycle
+    # order between the head and the tail, so the body always stays in cycle order
+    # and the tail is never cut off. Falls back to the autopilot when the board has
+    # no cycle, portals are on, or the snake is out of cycle order.
+    def __init__(self, game):
+        self.game = game
+        self.autopilot = Autopilot(game)
+        self.walls = None
+        self.cycle = None
+        self.order = {}  # Position of each cell in the cycle
+
+    def sync(self):
+        if self.walls is not self.game.maze_walls:
+            self.walls = self.game.maze_walls
+            grid_count = self.game.free_cells.grid_count
+            self.cycle = hamiltonian_cycle(grid_count, self.walls)
+            self.order = {cell: i for i, cell in enumerate(self.cycle or ())}
+
+    def plan(self):
+        # Directions for the snake's next few moves, or None when the cycle can't be used
+        game = self.game
+        snake = game.snake
+        cycle = self.cycle
+        order = self.order
+        if cycle is None or (game.portals and game.config.settings['portal_mode']):
+            return None
+        size = len(cycle)
+        tail_order = order.get(snake.positions[-1])
+        head = snake.positions[0]
+        if tail_order is None or head not in order:
+            return None
+
+        def ahead(cell):
+            # Cells from the tail to `cell` going forward around the cycle
+            return (order[cell] - tail_order) % size
+
+        # Head for the first fruit ahead of the head in cycle order
+        head_ahead = ahead(head)
+        target = size - 1
+        for position, _ in game.food.positions:
+            if position in order and head_ahead < ahead(position) < target:
+                target = ahead(position)
+        pending = snake.length - len(snake.positions) + snake.growth_pending
+        shortcuts = snake.length + snake.growth_pending < size * SHORTCUT_LIMIT
+        furthest = size - 1 - pending - SHORTCUT_MARGIN
+
+        grid_count = game.free_cells.grid_count
+        wrap_around = game.config.settings['wrap_around']
+        direction = snake.direction
+        entered = set()
+        plan = []
+        for _ in range(INPUT_QUEUE_SIZE):
+            successor = cycle[(order[head] + 1) % size]
+            best = None
+            best_ahead = -1
+            for turn in DIRECTIONS:
+                if turn == (-direction[0], -direction[1]):
+                    continue
+                x, y = head[0] + turn[0], head[1] + turn[1]
+                if wrap_around:
+                    x %= grid_count
+                    y %= grid_count
+                cell = (x, y)
+                if cell not in order or cell in entered:
+                    continue
+                if cell == successor:
+                    # Always free while the body is in cycle order, until the
+                    # snake fills the board
+                    if snake.occupies(cell):
+                        continue
+                    cell_ahead = ahead(cell)
+                elif not shortcuts or snake.occupies(cell):
+                    continue
+                else:
+                    cell_ahead = ahead(cell)
+                    if not head_ahead < cell_ahead <= min(target, furthest):
+                        continue
+                if cell_ahead > best_ahead or (cell == successor and cell_ahead == best_ahead):
+                    best, best_ahead = turn, cell_ahead
+            if best is None:
+                return plan or None
+            plan.append(best)
+            direction = best
+            head = ((head[0] + best[0]) % grid_count, (head[1] + best[1]) % grid_count)
+            head_ahead = ahead(head)
+            entered.add(head)
+        return plan
+
+    def steer(self):
+        self.sync()
+        plan = self.plan()
+        if plan is None:
+            self.autopilot.steer()
+            return
+        self.game.plan_moves(plan)
+
+
+# Default transposition table size in entries (a power of two)
+TABLE_SIZE = 1 << 16
+
+
+class TranspositionTable:
+    # Bounded cache of search results keyed by Simulation.state_hash(). Entries
+    # live in two-slot buckets: the first slot keeps the result searched deepest
+    # and the second always takes the newest, so deep results survive a stream
+    # of shallow ones without the table ever filling up for good.
+    def __init__(self, size=TABLE_SIZE):
+        if size < 2 or size & (size - 1):
+            raise ValueError("size must be a power of two")
+        self.mask = size - 2  # Even slot of the key's bucket
+        self.keys = array('Q', [0]) * size
+        self.depths = array('i', [-1]) * size  # -1 marks an empty slot
+        self.values = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(1 for depth in self.depths if depth >= 0)
+
+    def clear(self):
+        self.depths = array('i', [-1]) * len(self.depths)
+        self.values = [None] * len(self.values)
+        self.hits = self.misses = 0
+
+    def lookup(self, key, depth=0):
+        # The value stored for `key` from a search at least `depth` deep, or None
+        slot = key & self.mask
+        for slot in (slot, slot + 1):
+            if self.keys[slot] == key and self.depths[slot] >= depth:
+                self.hits += 1
+                return self.values[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth=0):
+        slot = key & self.mask
+        keys, depths, values = self.keys, self.depths, self.values
+        if depth >= depths[slot]:
+            if keys[slot] != key and depths[slot] >= 0:
+                # Demote the deep entry it displaces to the newest slot
+                keys[slot + 1], depths[slot + 1], values[slot + 1] = keys[slot], depths[slot], values[slot]
+            elif keys[slot + 1] == key:
+                depths[slot + 1] = -1
+                values[slot + 1] = None
+        else:
+            # Shallower than the deep slot's result, even for the same key
+            slot += 1
+        keys[slot] = key
+        depths[slot] = depth
+        values[slot] = value
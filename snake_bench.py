@@ -0,0 +1,677 @@
+"""Micro-benchmarks for the Snake Evolution simulation and renderer.
+
+Run `python snake_bench.py <benchmark>`; see `--help` for the list.
+"""
+import argparse
+import copy
+import os
+import random
+import time
+
+import snake_core
+from snake_core import GRID_COUNT, WINDOW_SIZE, DEFAULT_CONFIG, DIRECTIONS, InputLog, Simulation, replay
+
+# Settings most of the simulation benchmarks play under
+BUSY_CONFIG = DEFAULT_CONFIG.with_settings(wrap_around=True, ghost_mode=True, double_food=True, portal_mode=True)
+
+
+def board_cycle():
+    # Serpentine Hamiltonian cycle over the board (GRID_COUNT must be even)
+    cells = [(0, 0)]
+    for y in range(GRID_COUNT):
+        xs = range(1, GRID_COUNT) if y % 2 == 0 else range(GRID_COUNT - 1, 0, -1)
+        cells.extend((x, y) for x in xs)
+    cells.extend((0, y) for y in range(GRID_COUNT - 1, 0, -1))
+    return cells
+
+
+def snake_on_cycle(game, length):
+    # Lay a snake of the given length along the board cycle, head first
+    cycle = board_cycle()
+    head = length - 1
+    game.snake.set_positions([cycle[i] for i in range(head, -1, -1)])
+    game.snake.length = length
+    return cycle, head
+
+
+def bench_tick(ticks=20000):
+    # Snake.update cost from a short snake up to a full-board snake
+    game = Simulation()
+    full = GRID_COUNT * GRID_COUNT - 1
+    print(f"{'length':>8} {'us/tick':>10}")
+    for length in sorted({10, 100, full // 2, 1000, full}):
+        cycle, head = snake_on_cycle(game, length)
+        moves = [(cycle[(i + 1) % len(cycle)][0] - cycle[i][0],
+                  cycle[(i + 1) % len(cycle)][1] - cycle[i][1]) for i in range(len(cycle))]
+        snake = game.snake
+        start = time.perf_counter()
+        for _ in range(ticks):
+            snake.direction = moves[head]
+            if not snake.update():
+                raise RuntimeError(f"snake of length {length} collided during benchmark")
+            head = (head + 1) % len(cycle)
+        elapsed = time.perf_counter() - start
+        print(f"{length:>8} {elapsed / ticks * 1e6:>10.2f}")
+
+
+def headless_display():
+    # Real renderer on SDL's dummy video/audio drivers
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+    pygame.init()
+    return pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
+
+
+class SurfaceCounter:
+    # Counts pygame.Surface constructions while active
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        import pygame
+        self.original = pygame.Surface
+
+        def counting_surface(*args, **kwargs):
+            self.count += 1
+            return self.original(*args, **kwargs)
+
+        pygame.Surface = counting_surface
+        return self
+
+    def __exit__(self, *exc):
+        import pygame
+        pygame.Surface = self.original
+
+
+def bench_surfaces(frames=300):
+    # Surfaces allocated per frame by portal particles and the dragon head glow
+    screen = headless_display()
+    import snake_game
+
+    game = snake_game.Game(DEFAULT_CONFIG.with_settings(portal_mode=True))
+    game.start_game()
+    game.snake.score = snake_core.DRAGON_STAGE
+    game.snake.check_evolution()
+
+    allocated = particles = 0
+    with SurfaceCounter() as counter:
+        for _ in range(frames):
+            for portal in game.portals:
+                portal.lifetime = 200  # Keep the portals alive for the whole run
+            game.update_portals()
+            game.update_particles()
+            particles += int((game.particles.kind[:len(game.particles)] == snake_game.PORTAL).sum())
+            game.render(screen)
+            head = game.snake.get_head_position()
+            game.snake.draw_dragon_head(screen, head[0] * snake_core.GRID_SIZE,
+                                        head[1] * snake_core.GRID_SIZE, 0)
+        allocated = counter.count
+
+    # Previously every portal particle and each of the 3 glow layers per eye
+    # created its own SRCALPHA surface on every frame
+    legacy = particles / frames + 2 * 3
+    print(f"{'':>24} {'surfaces/frame':>15}")
+    print(f"{'before (per-draw alloc)':>24} {legacy:>15.1f}")
+    print(f"{'after (sprite cache)':>24} {allocated / frames:>15.1f}")
+    print(f"cached sprites: {len(snake_game.ALPHA_CIRCLES.sprites)}")
+
+
+def bench_menu(frames=500):
+    # Menu and settings frame time with text rasterized every frame vs cached
+    screen = headless_display()
+    import snake_game
+
+    game = snake_game.Game()
+    print(f"{'screen':>10} {'uncached ms':>12} {'cached ms':>10}")
+    for state in ('menu', 'settings'):
+        game.menu_state = state
+        timings = []
+        for cached in (False, True):
+            start = time.perf_counter()
+            for _ in range(frames):
+                if not cached:
+                    snake_game.TEXT.clear()  # Same work as building fonts per frame
+                game.render(screen)
+            timings.append((time.perf_counter() - start) / frames * 1e3)
+        print(f"{state:>10} {timings[0]:>12.3f} {timings[1]:>10.3f}")
+
+
+def bench_heads(draws=5000):
+    # Per-draw head cost: basic vs dragon sprite, against drawing the dragon directly
+    screen = headless_display()
+    import snake_game
+
+    game = snake_game.Game()
+    snake = game.snake
+    cases = []
+    for stage in (0, snake_core.DRAGON_STAGE):
+        snake.evolution_stage = stage
+        snake.update_colors()
+        sprite, offset = snake.head_sprite()
+        cases.append((f"stage {stage} sprite",
+                      lambda sprite=sprite, offset=offset: screen.blit(sprite, (100 - offset[0], 100 - offset[1]))))
+    cases.append(("stage 45 direct draw", lambda: snake.draw_dragon_head(screen, 100, 100, 90)))
+
+    print(f"{'':>22} {'us/draw':>8}")
+    for name, draw in cases:
+        start = time.perf_counter()
+        for _ in range(draws):
+            draw()
+        print(f"{name:>22} {(time.perf_counter() - start) / draws * 1e6:>8.2f}")
+
+
+def bench_snake_render(frames=200, length=1000):
+    # Rendering a long snake with per-segment primitives vs baked segment sprites
+    screen = headless_display()
+    import snake_game
+
+    game = snake_game.Game()
+    snake_on_cycle(game, length)
+    snake = game.snake
+    grid = snake_core.GRID_SIZE
+
+    def legacy_render():
+        for x, y in snake.positions:
+            snake_game.draw_rounded_rectangle(screen, snake.color, (x * grid, y * grid, grid, grid), 4)
+            if game.config.settings['ghost_mode']:
+                ghost_surface = snake_game.pygame.Surface((grid, grid), snake_game.pygame.SRCALPHA)
+                ghost_surface.fill((255, 255, 255, 128))
+                screen.blit(ghost_surface, (x * grid, y * grid))
+
+    print(f"{length}-segment snake, frame budget 16.7 ms at 60 Hz")
+    print(f"{'mode':>14} {'primitives ms':>14} {'sprites ms':>11}")
+    for ghost in (False, True):
+        game.config = game.config.with_settings(ghost_mode=ghost)
+        timings = []
+        for render in (legacy_render, lambda: snake.render(screen)):
+            start = time.perf_counter()
+            for _ in range(frames):
+                render()
+            timings.append((time.perf_counter() - start) / frames * 1e3)
+        mode = 'ghost' if ghost else 'normal'
+        print(f"{mode:>14} {timings[0]:>14.2f} {timings[1]:>11.2f}")
+
+
+def bench_replay(ticks=20000, seed=2024):
+    # Record a game with random turns, then verify and time its headless replay
+    game = Simulation(BUSY_CONFIG)
+    game.reset(seed)
+    turns = random.Random(seed)
+    for _ in range(ticks):
+        if turns.random() < 0.3:
+            game.queue_turn(turns.choice(DIRECTIONS))
+        game.step()
+    data = game.input_log.to_bytes()
+
+    start = time.perf_counter()
+    replayed = replay(InputLog.from_bytes(data))
+    elapsed = time.perf_counter() - start
+    matches = (replayed.snake.score == game.snake.score
+               and list(replayed.snake.positions) == list(game.snake.positions))
+    print(f"{ticks} ticks recorded in {len(data)} bytes ({len(data) / ticks:.3f} bytes/tick)")
+    print(f"replay: {ticks / elapsed:.0f} ticks/s, score {replayed.snake.score}, "
+          f"{'identical' if matches else 'DIVERGED'}")
+
+
+def bench_snapshot(iterations=2000, seed=2024):
+    # Checkpoint cost mid-game: binary snapshot/restore against deep-copying the game
+    game = Simulation(BUSY_CONFIG)
+    game.reset(seed)
+    turns = random.Random(seed)
+    for _ in range(5000):
+        if turns.random() < 0.3:
+            game.queue_turn(turns.choice(DIRECTIONS))
+        game.step()
+    buffer = game.snapshot()
+    other = Simulation(BUSY_CONFIG)
+
+    timings = {}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        game.snapshot(buffer)
+    timings['snapshot'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        other.restore(buffer)
+    timings['restore'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations // 10):
+        copy.deepcopy(game)
+    timings['deepcopy'] = (time.perf_counter() - start) * 10
+
+    print(f"snake length {len(game.snake.positions)}, snapshot {len(buffer)} bytes")
+    for name, elapsed in timings.items():
+        print(f"{name:>10} {elapsed / iterations * 1e6:>8.1f} us")
+
+    for name, config in (('busy', BUSY_CONFIG), ('maze', BUSY_CONFIG.with_settings(maze_mode=True))):
+        matches = all(snapshot_round_trip(config, seed + game) for game in range(4))
+        print(f"{name} round trip: {'identical' if matches else 'DIVERGED'}")
+
+
+def snapshot_round_trip(config, seed, ticks=2000):
+    # Whether a game restored from a snapshot into a fresh simulation snapshots
+    # to the same bytes, plays on exactly like the original with the same turns,
+    # and leaves an input log that replays to the same end state
+    game = Simulation(config)
+    game.reset(seed)
+    turns = random.Random(seed)
+    for _ in range(ticks):
+        if turns.random() < 0.3:
+            game.queue_turn(turns.choice(DIRECTIONS))
+        game.step()
+    buffer = game.snapshot()
+    other = Simulation(config)
+    other.restore(buffer)
+    matches = other.snapshot() == buffer
+    for played in (game, other):
+        turns = random.Random(seed + 1)
+        for _ in range(ticks):
+            if turns.random() < 0.3:
+                played.queue_turn(turns.choice(DIRECTIONS))
+            played.step()
+    replayed = replay(InputLog.from_bytes(other.input_log.to_bytes()))
+    return (matches and other.state_hash() == game.state_hash() == replayed.state_hash()
+            and other.snake.score == game.snake.score == replayed.snake.score)
+
+
+def bench_autopilot(ticks=10000, seed=2024):
+    # Autopilot soak test: steering cost per tick with incremental distance maps
+    # against a full breadth-first search every tick, on the default board and
+    # one twice as wide. The slowest ticks matter as much as the mean.
+    from snake_ai import Autopilot
+
+    print(f"{'mode':>12} {'board':>6} {'us/tick':>8} {'p99 us':>8} {'max us':>8} {'games':>6} {'best':>6}")
+    for grid_count in (GRID_COUNT, 2 * GRID_COUNT):
+        for incremental in (False, True):
+            game = Simulation(DEFAULT_CONFIG.replace(grid_count=grid_count))
+            game.reset(seed)
+            autopilot = Autopilot(game)
+            timings = []
+            games = best = 0
+            for _ in range(ticks):
+                start = time.perf_counter()
+                if not incremental:
+                    autopilot.sync()
+                    autopilot.map.rebuild()
+                autopilot.steer()
+                timings.append(time.perf_counter() - start)
+                if not game.step():
+                    games += 1
+                    best = max(best, game.snake.score)
+                    game.reset()
+            best = max(best, game.snake.score)
+            timings.sort()
+            mode = 'incremental' if incremental else 'full BFS'
+            print(f"{mode:>12} {grid_count:>6} {sum(timings) / ticks * 1e6:>8.1f} "
+                  f"{timings[ticks * 99 // 100] * 1e6:>8.0f} {timings[-1] * 1e6:>8.0f} {games:>6} {best:>6}")
+
+
+def bench_fullboard(seed=2024, frames=200):
+    # Drive the Hamiltonian solver to a full board, timing ticks as the snake grows,
+    # then time rendering the longest snake
+    from snake_ai import HamiltonianSolver
+
+    game = Simulation()
+    game.reset(seed)
+    solver = HamiltonianSolver(game)
+    size = GRID_COUNT * GRID_COUNT
+    buckets = {}
+    longest = None
+    print(f"{'length':>8} {'us/tick':>8} {'ticks':>8}")
+    while not game.game_over:
+        solver.steer()
+        start = time.perf_counter()
+        game.step()
+        elapsed = time.perf_counter() - start
+        length = len(game.snake.positions)
+        bucket = buckets.setdefault(min(length * 4 // size, 3), [0.0, 0])
+        bucket[0] += elapsed
+        bucket[1] += 1
+        if not game.game_over:
+            longest = game.snapshot(longest)
+    for quarter, (elapsed, ticks) in sorted(buckets.items()):
+        print(f"{'<' + str((quarter + 1) * size // 4):>8} {elapsed / ticks * 1e6:>8.2f} {ticks:>8}")
+
+    screen = headless_display()
+    import snake_game
+
+    game = snake_game.Game()
+    game.start_game()
+    game.restore(longest)
+    print(f"longest snake {len(game.snake.positions)}/{size} cells after {game.ticks} ticks")
+    for mode, full in (('full redraw', True), ('dirty rects', False)):
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.full_redraw = full
+            game.render(screen, 0.5)
+        print(f"{mode:>12} {(time.perf_counter() - start) / frames * 1e3:>8.2f} ms/frame")
+
+
+def vector_divergence(config, speed_index, seed, ticks=2000):
+    # Play one VectorEnv game and a Simulation side by side with the same random
+    # turns and compare them after every tick. Their RNGs differ, so the
+    # simulation gets the vector game's food and walls copied over each tick,
+    # plus kiwis and poison sprinkled in to exercise the speed effects. Returns
+    # the first tick the two disagree on, or None if they match to the end.
+    import numpy as np
+    from snake_vec import DEATH_CAUSES, VectorEnv
+
+    env = VectorEnv(1, config, seed=seed, speed_index=speed_index, autoreset=False)
+    game = Simulation(config)
+    game.current_speed_index = speed_index
+    game.reset(seed)
+    turns = random.Random(seed)
+    grid_count = config.grid_count
+    for tick in range(ticks):
+        if turns.random() < 0.05:
+            cell = turns.randrange(env.cells)
+            if not env.occupancy[0, cell] and not env.food[0, cell]:
+                env.food[0, cell] = snake_core.FRUIT_NAMES.index(turns.choice(('kiwi', 'poison'))) + 1
+                env.food_count[0] += 1
+        for i in range(len(game.food.positions) - 1, -1, -1):
+            game.food.remove(i)
+        for cell in np.flatnonzero(env.food[0]):
+            pos = divmod(int(cell), grid_count)
+            game.food.positions.append((pos, snake_core.FRUIT_NAMES[env.food[0, cell] - 1]))
+            game.free_cells.block(pos)
+        if config.settings['maze_mode']:
+            game.set_maze_walls({divmod(int(cell), grid_count) for cell in np.flatnonzero(env.walls[0])})
+
+        action = turns.randrange(-1, len(DIRECTIONS)) if not game.snake.input_queue else -1
+        if action >= 0:
+            game.queue_turn(DIRECTIONS[action])
+        alive = game.step()
+        _, done = env.step(np.array([action]))
+        snake = game.snake
+        if bool(done[0]) == alive:
+            return tick
+        if not alive:
+            return None if DEATH_CAUSES[env.death_cause[0]] == snake.death_cause else tick
+        slots = (env.head_slot[0] - np.arange(env.size[0])) % env.capacity
+        body = [divmod(int(cell), grid_count) for cell in env.body[0, slots]]
+        if (body != list(snake.positions)
+                or (env.score[0], env.length[0], env.growth[0], env.stage[0])
+                != (snake.score, snake.length, snake.growth_pending, snake.evolution_stage)
+                or (env.boost_timer[0], env.poison_timer[0])
+                != (snake.speed_effect_timer, snake.speed_reduction_timer)):
+            return tick
+    return None
+
+
+def bench_dirty(frames=400, seed=2024):
+    # Dirty-rect frames against full redraws while playing with maze walls,
+    # particle bursts and snow, then with a snake filling the board: time both,
+    # and check that every dirty-rect frame matches a full redraw of the same
+    # state pixel for pixel
+    screen = headless_display()
+    import pygame
+    import snake_game
+
+    game = snake_game.Game(DEFAULT_CONFIG.with_settings(maze_mode=True, double_food=True, big_food=True,
+                                                        ghost_mode=True, rainbow_snake=True), seed=seed)
+    game.start_game()
+    reference = screen.copy()
+
+    def compare(timings):
+        # Render a frame both ways; True if they differ
+        start = time.perf_counter()
+        game.render(screen, 0.5)
+        timings['dirty rects'] += time.perf_counter() - start
+        # Full redraw of the same state on a second surface, leaving the dirty
+        # rects for the next frame as they were
+        drawn, area = game.dirty_rects, game.dirty_area
+        game.full_redraw = True
+        start = time.perf_counter()
+        game.render(reference, 0.5)
+        timings['full redraw'] += time.perf_counter() - start
+        game.dirty_rects, game.dirty_area = drawn, area
+        game.full_redraw = False
+        return pygame.surfarray.pixels3d(screen).tobytes() != pygame.surfarray.pixels3d(reference).tobytes()
+
+    turns = random.Random(seed)
+    playing = {'dirty rects': 0.0, 'full redraw': 0.0}
+    mismatches = 0
+    for frame in range(frames):
+        if turns.random() < 0.2:
+            game.queue_turn(turns.choice(DIRECTIONS))
+        if frame % 50 == 0:
+            game.create_evolution_particles()
+            game.create_snow(20)
+        game.update()
+        game.update_particles()
+        if game.game_over:
+            game.start_game()
+        mismatches += compare(playing)
+
+    # Every cell but one under the snake, crawling along the board cycle
+    full_board = {'dirty rects': 0.0, 'full redraw': 0.0}
+    length = GRID_COUNT * GRID_COUNT - 1
+    for frame in range(frames // 4):
+        snake_on_cycle(game, length)
+        game.snake.positions.rotate(frame)
+        mismatches += compare(full_board)
+
+    print(f"{'':>12} {'playing':>8} {'full board':>11}  ms/frame")
+    for mode in playing:
+        print(f"{mode:>12} {playing[mode] / frames * 1e3:>8.2f} {full_board[mode] / (frames // 4) * 1e3:>11.2f}")
+    print(f"{frames + frames // 4} frames: {'identical' if not mismatches else f'{mismatches} DIFFERED'} "
+          f"to full redraws")
+
+
+def bench_vector(ticks=200, seed=2024):
+    # Environment steps per second: one Simulation per game against the batched
+    # NumPy environment at several batch sizes, with random turns. First checks
+    # the batched rules against Simulation on small boards with fast evolution.
+    import numpy as np
+    from snake_vec import VectorEnv
+
+    stages = dict(zip((0, 3, 6, 9), snake_core.EVOLUTION_STAGES.values()))
+    # A fruit table with other points and growth, poison included
+    fruits = {name: dict(fruit, points=fruit['points'] * 2 - 1, growth=(fruit['growth'] + 1) % 3)
+              for name, fruit in snake_core.FRUITS.items()}
+    checks = ({}, {'wrap_around': False}, {'ghost_mode': True}, {'infinite_length': True},
+              {'reverse_controls': True, 'double_food': True}, {'maze_mode': True},
+              {'maze_mode': True, 'ghost_mode': True}, 'fruits')
+    diverged = []
+    for trial, settings in enumerate(checks * 2):
+        config = DEFAULT_CONFIG.replace(grid_count=8, evolution_stages=stages)
+        if settings == 'fruits':
+            config = config.replace(fruits=fruits)
+        else:
+            config = config.with_settings(**settings)
+        tick = vector_divergence(config, trial % 2, seed + trial)
+        if tick is not None:
+            diverged.append(f"{settings or 'defaults'} at tick {tick}")
+    print(f"VectorEnv against Simulation over {2 * len(checks)} games: "
+          f"{'DIVERGED with ' + '; '.join(diverged) if diverged else 'identical'}")
+
+    game = Simulation()
+    game.reset(seed)
+    turns = random.Random(seed)
+    steps = 20000
+    start = time.perf_counter()
+    for _ in range(steps):
+        if turns.random() < 0.3:
+            game.queue_turn(turns.choice(DIRECTIONS))
+        if not game.step():
+            game.reset()
+    print(f"{'games':>8} {'steps/s':>12} {'ms/step':>8}")
+    print(f"{'1 (obj)':>8} {steps / (time.perf_counter() - start):>12,.0f}")
+
+    rng = np.random.default_rng(seed)
+    for games in (256, 4096, 16384):
+        env = VectorEnv(games, seed=seed)
+        actions = rng.integers(-1, len(DIRECTIONS), size=(64, games), dtype=np.int8)
+        start = time.perf_counter()
+        for tick in range(ticks):
+            env.step(actions[tick % 64])
+        elapsed = time.perf_counter() - start
+        print(f"{games:>8} {games * ticks / elapsed:>12,.0f} {elapsed / ticks * 1e3:>8.2f}")
+
+
+def bench_observe(ticks=5000, seed=2024):
+    # Per-tick cost of reading observation planes: rebuilt from the game's
+    # positions every tick against the incrementally maintained buffers
+    import numpy as np
+    from snake_core import FRUIT_PLANES, OBS_BODY, OBS_CHANNELS, OBS_HEAD, OBS_WALL
+
+    def rebuild(game):
+        grid_count = game.config.grid_count
+        planes = np.zeros((OBS_CHANNELS, grid_count, grid_count), dtype=np.uint8)
+        body = np.array(game.snake.positions).reshape(-1, 2)
+        planes[OBS_BODY, body[:, 0], body[:, 1]] = 1
+        planes[(OBS_HEAD, *game.snake.positions[0])] = 1
+        for (x, y), fruit_type in game.food.positions:
+            planes[FRUIT_PLANES[fruit_type], x, y] = 1
+        if game.maze_walls:
+            walls = np.array(list(game.maze_walls))
+            planes[OBS_WALL, walls[:, 0], walls[:, 1]] = 1
+        return planes
+
+    config = DEFAULT_CONFIG.with_settings(maze_mode=True, double_food=True)
+    print(f"{'mode':>12} {'us/tick':>8}")
+    for mode in ('rebuild', 'incremental'):
+        game = Simulation(config)
+        game.reset(seed)
+        turns = random.Random(seed)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            if turns.random() < 0.3:
+                game.queue_turn(turns.choice(DIRECTIONS))
+            if not game.step():
+                game.reset()
+            if mode == 'rebuild':
+                rebuild(game)
+            else:
+                game.observe()
+        print(f"{mode:>12} {(time.perf_counter() - start) / ticks * 1e6:>8.2f}")
+
+
+def bench_pixels(frames=2000, seed=2024):
+    # Cost of an 84x84 frame for pixel agents: drawn from the observation planes
+    # against the full renderer scaled down through surfarray
+    from snake_pixels import PixelFrames
+
+    game = Simulation(BUSY_CONFIG)
+    game.reset(seed)
+    print(f"{'source':>16} {'us/frame':>9}")
+    for grayscale in (False, True):
+        pixels = PixelFrames(grayscale=grayscale, stack=4)
+        start = time.perf_counter()
+        for _ in range(frames):
+            if not game.step():
+                game.reset()
+            pixels.render(game)
+        name = 'state gray' if grayscale else 'state rgb'
+        print(f"{name:>16} {(time.perf_counter() - start) / frames * 1e6:>9.1f}")
+
+    screen = headless_display()
+    import snake_game
+
+    game = snake_game.Game(BUSY_CONFIG, seed=seed)
+    game.start_game()
+    pixels = PixelFrames(stack=4)
+    frames //= 10
+    start = time.perf_counter()
+    for _ in range(frames):
+        if not game.step():
+            game.reset()
+        game.render(screen)
+        pixels.capture(screen)
+    print(f"{'renderer rgb':>16} {(time.perf_counter() - start) / frames * 1e6:>9.1f}")
+
+
+def bench_zobrist(ticks=5000, rollouts=2000, depth=6, seed=2024):
+    # Tick cost with incremental state hashing on, then random rollouts from
+    # one position that score leaves with a flood fill, with and without a
+    # transposition table to reuse the scores of leaves reached before
+    from snake_ai import TranspositionTable
+
+    config = DEFAULT_CONFIG.with_settings(maze_mode=True, double_food=True)
+    print(f"{'hashing':>12} {'us/tick':>8}")
+    for hashing in (False, True):
+        game = Simulation(config)
+        game.reset(seed)
+        turns = random.Random(seed)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            if turns.random() < 0.3:
+                game.queue_turn(turns.choice(DIRECTIONS))
+            if not game.step():
+                game.reset()
+            if hashing:
+                game.state_hash()
+        print(f"{'on' if hashing else 'off':>12} {(time.perf_counter() - start) / ticks * 1e6:>8.2f}")
+
+    def reachable(game):
+        # Free cells the head can reach; the kind of leaf score a planner uses
+        grid_count = game.config.grid_count
+        blocked = game.snake.occupies
+        seen = {game.snake.positions[0]}
+        frontier = [game.snake.positions[0]]
+        while frontier:
+            x, y = frontier.pop()
+            for dx, dy in DIRECTIONS:
+                cell = (x + dx, y + dy)
+                if (0 <= cell[0] < grid_count and 0 <= cell[1] < grid_count and cell not in seen
+                        and cell not in game.maze_walls and not blocked(cell)):
+                    seen.add(cell)
+                    frontier.append(cell)
+        return len(seen)
+
+    root = Simulation(config)
+    root.reset(seed)
+    root.state_hash()
+    for _ in range(20):
+        root.step()
+    origin = root.snapshot()
+    print(f"{'table':>12} {'ms':>8} {'hit rate':>9}")
+    for table in (None, TranspositionTable()):
+        paths = random.Random(seed)
+        start = time.perf_counter()
+        for _ in range(rollouts):
+            root.restore(origin)
+            for _ in range(depth):
+                root.snake.queue_turn(paths.choice(DIRECTIONS))
+                if not root.step():
+                    break
+            if root.game_over:
+                continue
+            key = root.state_hash()
+            if table is None or table.lookup(key) is None:
+                score = reachable(root)
+                if table is not None:
+                    table.store(key, score)
+        elapsed = (time.perf_counter() - start) * 1e3
+        rate = f"{table.hits / (table.hits + table.misses):.0%}" if table is not None else '-'
+        print(f"{'on' if table is not None else 'off':>12} {elapsed:>8.1f} {rate:>9}")
+
+
+BENCHMARKS = {
+    'fullboard': bench_fullboard,
+    'dirty': bench_dirty,
+    'autopilot': bench_autopilot,
+    'snapshot': bench_snapshot,
+    'replay': bench_replay,
+    'observe': bench_observe,
+    'pixels': bench_pixels,
+    'zobrist': bench_zobrist,
+    'snake_render': bench_snake_render,
+    'heads': bench_heads,
+    'menu': bench_menu,
+    'tick': bench_tick,
+    'vector': bench_vector,
+    'surfaces': bench_surfaces,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark]()
+
+
+if __name__ == '__main__':
+    main()
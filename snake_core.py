@@ -0,0 +1,1303 @@
+"""Headless Snake Evolution simulation: board rules without pygame, display or audio."""
+import random
+import colorsys
+import struct
+from array import array
+from collections import deque
+from itertools import chain
+from types import MappingProxyType
+
+# Defaults for GameConfig; games read their own config, never these
+WINDOW_SIZE = 720
+GRID_SIZE = 20  # Cell size in pixels for the pygame front end
+GRID_COUNT = WINDOW_SIZE // GRID_SIZE
+MAX_GRID_COUNT = 255  # Snapshots pack cell coordinates into single bytes
+
+# Frame rate
+FPS = 10  # Simulation ticks per second; timers count in ticks
+
+# Snake movement rates in cells per second for the Slow, Normal and Fast levels
+SPEED_LEVELS = (5, 10, 15)
+DEFAULT_SPEED_INDEX = 1
+SPEED_REDUCTION = 0.2  # Movement rate factor while poisoned
+TRAIL_LENGTH = 4  # Vacated tail cells kept for interpolating fast moves
+
+# Fruits dictionary with colors, point values and the segments each grows the snake by
+FRUITS = {
+    'apple': {'color': (255, 0, 0), 'points': 1, 'growth': 1},
+    'orange': {'color': (255, 165, 0), 'points': 1, 'growth': 1},
+    'banana': {'color': (255, 255, 0), 'points': 1, 'growth': 1},
+    'berry': {'color': (138, 43, 226), 'points': 3, 'growth': 2},
+    'kiwi': {'color': (75, 160, 0), 'points': 2, 'growth': 0},
+    'ice_cream': {'color': (200, 200, 255), 'points': 2, 'growth': 0},
+    'poison': {'color': (0, 255, 0), 'points': -2, 'growth': 0}
+}
+
+# Game settings with defaults
+GAME_SETTINGS = {
+    'reverse_controls': False,
+    'ghost_mode': False,
+    'maze_mode': False,
+    'rainbow_snake': False,
+    'big_food': False,
+    'portal_mode': False,
+    'wrap_around': True,
+    'double_food': False,
+    'infinite_length': False,
+    'speed_increase': False
+}
+
+# Update evolution stages with more detailed appearances
+EVOLUTION_STAGES = {
+    0: {
+        'color': (24, 128, 56),    # Basic green
+        'head_color': (21, 115, 50),
+        'patterns': []  # Empty list for initial stage
+    },
+    10: {
+        'color': (30, 144, 255),   # Blue stage
+        'head_color': (25, 125, 225),
+        'patterns': ['scales']  # First pattern
+    },
+    15: {
+        'color': (255, 69, 0),     # Fire orange
+        'head_color': (220, 53, 34),
+        'patterns': ['scales', 'fire']  # Add fire effect
+    },
+    20: {
+        'color': (218, 165, 32),   # Golden stage
+        'head_color': (184, 134, 11),
+        'patterns': ['scales', 'fire', 'golden_scales']
+    },
+    30: {
+        'color': (138, 43, 226),   # Purple stage
+        'head_color': (106, 90, 205),
+        'patterns': ['scales', 'fire', 'golden_scales', 'textile']
+    },
+    35: {
+        'color': (255, 215, 0),    # Golden with wings
+        'head_color': (218, 165, 32),
+        'patterns': ['scales', 'fire', 'golden_scales', 'textile', 'wings']
+    },
+    40: {
+        'color': (70, 130, 180),   # Steel blue with feet
+        'head_color': (95, 158, 160),
+        'patterns': ['scales', 'fire', 'golden_scales', 'textile', 'wings', 'feet']
+    },
+    45: {
+        'color': (178, 34, 34),    # Dragon form
+        'head_color': (139, 0, 0),
+        'patterns': ['scales', 'fire', 'golden_scales', 'textile', 'wings', 'feet', 'dragon']
+    }
+}
+
+# Setting order used when packing settings into input logs and snapshots
+SETTING_NAMES = tuple(GAME_SETTINGS)
+
+# Fruit order used when packing food into snapshots
+FRUIT_NAMES = tuple(FRUITS)
+
+# Highest default evolution stage (dragon form)
+DRAGON_STAGE = max(EVOLUTION_STAGES)
+
+# Movement directions
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# Turns buffered ahead of the snake, one consumed per tick
+INPUT_QUEUE_SIZE = 3
+
+# Observation planes: body, head, one per fruit in FRUIT_NAMES order, maze walls,
+# then portal entrances and exits
+OBS_BODY = 0
+OBS_HEAD = 1
+OBS_FRUIT = 2  # First fruit plane
+OBS_WALL = OBS_FRUIT + len(FRUIT_NAMES)
+OBS_PORTAL_IN = OBS_WALL + 1
+OBS_PORTAL_OUT = OBS_WALL + 2
+OBS_CHANNELS = OBS_WALL + 3
+FRUIT_PLANES = {name: OBS_FRUIT + i for i, name in enumerate(FRUIT_NAMES)}
+
+# Scalar observation features, in order
+OBS_FEATURES = ('direction_x', 'direction_y', 'score', 'evolution_stage',
+                'speed_effect_timer', 'speed_reduction_timer')
+
+ZOBRIST_KEYS = {}  # Board size -> one random key per observation plane entry, then the snake keys
+GROWTH_KEYS = 16  # Pending growth is hashed clamped to GROWTH_KEYS - 1
+
+def rainbow_colors(hue):
+    # Body color and slightly darker head color for a hue in degrees
+    r, g, b = colorsys.hsv_to_rgb(hue / 360, 1.0, 1.0)
+    return (int(r * 255), int(g * 255), int(b * 255)), (int(r * 200), int(g * 200), int(b * 200))
+
+
+# Rainbow snake palette, one entry per hue degree
+RAINBOW_PALETTE = [rainbow_colors(hue) for hue in range(360)]
+
+# Portal colors
+PORTAL_START_COLOR = (0, 191, 255)  # Deep sky blue
+PORTAL_END_COLOR = (138, 43, 226)   # Blue violet
+
+
+def settings_mask(settings):
+    # Pack boolean settings into a bit mask in SETTING_NAMES order
+    return sum(1 << i for i, name in enumerate(SETTING_NAMES) if settings[name])
+
+
+def settings_from_mask(mask):
+    return {name: bool(mask >> i & 1) for i, name in enumerate(SETTING_NAMES)}
+
+
+def freeze(table):
+    # Read-only view of a two-level table such as FRUITS or EVOLUTION_STAGES
+    return MappingProxyType({key: MappingProxyType(dict(value)) for key, value in table.items()})
+
+
+def thaw(table):
+    return {key: dict(value) for key, value in table.items()}
+
+
+class GameConfig:
+    # Immutable ruleset and board size of one game. Everything the rules depend on
+    # is read from the game's config rather than module globals, so one process
+    # can run many games with different modes and board sizes side by side.
+    # Derive variations with replace() and with_settings().
+    __slots__ = ('grid_count', 'fps', 'settings', 'fruits', 'evolution_stages',
+                 'settings_mask', 'move_cost', 'dragon_stage')
+
+    def __init__(self, grid_count=GRID_COUNT, fps=FPS, settings=None, fruits=FRUITS,
+                 evolution_stages=EVOLUTION_STAGES):
+        if not 5 <= grid_count <= MAX_GRID_COUNT:
+            raise ValueError(f"grid_count must be between 5 and {MAX_GRID_COUNT}, not {grid_count}")
+        if not 1 <= fps <= 0xffff:
+            raise ValueError(f"fps must be between 1 and 65535, not {fps}")
+        merged = dict(GAME_SETTINGS)
+        if settings is not None:
+            unknown = set(settings) - set(SETTING_NAMES)
+            if unknown:
+                raise ValueError(f"unknown game settings: {', '.join(sorted(unknown))}")
+            merged.update((name, bool(value)) for name, value in settings.items())
+        init = super().__setattr__
+        init('grid_count', grid_count)
+        init('fps', fps)
+        init('settings', MappingProxyType(merged))
+        init('fruits', freeze(fruits))
+        init('evolution_stages', freeze(evolution_stages))
+        init('settings_mask', settings_mask(merged))
+        init('move_cost', fps * 100)  # Movement credit spent per cell; a snake earns 100 per cell/s per tick
+        init('dragon_stage', max(evolution_stages))  # Highest evolution stage
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameConfig is immutable; use replace() or with_settings()")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameConfig is immutable")
+
+    def __reduce__(self):
+        # Pickle as constructor arguments; mappingproxy views can't be pickled
+        return GameConfig, (self.grid_count, self.fps, dict(self.settings), thaw(self.fruits),
+                            thaw(self.evolution_stages))
+
+    def __copy__(self):
+        return self  # Immutable, so copies can share it
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        enabled = ', '.join(name for name in SETTING_NAMES if self.settings[name])
+        return f"GameConfig(grid_count={self.grid_count}, fps={self.fps}, settings=[{enabled}])"
+
+    def replace(self, **changes):
+        # Copy of this config with some fields changed
+        fields = {name: getattr(self, name)
+                  for name in ('grid_count', 'fps', 'settings', 'fruits', 'evolution_stages')}
+        fields.update(changes)
+        return GameConfig(**fields)
+
+    def with_settings(self, **settings):
+        return self.replace(settings={**self.settings, **settings})
+
+
+# Used by games created without a config
+DEFAULT_CONFIG = GameConfig()
+
+
+# FreeCells slot of a blocked cell
+NO_SLOT = 0xffff
+
+
+class FreeCells:
+    # Incrementally maintained set of empty board cells with O(1) uniform sampling.
+    # A cell is free while nothing (snake, food, wall or portal) blocks it; blockers
+    # are counted because a snake segment can share a cell with food or a portal.
+    def __init__(self, grid_count):
+        self.grid_count = grid_count
+        size = grid_count * grid_count
+        # Flat typed arrays, so snapshots copy them without conversion
+        self.blockers = array('H', [0]) * size
+        self.cells = array('H', range(size))  # Dense list of free cell indices
+        self.slots = array('H', range(size))  # Position of each cell in self.cells, NO_SLOT if blocked
+
+    def __len__(self):
+        return len(self.cells)
+
+    def is_free(self, pos):
+        return self.blockers[pos[0] * self.grid_count + pos[1]] == 0
+
+    def block(self, pos):
+        index = pos[0] * self.grid_count + pos[1]
+        self.blockers[index] += 1
+        if self.blockers[index] == 1:
+            # Swap-remove the cell from the dense free list
+            slot = self.slots[index]
+            last = self.cells.pop()
+            if last != index:
+                self.cells[slot] = last
+                self.slots[last] = slot
+            self.slots[index] = NO_SLOT
+
+    def unblock(self, pos):
+        index = pos[0] * self.grid_count + pos[1]
+        self.blockers[index] -= 1
+        if self.blockers[index] == 0:
+            self.slots[index] = len(self.cells)
+            self.cells.append(index)
+
+    def sample(self, rng):
+        # Uniformly random free cell, or None when the board is full
+        if not self.cells:
+            return None
+        return divmod(self.cells[rng.randrange(len(self.cells))], self.grid_count)
+
+
+class Snake:
+    def __init__(self, game):
+        self.game = game  # Store the game reference
+        self.length = 1
+        self.positions = deque()  # Head at index 0, tail at index -1
+        grid_count = game.config.grid_count
+        self.occupancy = array('H', [0]) * (grid_count * grid_count)  # Body segments per cell
+        self.set_positions([(grid_count // 2, grid_count // 2)])
+        self.direction = RIGHT  # Initially move right
+        self.input_queue = deque(maxlen=INPUT_QUEUE_SIZE)  # Pending player turns
+        self.death_cause = None  # 'edge', 'wall' or 'self' once the snake has crashed
+        self.color = (24, 128, 56)  # Google green
+        self.head_color = (21, 115, 50)  # Slightly darker green
+        self.growth_pending = 0
+        self.trail = deque(maxlen=TRAIL_LENGTH)  # Tail cell before each recent move, newest first
+        self.speed_multiplier = 1.0
+        self.speed_effect_timer = 0
+        self.speed_reduction_timer = 0
+        self.rainbow_offset = 0
+        self.evolution_stage = 0
+        self.score = 0
+        self.speed = 1  # Movement rate factor, reduced by poison
+        self.move_credit = 0  # Movement earned but not yet spent, in config.move_cost units
+        self.moves_last = 0  # Cells moved on the last tick that moved
+        self.ticks_since_move = 0
+        self.tick_rate = 1.0  # Cells per tick at which the last moves are drawn
+        self.update_colors()  # This will set both color and head_color based on initial stage
+
+    def get_head_position(self):
+        return self.positions[0]
+
+    def set_positions(self, positions):
+        # Replace the whole body and rebuild the occupancy grid
+        free_cells = self.game.free_cells
+        grid_count = free_cells.grid_count
+        for pos in self.positions:
+            free_cells.unblock(pos)
+        self.positions = deque(positions)
+        self.occupancy = array('H', [0]) * (grid_count * grid_count)
+        for pos in self.positions:
+            self.occupancy[pos[0] * grid_count + pos[1]] += 1
+            free_cells.block(pos)
+        if self.game.observation is not None:
+            self.game.observation.fill_snake(self)
+
+    def occupies(self, pos):
+        return self.occupancy[pos[0] * self.game.free_cells.grid_count + pos[1]] > 0
+
+    def collides(self, pos):
+        # Same rule as `pos in positions[3:]`: the head and neck never count
+        count = self.occupancy[pos[0] * self.game.free_cells.grid_count + pos[1]]
+        for i in range(min(3, len(self.positions))):
+            if self.positions[i] == pos:
+                count -= 1
+        return count > 0
+
+    def move_head(self, pos):
+        # Relocate the head in place (used by portals)
+        head = self.positions[0]
+        grid_count = self.game.free_cells.grid_count
+        self.occupancy[head[0] * grid_count + head[1]] -= 1
+        self.occupancy[pos[0] * grid_count + pos[1]] += 1
+        self.game.free_cells.unblock(head)
+        self.game.free_cells.block(pos)
+        self.positions[0] = pos
+        observation = self.game.observation
+        if observation is not None:
+            observation.set(OBS_BODY, head, self.occupancy[head[0] * grid_count + head[1]] > 0)
+            observation.set(OBS_HEAD, head, 0)
+            observation.set(OBS_BODY, pos, 1)
+            observation.set(OBS_HEAD, pos, 1)
+
+    def update(self):
+        settings = self.game.config.settings
+        grid_count = self.game.free_cells.grid_count
+
+        # Handle rainbow snake setting
+        if settings['rainbow_snake']:
+            self.rainbow_offset = (self.rainbow_offset + 1) % 360
+            self.color, self.head_color = RAINBOW_PALETTE[self.rainbow_offset]
+
+        # Take the next buffered turn, if any
+        if self.input_queue:
+            self.direction = self.input_queue.popleft()
+
+        cur = self.get_head_position()
+        x, y = self.direction
+        new = (cur[0] + x, cur[1] + y)
+
+        # Wrap around the board edges, or die on them if wrap around is disabled
+        if settings['wrap_around']:
+            new = (new[0] % grid_count, new[1] % grid_count)
+        elif new[0] < 0 or new[0] >= grid_count or new[1] < 0 or new[1] >= grid_count:
+            self.death_cause = 'edge'
+            return False
+
+        # Check for collision with maze walls
+        if new in self.game.maze_walls:
+            self.death_cause = 'wall'
+            return False
+
+        # Check for self collision (unless ghost mode is enabled)
+        if not settings['ghost_mode'] and self.collides(new):
+            self.death_cause = 'self'
+            return False
+
+        self.trail.appendleft(self.positions[-1])
+        observation = self.game.observation
+        if observation is not None:
+            observation.set(OBS_HEAD, cur, 0)
+            observation.set(OBS_HEAD, new, 1)
+            observation.set(OBS_BODY, new, 1)
+        self.positions.appendleft(new)
+        self.occupancy[new[0] * grid_count + new[1]] += 1
+        self.game.free_cells.block(new)
+
+        # Handle infinite length setting
+        if settings['infinite_length']:
+            max_length = 3  # Keep minimum length of 3
+        else:
+            max_length = self.length
+        if len(self.positions) > max_length:
+            tail = self.positions.pop()
+            self.occupancy[tail[0] * grid_count + tail[1]] -= 1
+            self.game.free_cells.unblock(tail)
+            if observation is not None and not self.occupancy[tail[0] * grid_count + tail[1]]:
+                observation.set(OBS_BODY, tail, 0)
+
+        if self.growth_pending > 0:
+            self.length += 1
+            self.growth_pending -= 1
+
+        return True
+
+    def update_effects(self):
+        # Count down timed fruit effects, once per tick
+        if self.speed_effect_timer > 0:
+            self.speed_effect_timer -= 1
+            if self.speed_effect_timer == 0:
+                self.speed_multiplier = 1.0  # Kiwi boost wears off
+        if self.speed_reduction_timer > 0:
+            self.speed_reduction_timer -= 1
+            if self.speed_reduction_timer == 0:
+                self.speed = 1  # Restore normal speed
+
+    def move_rate(self):
+        # Cells per second from the game speed level and active fruit effects
+        return self.game.speed_levels[self.game.current_speed_index] * self.speed_multiplier * self.speed
+
+    def scheduled_moves(self):
+        # Earn this tick's movement credit and return how many cells to move.
+        # Credit is integral so the rate stays exact over any number of ticks.
+        move_cost = self.game.config.move_cost
+        earned = round(self.move_rate() * 100)
+        self.move_credit += earned
+        moves = self.move_credit // move_cost
+        self.move_credit -= moves * move_cost
+        if moves:
+            # Draw these moves over the ticks until the next one is due
+            self.moves_last = moves
+            self.ticks_since_move = 0
+            ticks_to_next = -(-(move_cost - self.move_credit) // earned)
+            self.tick_rate = moves / ticks_to_next
+        else:
+            self.ticks_since_move += 1
+        return moves
+
+    def render_lag(self, alpha):
+        # Cells the drawn snake trails its logical position, `alpha` of the way
+        # through the current tick: it covers the last moves at the current rate
+        lag = self.moves_last - (self.ticks_since_move + alpha) * self.tick_rate
+        return min(max(lag, 0.0), len(self.trail))
+
+    def turn(self, direction):
+        # Ignore direct reversals into the neck
+        if direction != (-self.direction[0], -self.direction[1]):
+            self.direction = direction
+
+    def queue_turn(self, direction):
+        # Buffer a player turn for a later tick. Each turn is checked against the
+        # one queued before it, so quick sequences land and never reverse the snake.
+        if self.game.config.settings['reverse_controls']:
+            direction = (-direction[0], -direction[1])
+        last = self.input_queue[-1] if self.input_queue else self.direction
+        if direction == last or direction == (-last[0], -last[1]):
+            return False
+        if len(self.input_queue) == self.input_queue.maxlen:
+            return False  # Drop presses beyond the buffer rather than the oldest ones
+        self.input_queue.append(direction)
+        return True
+
+    def reset(self):
+        self.length = 3  # Start with length 3 instead of 1
+        center = self.game.config.grid_count // 2
+        self.set_positions([
+            (center, center),
+            (center - 1, center),
+            (center - 2, center)
+        ])
+        self.direction = RIGHT
+        self.input_queue.clear()
+        self.trail.clear()
+        self.death_cause = None
+        self.score = 0
+
+    def check_evolution(self):
+        # Find current evolution stage
+        current_stage = 0
+        for score in sorted(self.game.config.evolution_stages):
+            if self.score >= score:
+                current_stage = score
+
+        if current_stage != self.evolution_stage:
+            self.evolution_stage = current_stage
+            self.update_colors()  # Update colors after evolution
+            return True  # Return True to indicate evolution occurred
+        return False  # Return False if no evolution occurred
+
+    def update_colors(self):
+        # Just update colors based on current evolution stage
+        stage_colors = self.game.config.evolution_stages[self.evolution_stage]
+        self.color = stage_colors['color']
+        self.head_color = stage_colors['head_color']
+
+    def grow(self, amount):
+        self.growth_pending += amount
+
+    def apply_speed_reduction(self, duration=None):
+        if duration is None:
+            duration = self.game.config.fps * 10
+        self.speed = SPEED_REDUCTION
+        self.speed_reduction_timer = duration
+
+
+class Food:
+    def __init__(self, game):
+        self.game = game
+        self.positions = []  # List of (position, fruit_type) tuples
+        self.randomize()
+
+    def randomize(self):
+        # Clear existing food
+        observation = self.game.observation
+        for position, fruit_type in self.positions:
+            self.game.free_cells.unblock(position)
+            if observation is not None:
+                observation.set(FRUIT_PLANES[fruit_type], position, 0)
+        self.positions = []
+
+        # Add initial food
+        self.add_food('apple')
+
+        # Add second food if double food is enabled
+        if self.game.config.settings['double_food']:
+            self.add_food('apple')
+
+    def add_food(self, fruit_type):
+        # Pick a cell not covered by the snake, walls, portals or other food
+        new_pos = self.game.free_cells.sample(self.game.rng)
+
+        # The board is full, don't add food
+        if new_pos is None:
+            return
+
+        # Determine fruit type
+        if fruit_type == 'apple':
+            # Select random fruit type
+            fruit_types = ['apple', 'banana', 'orange', 'berry', 'kiwi']
+            fruit_type = self.game.rng.choice(fruit_types)
+        self.positions.append((new_pos, fruit_type))
+        self.game.free_cells.block(new_pos)
+        if self.game.observation is not None:
+            self.game.observation.set(FRUIT_PLANES[fruit_type], new_pos, 1)
+
+    def remove(self, index):
+        position, fruit_type = self.positions.pop(index)
+        self.game.free_cells.unblock(position)
+        if self.game.observation is not None:
+            self.game.observation.set(FRUIT_PLANES[fruit_type], position, 0)
+
+    def update(self):
+        # Make sure we always have at least one food
+        if not self.positions:
+            self.add_food('apple')
+
+        # Make sure we have two foods if double food is enabled
+        if self.game.config.settings['double_food'] and len(self.positions) < 2:
+            self.add_food('apple')
+
+
+class Portal:
+    def __init__(self, start_pos, end_pos):
+        self.start_pos = start_pos  # (x, y) in grid coordinates
+        self.end_pos = end_pos      # (x, y) in grid coordinates
+        self.lifetime = 200         # Duration in ticks
+        self.start_color = PORTAL_START_COLOR
+        self.end_color = PORTAL_END_COLOR
+        self.color = self.start_color  # For backward compatibility
+
+    def update(self):
+        # Update lifetime
+        self.lifetime -= 1
+
+
+# Binary snapshot layout: a fixed header, then variable sections whose sizes the
+# header gives (snake body, input queue, trail, food, walls, portals, free cells),
+# then fixed-size sections (free cell slots and blockers, occupancy, RNG state),
+# then the input log's events so far
+SNAPSHOT_MAGIC = b'SNKS'
+SNAPSHOT_VERSION = 3
+SNAPSHOT_HEADER = struct.Struct(
+    '<4sBBH'              # Magic, version, grid count, settings mask
+    'I?iiiBQ'             # Ticks, game over, high score, maze/portal timers, speed index, seed
+    'BIIdiidHHiIIId6B'    # Snake direction, length, growth, speed effects, rainbow offset,
+                          # stage, score, movement scheduling, colors
+    'IBBHHBH?d'           # Section sizes, then the RNG's cached gaussian
+    'HB'                  # FPS, death cause
+    'BII'                 # Input log speed index, last event tick and size
+)
+DEATH_CAUSES = (None, 'edge', 'wall', 'self')  # Snake.death_cause by snapshot code
+PORTAL_RECORD = struct.Struct('<4Bi')  # Start, end, lifetime
+RNG_STATE = struct.Struct('<625I')  # Mersenne Twister state words and position
+
+
+# Input log event kinds: a player turn, and the first and following moves of a
+# route planned by an AI, which replaces whatever was queued
+TURN = 0
+PLAN_START = 1
+PLAN_STEP = 2
+
+
+class InputLog:
+    # Compact record of one game: the seed, board size, tick rate, settings and
+    # speed level it started from plus every accepted input, stored as varints of
+    # (tick delta << 4 | kind << 2 | direction)
+    # Magic, version, seed, speed index, grid count, FPS, settings mask, ticks, score
+    HEADER = struct.Struct('<4sBQBBHHIi')
+    MAGIC = b'SNKR'
+    VERSION = 3
+
+    def __init__(self, seed, config, speed_index, data=b''):
+        self.seed = seed
+        self.grid_count = config.grid_count
+        self.fps = config.fps
+        self.settings = dict(config.settings)
+        self.speed_index = speed_index
+        self.data = bytearray(data)
+        self.last_tick = 0
+        self.ticks = 0  # Ticks played so far
+        self.score = 0  # Score after the last tick
+
+    def record(self, tick, direction, kind=TURN):
+        value = (tick - self.last_tick) << 4 | kind << 2 | DIRECTIONS.index(direction)
+        self.last_tick = tick
+        while value >= 0x80:
+            self.data.append(value & 0x7f | 0x80)
+            value >>= 7
+        self.data.append(value)
+
+    def events(self):
+        # Yield the recorded (tick, direction, kind) inputs in order
+        tick = value = shift = 0
+        for byte in self.data:
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if byte < 0x80:
+                tick += value >> 4
+                yield tick, DIRECTIONS[value & 3], value >> 2 & 3
+                value = shift = 0
+
+    def game_config(self, base=None):
+        # Config to replay this log with; fruit and stage tables come from `base`
+        base = base if base is not None else DEFAULT_CONFIG
+        return base.replace(grid_count=self.grid_count, fps=self.fps, settings=self.settings)
+
+    def to_bytes(self):
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.speed_index,
+                                  self.grid_count, self.fps, settings_mask(self.settings),
+                                  self.ticks, self.score)
+        return header + bytes(self.data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        (magic, version, seed, speed_index, grid_count, fps, mask,
+         ticks, score) = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a Snake Evolution input log")
+        config = GameConfig(grid_count, fps, settings_from_mask(mask))
+        log = cls(seed, config, speed_index, data[cls.HEADER.size:])
+        log.ticks = ticks
+        log.score = score
+        for tick, _, _ in log.events():
+            log.last_tick = tick
+        return log
+
+
+def zobrist_keys(grid_count):
+    # Fixed keys per board size, so hashes agree between processes and runs: one
+    # per plane entry, then per direction, clamped pending growth, length
+    # (0..cells) and tail cell
+    keys = ZOBRIST_KEYS.get(grid_count)
+    if keys is None:
+        rng = random.Random(f'zobrist-{grid_count}')
+        cells = grid_count * grid_count
+        count = OBS_CHANNELS * cells + len(DIRECTIONS) + GROWTH_KEYS + cells + 1 + cells
+        keys = array('Q', (rng.getrandbits(64) for _ in range(count)))
+        ZOBRIST_KEYS[grid_count] = keys
+    return keys
+
+
+class Observation:
+    # Board planes and scalar features for learning agents. The simulation writes
+    # every change into the planes as it happens, so reading them each tick costs
+    # nothing; `planes[channel * cells + x * grid_count + y]` is 1 where the
+    # channel's object is. arrays() wraps the buffers in NumPy views once.
+    #
+    # With hashing on, `hash` is the XOR of the Zobrist keys of every set plane
+    # entry, updated by set() whenever an entry flips, and of the keys of the
+    # snake's direction, pending growth, length and tail cell, swapped by
+    # mix_snake() for the ones that changed. The body planes hold cells, not
+    # order, so the tail key tells apart coils over the same cells.
+    def __init__(self, grid_count, hashing=False):
+        self.grid_count = grid_count
+        self.cells = grid_count * grid_count
+        self.planes = bytearray(OBS_CHANNELS * self.cells)
+        self.features = array('i', [0]) * len(OBS_FEATURES)
+        self.views = None
+        self.keys = zobrist_keys(grid_count) if hashing else None
+        self.hash = 0
+        self.snake_keys = ()  # Indices of the snake keys in `hash`
+
+    def set(self, channel, pos, value):
+        index = channel * self.cells + pos[0] * self.grid_count + pos[1]
+        if self.keys is not None and self.planes[index] != value:
+            self.hash ^= self.keys[index]
+        self.planes[index] = value
+
+    def set_entries(self, start, stop):
+        # Indices of the set entries in planes[start:stop]
+        planes = self.planes
+        index = planes.find(1, start, stop)
+        while index >= 0:
+            yield index
+            index = planes.find(1, index + 1, stop)
+
+    def clear(self, first, last):
+        # Zero planes first..last - 1
+        start = first * self.cells
+        stop = last * self.cells
+        if self.keys is not None and stop - start == len(self.planes):
+            self.hash = 0
+            self.snake_keys = ()
+        elif self.keys is not None:
+            for index in self.set_entries(start, stop):
+                self.hash ^= self.keys[index]
+        self.planes[start:stop] = bytes(stop - start)
+
+    def enable_hashing(self):
+        self.keys = zobrist_keys(self.grid_count)
+        self.hash = 0
+        self.snake_keys = ()
+        for index in self.set_entries(0, len(self.planes)):
+            self.hash ^= self.keys[index]
+
+    def mix_snake(self, snake):
+        # Bring the snake keys in `hash` up to date with its direction, pending
+        # growth, length and tail
+        cells = self.cells
+        growth = OBS_CHANNELS * cells + len(DIRECTIONS)
+        length = growth + GROWTH_KEYS
+        tail_x, tail_y = snake.positions[-1]
+        state = (OBS_CHANNELS * cells + DIRECTIONS.index(snake.direction),
+                 growth + min(snake.growth_pending, GROWTH_KEYS - 1),
+                 length + min(snake.length, cells),
+                 length + cells + 1 + tail_x * self.grid_count + tail_y)
+        keys = self.keys
+        if not self.snake_keys:
+            for index in state:
+                self.hash ^= keys[index]
+        else:
+            for old, new in zip(self.snake_keys, state):
+                if old != new:
+                    self.hash ^= keys[old] ^ keys[new]
+        self.snake_keys = state
+
+    def fill_snake(self, snake):
+        # Redraw the body and head planes from scratch
+        self.clear(OBS_BODY, OBS_HEAD + 1)
+        for pos in snake.positions:
+            self.set(OBS_BODY, pos, 1)
+        if snake.positions:
+            self.set(OBS_HEAD, snake.positions[0], 1)
+
+    def fill(self, game):
+        # Redraw every plane from the game state (new games and restores)
+        self.clear(0, OBS_CHANNELS)
+        self.fill_snake(game.snake)
+        for position, fruit_type in game.food.positions:
+            self.set(FRUIT_PLANES[fruit_type], position, 1)
+        for wall_pos in game.maze_walls:
+            self.set(OBS_WALL, wall_pos, 1)
+        for portal in game.portals:
+            self.set(OBS_PORTAL_IN, portal.start_pos, 1)
+            self.set(OBS_PORTAL_OUT, portal.end_pos, 1)
+
+    def update_features(self, game):
+        snake = game.snake
+        features = self.features
+        features[0], features[1] = snake.direction
+        features[2] = snake.score
+        features[3] = snake.evolution_stage
+        features[4] = snake.speed_effect_timer
+        features[5] = snake.speed_reduction_timer
+
+    def arrays(self):
+        # (channels, x, y) uint8 planes and int32 features sharing these buffers
+        if self.views is None:
+            import numpy as np
+            planes = np.frombuffer(self.planes, dtype=np.uint8)
+            planes = planes.reshape(OBS_CHANNELS, self.grid_count, self.grid_count)
+            self.views = planes, np.frombuffer(self.features, dtype=np.int32)
+        return self.views
+
+
+class Simulation:
+    # Subclasses (e.g. the pygame front end) swap in their own entity classes
+    snake_class = Snake
+    food_class = Food
+    portal_class = Portal
+
+    def __init__(self, config=None, seed=None):
+        self.config = config if config is not None else DEFAULT_CONFIG
+        self.observation = None  # Observation buffers, created by the first observe()
+        self.free_cells = FreeCells(self.config.grid_count)
+        self.maze_walls = set()
+        self.portals = []
+        self.high_score = 0
+        self.game_over = False
+        self.ticks = 0
+        self.maze_update_timer = self.config.fps * 15
+        self.portal_spawn_timer = 0
+        self.portal_spawn_interval = self.config.fps * 10
+        self.speed_levels = list(SPEED_LEVELS)  # Cells per second for each level
+        self.current_speed_index = DEFAULT_SPEED_INDEX  # 0=Slow, 1=Normal, 2=Fast
+        self.reseed(seed)
+        self.snake = self.snake_class(self)
+        self.food = self.food_class(self)
+
+    def reseed(self, seed=None):
+        # All gameplay randomness comes from this generator, so a seed and the
+        # input log reproduce a game exactly. Cosmetic effects use their own.
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+        self.input_log = InputLog(self.seed, self.config, self.current_speed_index)
+
+    def reset(self, seed=None, config=None):
+        # Start a new game, optionally under a different config
+        if config is not None:
+            self.config = config
+            self.portal_spawn_interval = config.fps * 10
+        self.reseed(seed)
+        self.free_cells = FreeCells(self.config.grid_count)
+        if self.observation is not None and self.observation.grid_count != self.config.grid_count:
+            self.observation = Observation(self.config.grid_count, self.observation.keys is not None)
+        self.maze_walls = set()
+        self.portals = []
+        self.game_over = False
+        self.ticks = 0
+        self.portal_spawn_timer = 0
+        self.snake = self.snake_class(self)
+        self.food = self.food_class(self)
+
+        # Initialize maze if maze mode is enabled
+        if self.config.settings['maze_mode']:
+            self.generate_maze()
+            self.maze_update_timer = self.config.fps * 15  # Regenerate maze every 15 seconds
+
+        # Initialize portals if portal mode is enabled
+        if self.config.settings['portal_mode']:
+            self.generate_portals()
+
+        if self.observation is not None:
+            self.observation.fill(self)
+
+    def observe(self):
+        # Board planes and features as NumPy arrays: (OBS_CHANNELS, x, y) uint8
+        # and OBS_FEATURES int32. The same arrays are returned every time and
+        # kept current as the game runs (until the board size changes), so a
+        # trainer can hold on to them and read them each tick.
+        if self.observation is None:
+            self.observation = Observation(self.config.grid_count)
+            self.observation.fill(self)
+        self.observation.update_features(self)
+        return self.observation.arrays()
+
+    def state_hash(self):
+        # 64-bit Zobrist hash of the board (body, head, food and its types, walls,
+        # portals) and the snake's direction, length, pending growth and tail. The
+        # board part is kept up to date incrementally once this has been called,
+        # and the snake keys are swapped here for the fields that changed.
+        if self.observation is None:
+            self.observation = Observation(self.config.grid_count, hashing=True)
+            self.observation.fill(self)
+        elif self.observation.keys is None:
+            self.observation.enable_hashing()
+        self.observation.mix_snake(self.snake)
+        return self.observation.hash
+
+    def snapshot(self, out=None):
+        # Pack the whole game state into a compact binary snapshot. Pass the
+        # bytearray returned by an earlier call as `out` to reuse its buffer.
+        snake = self.snake
+        free_cells = self.free_cells
+        _, rng_state, gauss_next = self.rng.getstate()
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, free_cells.grid_count, self.config.settings_mask,
+            self.ticks, self.game_over, self.high_score, self.maze_update_timer,
+            self.portal_spawn_timer, self.current_speed_index, self.seed,
+            DIRECTIONS.index(snake.direction), snake.length, snake.growth_pending,
+            snake.speed_multiplier, snake.speed_effect_timer, snake.speed_reduction_timer,
+            snake.speed, snake.rainbow_offset, snake.evolution_stage, snake.score,
+            snake.move_credit, snake.moves_last, snake.ticks_since_move, snake.tick_rate,
+            *snake.color, *snake.head_color,
+            len(snake.positions), len(snake.input_queue), len(snake.trail),
+            len(self.food.positions), len(self.maze_walls), len(self.portals),
+            len(free_cells), gauss_next is not None, gauss_next or 0.0,
+            self.config.fps, DEATH_CAUSES.index(snake.death_cause),
+            self.input_log.speed_index, self.input_log.last_tick, len(self.input_log.data))
+
+        if out is None:
+            out = bytearray()
+        else:
+            del out[:]
+        out += header
+        out += bytes(chain.from_iterable(snake.positions))
+        out += bytes(DIRECTIONS.index(direction) for direction in snake.input_queue)
+        out += bytes(chain.from_iterable(snake.trail))
+        for (x, y), fruit_type in self.food.positions:
+            out += bytes((x, y, FRUIT_NAMES.index(fruit_type)))
+        out += bytes(chain.from_iterable(sorted(self.maze_walls)))  # Same bytes for the same walls
+        for portal in self.portals:
+            out += PORTAL_RECORD.pack(*portal.start_pos, *portal.end_pos, portal.lifetime)
+        out += free_cells.cells
+        out += free_cells.slots
+        out += free_cells.blockers
+        out += snake.occupancy
+        out += RNG_STATE.pack(*rng_state)
+        out += self.input_log.data
+        return out
+
+    def restore(self, data):
+        # Load a snapshot taken by snapshot(), reusing the existing snake, food
+        # and free cell objects. The snapshot must come from a game with the same
+        # board size, tick rate and settings. The input log picks up where the
+        # snapshot's left off, so the restored game still replays from its seed.
+        fields = SNAPSHOT_HEADER.unpack_from(data)
+        if fields[0] != SNAPSHOT_MAGIC or fields[1] != SNAPSHOT_VERSION:
+            raise ValueError("not a Snake Evolution snapshot")
+        if (fields[2] != self.config.grid_count or fields[3] != self.config.settings_mask
+                or fields[40] != self.config.fps):
+            raise ValueError("snapshot was taken with a different board size, FPS or settings")
+        (self.ticks, game_over, self.high_score, self.maze_update_timer,
+         self.portal_spawn_timer, self.current_speed_index, self.seed) = fields[4:11]
+        self.game_over = bool(game_over)
+        snake = self.snake
+        (direction, snake.length, snake.growth_pending, snake.speed_multiplier,
+         snake.speed_effect_timer, snake.speed_reduction_timer, snake.speed,
+         snake.rainbow_offset, snake.evolution_stage, snake.score, snake.move_credit,
+         snake.moves_last, snake.ticks_since_move, snake.tick_rate) = fields[11:25]
+        snake.direction = DIRECTIONS[direction]
+        snake.color = fields[25:28]
+        snake.head_color = fields[28:31]
+        (body, queued, trail, food, walls, portals, free,
+         has_gauss, gauss_next) = fields[31:40]
+        snake.death_cause = DEATH_CAUSES[fields[41]]
+        log_speed_index, log_last_tick, log_size = fields[42:]
+
+        data = memoryview(data)
+        offset = SNAPSHOT_HEADER.size
+
+        def take(size):
+            nonlocal offset
+            offset += size
+            return data[offset - size:offset]
+
+        def cells(count):
+            coords = iter(take(count * 2))
+            return zip(coords, coords)
+
+        def values(typecode, count):
+            items = array(typecode)
+            items.frombytes(take(count * items.itemsize))
+            return items
+
+        snake.positions.clear()
+        snake.positions.extend(cells(body))
+        snake.input_queue.clear()
+        snake.input_queue.extend(DIRECTIONS[index] for index in take(queued))
+        snake.trail.clear()
+        snake.trail.extend(cells(trail))
+        records = iter(take(food * 3))
+        self.food.positions = [((x, y), FRUIT_NAMES[index]) for x, y, index in zip(records, records, records)]
+        self.maze_walls = set(cells(walls))
+        self.portals = []
+        for _ in range(portals):
+            start_x, start_y, end_x, end_y, lifetime = PORTAL_RECORD.unpack(take(PORTAL_RECORD.size))
+            portal = self.portal_class((start_x, start_y), (end_x, end_y))
+            portal.lifetime = lifetime
+            self.portals.append(portal)
+
+        free_cells = self.free_cells
+        size = free_cells.grid_count * free_cells.grid_count
+        free_cells.cells = values('H', free)
+        free_cells.slots = values('H', size)
+        free_cells.blockers = values('H', size)
+        snake.occupancy = values('H', size)
+        rng_state = RNG_STATE.unpack(take(RNG_STATE.size))
+        self.rng.setstate((3, rng_state, gauss_next if has_gauss else None))
+        log = InputLog(self.seed, self.config, log_speed_index, take(log_size))
+        log.last_tick = log_last_tick
+        log.ticks = self.ticks
+        log.score = snake.score
+        self.input_log = log
+        if self.observation is not None:
+            self.observation.fill(self)
+
+    # Presentation hooks; the headless simulation ignores them
+    def play_sound(self, sound_name):
+        pass
+
+    def create_particles(self, position=None, count=10, color=None):
+        pass
+
+    def create_evolution_particles(self):
+        pass
+
+    def create_snow(self, count):
+        pass
+
+    def queue_turn(self, direction):
+        # Player input: buffer a turn for the snake and log it for replays
+        if not self.snake.queue_turn(direction):
+            return False
+        self.input_log.record(self.ticks, direction)
+        return True
+
+    def plan_moves(self, moves):
+        # AI input: replace the snake's queued turns with the first moves of a
+        # planned route, straight ahead included, logged for replays. The moves
+        # are absolute directions, so reverse controls don't apply.
+        moves = list(moves[:INPUT_QUEUE_SIZE])
+        queue = self.snake.input_queue
+        if not moves or list(queue) == moves:
+            return  # Nothing to do, and nothing to log
+        queue.clear()
+        queue.extend(moves)
+        for i, direction in enumerate(moves):
+            self.input_log.record(self.ticks, direction, PLAN_START if i == 0 else PLAN_STEP)
+
+    def step(self):
+        # Advance the simulation by one tick; returns False once the game is over
+        if self.game_over:
+            return False
+
+        self.ticks += 1
+        self.input_log.ticks = self.ticks
+
+        # Move the snake as many cells as its rate has earned this tick, checking
+        # collisions (both with portals and food) after every cell
+        self.snake.update_effects()
+        for _ in range(self.snake.scheduled_moves()):
+            if not self.snake.update():
+                self.game_over = True
+                self.high_score = max(self.high_score, self.snake.score)
+                self.input_log.score = self.snake.score
+                self.play_sound('die')
+                return False
+            self.check_collisions()
+        self.input_log.score = self.snake.score
+
+        # Age portals and spawn new ones
+        self.update_portals()
+
+        # Handle maze regeneration
+        if self.config.settings['maze_mode']:
+            self.maze_update_timer -= 1
+            if self.maze_update_timer <= 0:
+                self.regenerate_maze()
+                self.maze_update_timer = self.config.fps * 15  # Regenerate maze every 15 seconds
+
+        return True
+
+    def spawn_ice_cream(self):
+        # Spawn 10 ice creams when turning into dragon
+        for _ in range(10):
+            self.food.add_food('ice_cream')
+
+    def set_maze_walls(self, walls):
+        observation = self.observation
+        for wall_pos in self.maze_walls:
+            self.free_cells.unblock(wall_pos)
+            if observation is not None:
+                observation.set(OBS_WALL, wall_pos, 0)
+        self.maze_walls = walls
+        for wall_pos in self.maze_walls:
+            self.free_cells.block(wall_pos)
+            if observation is not None:
+                observation.set(OBS_WALL, wall_pos, 1)
+
+    def generate_maze(self):
+        self.set_maze_walls(set())
+        if not self.config.settings['maze_mode']:
+            return
+        walls = set()
+        grid_count = self.config.grid_count
+
+        # Generate random maze obstacles
+        obstacle_count = int(grid_count * grid_count * 0.05)  # 5% of grid cells
+        snake_positions = set(self.snake.positions)
+        food_positions = set(pos for pos, _ in self.food.positions)
+        forbidden_positions = snake_positions.union(food_positions)
+        for portal in self.portals:
+            forbidden_positions.add(portal.start_pos)
+            forbidden_positions.add(portal.end_pos)
+
+        # Add buffer around snake head to prevent immediate collisions
+        head_pos = self.snake.get_head_position()
+        for dx in range(-2, 3):
+            for dy in range(-2, 3):
+                buffer_pos = ((head_pos[0] + dx) % grid_count,
+                              (head_pos[1] + dy) % grid_count)
+                forbidden_positions.add(buffer_pos)
+
+        # Generate wall positions
+        for _ in range(obstacle_count):
+            # Find valid wall position
+            for _ in range(100):  # Limit attempts to find valid position
+                wall_pos = (self.rng.randint(0, grid_count-1),
+                            self.rng.randint(0, grid_count-1))
+                if wall_pos not in forbidden_positions and wall_pos not in walls:
+                    walls.add(wall_pos)
+                    forbidden_positions.add(wall_pos)
+                    break
+
+        # Add some connected walls to make it more maze-like
+        for _ in range(obstacle_count // 2):
+            if not walls:
+                break
+
+            # Pick a random existing wall
+            wall = self.rng.choice(tuple(walls))
+
+            # Try to extend it in a random direction
+            directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+            self.rng.shuffle(directions)
+
+            for dx, dy in directions:
+                new_wall = ((wall[0] + dx) % grid_count,
+                            (wall[1] + dy) % grid_count)
+                if new_wall not in forbidden_positions and new_wall not in walls:
+                    walls.add(new_wall)
+                    forbidden_positions.add(new_wall)
+                    break
+
+        self.set_maze_walls(walls)
+
+    def regenerate_maze(self):
+        self.generate_maze()
+
+    def generate_portals(self):
+        # Only create portals if portal mode is enabled
+        if not self.config.settings['portal_mode']:
+            return
+
+        # Clear existing portals
+        self.clear_portals()
+
+        # Create a new portal
+        self.create_portal()
+
+    def update_portals(self):
+        # Only handle portals if portal mode is enabled
+        if not self.config.settings['portal_mode']:
+            self.clear_portals()  # Clear portals if mode is disabled
+            return
+
+        # Update existing portals
+        for portal in self.portals[:]:
+            portal.update()
+            if portal.lifetime <= 0:
+                self.remove_portal(portal)
+
+        # Spawn new portals periodically
+        self.portal_spawn_timer += 1
+        if self.portal_spawn_timer >= self.portal_spawn_interval and len(self.portals) < 2:
+            self.portal_spawn_timer = 0
+            self.create_portal()
+
+    def add_portal(self, portal):
+        self.portals.append(portal)
+        self.free_cells.block(portal.start_pos)
+        self.free_cells.block(portal.end_pos)
+        if self.observation is not None:
+            self.observation.set(OBS_PORTAL_IN, portal.start_pos, 1)
+            self.observation.set(OBS_PORTAL_OUT, portal.end_pos, 1)
+
+    def remove_portal(self, portal):
+        self.portals.remove(portal)
+        self.free_cells.unblock(portal.start_pos)
+        self.free_cells.unblock(portal.end_pos)
+        if self.observation is not None:
+            self.observation.set(OBS_PORTAL_IN, portal.start_pos, 0)
+            self.observation.set(OBS_PORTAL_OUT, portal.end_pos, 0)
+
+    def clear_portals(self):
+        for portal in self.portals[:]:
+            self.remove_portal(portal)
+
+    def create_portal(self):
+        # Ensure we have at least 2 free cells for entrance and exit
+        if len(self.free_cells) < 2:
+            return
+
+        # Pick two distinct random free cells for the portal
+        start_pos = self.free_cells.sample(self.rng)
+        self.free_cells.block(start_pos)
+        end_pos = self.free_cells.sample(self.rng)
+        self.free_cells.unblock(start_pos)
+
+        # Create the portal
+        self.add_portal(self.portal_class(start_pos, end_pos))
+        self.play_sound('portal')
+
+    def check_collisions(self):
+        # Check portal collisions
+        if self.portals and self.config.settings['portal_mode']:
+            head_pos = self.snake.get_head_position()
+            for portal in self.portals:
+                if head_pos == portal.start_pos:
+                    # Create particles at portal location
+                    self.create_particles(portal.start_pos, 15, portal.color)
+
+                    # Update snake head position to the portal exit
+                    self.snake.move_head(portal.end_pos)
+                    self.play_sound('portal')
+                    return True
+
+        # Check food collisions
+        head_pos = self.snake.get_head_position()
+        to_remove = []
+        score_before = self.snake.score
+
+        for i, (position, fruit_type) in enumerate(self.food.positions):
+            if head_pos == position:
+                # Mark this food item for removal
+                to_remove.append(i)
+
+                # Points and growth come from the config's fruit table; the score
+                # never drops below 0
+                fruit = self.config.fruits[fruit_type]
+                self.snake.score = max(0, self.snake.score + fruit['points'])
+                self.snake.growth_pending += fruit['growth']
+
+                # Handle different fruit types
+                if fruit_type != 'poison':
+                    # Create particles based on fruit color
+                    self.create_particles(position, 10, fruit['color'])
+
+                    # Kiwi - speed increase
+                    if fruit_type == 'kiwi':
+                        self.snake.speed_multiplier = 2.0
+                        self.snake.speed_effect_timer = self.config.fps * 5  # 5 seconds
+                    # Ice cream - snow effect
+                    elif fruit_type == 'ice_cream':
+                        self.create_snow(50)
+
+                    self.play_sound('eat')
+                else:
+                    # Poison - negative effect
+                    self.snake.apply_speed_reduction(self.config.fps * 3)  # 3 seconds of reduced speed
+                    self.play_sound('poison')
+
+        # Remove eaten food items
+        if to_remove:
+            # Remove in reverse order to avoid index shifts
+            for i in sorted(to_remove, reverse=True):
+                self.food.remove(i)
+
+            # Evolve when the score crosses a stage threshold
+            if self.snake.score != score_before and self.snake.check_evolution():
+                self.create_evolution_particles()
+                self.play_sound('evolve')
+                if self.snake.evolution_stage == self.config.dragon_stage:
+                    self.spawn_ice_cream()
+
+            # Spawn new food
+            self.food.update()
+
+        return False
+
+
+def replay(log, game=None):
+    # Re-run a recorded game headlessly from its seed and inputs; returns the
+    # simulation after the last recorded tick. A given game keeps its fruit and
+    # evolution tables but takes the log's board size and settings.
+    game = game if game is not None else Simulation()
+    game.current_speed_index = log.speed_index
+    game.reset(log.seed, log.game_config(game.config))
+    events = log.events()
+    pending = next(events, None)
+    while game.ticks < log.ticks and not game.game_over:
+        while pending is not None and pending[0] == game.ticks:
+            tick, direction, kind = pending
+            if kind == TURN:
+                game.queue_turn(direction)
+            elif kind == PLAN_START:
+                # The rest of the route follows as PLAN_STEP events
+                route = [direction]
+                pending = next(events, None)
+                while pending is not None and pending[0] == tick and pending[2] == PLAN_STEP:
+                    route.append(pending[1])
+                    pending = next(events, None)
+                game.plan_moves(route)
+                continue
+            pending = next(events, None)
+        game.step()
+    return game
@@ -0,0 +1,281 @@
+"""Neuroevolution trainer: a genetic algorithm that evolves small neural-network
+snake controllers. Every generation the population plays batched headless games
+(snake_vec.VectorEnv) spread over a process pool, with one batched matrix
+multiply per network layer per tick, and is checkpointed to disk.
+
+Run `python snake_evolve.py --help` for options.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from snake_core import DEFAULT_CONFIG, DIRECTIONS
+from snake_tournament import parse_settings
+from snake_vec import DX, DY, VectorEnv, fruit_code
+
+# Network inputs: danger ahead, to the left and to the right, the nearest
+# fruit's offset forward and to the left (in board sides), and a bias
+INPUTS = 6
+OUTPUTS = 3  # Go straight, turn left, turn right
+HIDDEN = 16
+
+# Turns by DIRECTIONS index; y grows downward, so left of RIGHT is UP
+LEFT_OF = np.array([DIRECTIONS.index((dy, -dx)) for dx, dy in DIRECTIONS], dtype=np.int8)
+RIGHT_OF = np.array([DIRECTIONS.index((-dy, dx)) for dx, dy in DIRECTIONS], dtype=np.int8)
+POISON = fruit_code('poison')
+
+# Fitness: points, plus a bonus per evolution stage reached and a little per
+# tick survived so early generations that never eat still get ranked
+STAGE_BONUS = 10
+SURVIVAL_BONUS = 0.01
+HUNGER_TICKS = 150  # A game ends after this many ticks without scoring
+
+POPULATION = 1000
+ELITE_FRACTION = 0.02  # Best genomes copied unchanged into the next generation
+TOURNAMENT_SIZE = 3
+MUTATION_RATE = 0.1  # Chance of each weight being perturbed
+MUTATION_SIGMA = 0.3
+
+
+def genome_size(hidden=HIDDEN):
+    return INPUTS * hidden + hidden * OUTPUTS + OUTPUTS
+
+
+def unpack(genomes, hidden=HIDDEN):
+    # Views of a (genomes, genome_size) matrix as per-genome layer weights
+    count = len(genomes)
+    split = INPUTS * hidden
+    w1 = genomes[:, :split].reshape(count, INPUTS, hidden)
+    w2 = genomes[:, split:-OUTPUTS].reshape(count, hidden, OUTPUTS)
+    return w1, w2, genomes[:, -OUTPUTS:]
+
+
+def forward(inputs, w1, w2, b2):
+    # Turn (0 straight, 1 left, 2 right) each genome picks for its own row of inputs
+    hidden = np.tanh(np.matmul(inputs[:, None, :], w1))
+    return (np.matmul(hidden, w2)[:, 0] + b2).argmax(axis=1)
+
+
+def turn_actions(direction, turns):
+    # DIRECTIONS index for each turn choice, given each snake's heading
+    direction = direction.astype(np.intp)
+    return np.choose(turns, (direction, LEFT_OF[direction], RIGHT_OF[direction])).astype(np.int8)
+
+
+def flat_fruit(food_flat):
+    # Indices of the nonzero bytes of a food board. Boards are almost all empty,
+    # so scan them eight cells at a time and only look inside nonzero words.
+    if food_flat.nbytes % 8:
+        return np.flatnonzero(food_flat)
+    words = np.flatnonzero(food_flat.view(np.uint64))
+    word, byte = np.nonzero(food_flat.reshape(-1, 8)[words])
+    return words[word] * 8 + byte
+
+
+def vector_inputs(env, out):
+    # Fill `out` (games, INPUTS) with network inputs for every game of a VectorEnv
+    grid_count = env.grid_count
+    games = np.arange(env.num_games)
+    direction = env.direction.astype(np.intp)
+    headings = np.stack((direction, LEFT_OF[direction], RIGHT_OF[direction]), axis=1)
+    x = env.head_x[:, None] + DX[headings]
+    y = env.head_y[:, None] + DY[headings]
+    if env.wrap_around:
+        x %= grid_count
+        y %= grid_count
+        blocked = np.zeros(x.shape, dtype=bool)
+    else:
+        blocked = (x < 0) | (x >= grid_count) | (y < 0) | (y >= grid_count)
+        np.clip(x, 0, grid_count - 1, out=x)
+        np.clip(y, 0, grid_count - 1, out=y)
+    flat = games[:, None] * env.cells + x * grid_count + y
+    if env.maze_mode:
+        blocked |= env.walls_flat[flat]
+    if not env.ghost_mode:
+        blocked |= env.occupancy_flat[flat] > 0
+    out[:, :3] = blocked
+
+    # Nearest fruit other than poison by Manhattan distance; boards hold only a
+    # few, so work on the list of fruit cells rather than whole boards
+    fruit = flat_fruit(env.food_flat)
+    fruit = fruit[env.food_flat[fruit] != POISON]
+    owner, cell = np.divmod(fruit, env.cells)
+    dx = cell // grid_count - env.head_x[owner]
+    dy = cell % grid_count - env.head_y[owner]
+    order = np.lexsort((np.abs(dx) + np.abs(dy), owner))
+    first = order[np.r_[True, owner[order][1:] != owner[order][:-1]]] if len(order) else order
+    target = owner[first]
+    hx = DX[direction[target]]
+    hy = DY[direction[target]]
+    out[:, 3:5] = 0
+    out[target, 3] = (dx[first] * hx + dy[first] * hy) / grid_count
+    out[target, 4] = (dx[first] * hy - dy[first] * hx) / grid_count
+    out[:, 5] = 1
+
+
+def evaluate(job):
+    # Worker: play `episodes` games per genome in one VectorEnv and return each
+    # genome's mean fitness, score, survival ticks and evolution stage index
+    genomes, hidden, config, seed, episodes, max_ticks = job
+    count = len(genomes)
+    games = count * episodes
+    w1, w2, b2 = unpack(np.repeat(genomes, episodes, axis=0), hidden)
+    env = VectorEnv(games, config, seed, autoreset=False)
+    inputs = np.zeros((games, INPUTS), dtype=np.float32)
+    running = np.ones(games, dtype=bool)
+    last_scored = np.zeros(games, dtype=np.int64)
+    score = np.zeros(games, dtype=np.int64)
+    ticks = np.zeros(games, dtype=np.int64)
+    stage = np.zeros(games, dtype=np.int64)
+    for tick in range(1, max_ticks + 1):
+        vector_inputs(env, inputs)
+        actions = turn_actions(env.direction, forward(inputs, w1, w2, b2))
+        actions[~running] = -1
+        rewards, done = env.step(actions)
+        last_scored[rewards != 0] = tick
+        ended = np.flatnonzero(running & (done | (tick - last_scored >= HUNGER_TICKS)))
+        if tick == max_ticks:
+            ended = np.flatnonzero(running)
+        if len(ended):
+            score[ended] = env.score[ended]
+            ticks[ended] = tick
+            stage[ended] = np.searchsorted(env.thresholds, env.stage[ended])
+            running[ended] = False
+            if not running.any():
+                break
+
+    fitness = score + STAGE_BONUS * stage + SURVIVAL_BONUS * ticks
+    return tuple(values.reshape(count, episodes).mean(axis=1) for values in (fitness, score, ticks, stage))
+
+
+def next_generation(population, fitness, rng, elite=None):
+    # Elites survive as they are; the rest are uniform crossovers of two
+    # tournament-selected parents with gaussian mutations
+    size = len(population)
+    elite = max(1, int(size * ELITE_FRACTION)) if elite is None else elite
+    elites = population[np.argsort(fitness)[::-1][:elite]]
+    children = size - elite
+    contenders = rng.integers(size, size=(2, children, TOURNAMENT_SIZE))
+    parents = np.take_along_axis(contenders, fitness[contenders].argmax(axis=2)[..., None], axis=2)[..., 0]
+    mix = rng.random((children, population.shape[1])) < 0.5
+    offspring = np.where(mix, population[parents[0]], population[parents[1]])
+    mutate = rng.random(offspring.shape) < MUTATION_RATE
+    offspring += mutate * rng.normal(0, MUTATION_SIGMA, offspring.shape).astype(np.float32)
+    return np.concatenate((elites, offspring))
+
+
+def save_checkpoint(path, generation, population, fitness, hidden, seed):
+    # Write through a temporary file so an interrupted save keeps the old checkpoint
+    temp = path + '.tmp'
+    with open(temp, 'wb') as file:
+        np.savez(file, generation=generation, population=population, fitness=fitness,
+                 hidden=hidden, seed=seed)
+    os.replace(temp, path)
+
+
+def load_checkpoint(path):
+    with np.load(path) as data:
+        return (int(data['generation']), data['population'], data['fitness'],
+                int(data['hidden']), int(data['seed']))
+
+
+class NeuralController:
+    # Steers a Simulation's snake with one evolved genome, from the same inputs
+    # the trainer computes on VectorEnv boards
+    def __init__(self, game, genome, hidden=HIDDEN):
+        self.game = game
+        self.weights = unpack(np.asarray(genome, dtype=np.float32)[None], hidden)
+        self.inputs = np.zeros((1, INPUTS), dtype=np.float32)
+
+    @classmethod
+    def from_checkpoint(cls, game, path):
+        # The fittest genome of a saved generation
+        _, population, fitness, hidden, _ = load_checkpoint(path)
+        return cls(game, population[fitness.argmax()], hidden)
+
+    def blocked(self, pos):
+        game = self.game
+        settings = game.config.settings
+        grid_count = game.config.grid_count
+        x, y = pos
+        if settings['wrap_around']:
+            pos = (x % grid_count, y % grid_count)
+        elif not (0 <= x < grid_count and 0 <= y < grid_count):
+            return True
+        if settings['maze_mode'] and pos in game.maze_walls:
+            return True
+        return not settings['ghost_mode'] and game.snake.occupies(pos)
+
+    def steer(self):
+        game = self.game
+        snake = game.snake
+        if snake.input_queue:
+            return
+        hx, hy = snake.direction
+        x, y = snake.positions[0]
+        inputs = self.inputs[0]
+        for i, (dx, dy) in enumerate(((hx, hy), (hy, -hx), (-hy, hx))):
+            inputs[i] = self.blocked((x + dx, y + dy))
+        fruits = [pos for pos, fruit_type in game.food.positions if fruit_type != 'poison']
+        inputs[3:5] = 0
+        if fruits:
+            fx, fy = min(fruits, key=lambda pos: abs(pos[0] - x) + abs(pos[1] - y))
+            grid_count = game.config.grid_count
+            inputs[3] = ((fx - x) * hx + (fy - y) * hy) / grid_count
+            inputs[4] = ((fx - x) * hy - (fy - y) * hx) / grid_count
+        inputs[5] = 1
+        turn = forward(self.inputs, *self.weights)[0]
+        if turn:
+            game.plan_moves([(hy, -hx) if turn == 1 else (-hy, hx)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolve neural-network snake controllers "
+                                                 "with a genetic algorithm.")
+    parser.add_argument('--population', type=int, default=POPULATION)
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--episodes', type=int, default=2, help="games per genome and generation")
+    parser.add_argument('--max-ticks', type=int, default=1000, help="tick limit per game")
+    parser.add_argument('--hidden', type=int, default=HIDDEN, help="hidden layer size")
+    parser.add_argument('--settings', type=parse_settings, default=(),
+                        help="'+'-joined settings to turn on, or off with name=0 (default: none)")
+    parser.add_argument('--grid-count', type=int, default=DEFAULT_CONFIG.grid_count)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--checkpoint', default='evolution.npz',
+                        help="population file written after every generation")
+    parser.add_argument('--resume', action='store_true', help="continue from the checkpoint")
+    args = parser.parse_args()
+
+    config = DEFAULT_CONFIG.replace(grid_count=args.grid_count).with_settings(**dict(args.settings))
+    hidden, seed = args.hidden, args.seed
+    if args.resume:
+        generation, population, fitness, hidden, seed = load_checkpoint(args.checkpoint)
+        generation += 1
+        population = next_generation(population, fitness, np.random.default_rng([seed, generation]))
+    else:
+        generation = 0
+        rng = np.random.default_rng([seed, generation])
+        population = rng.normal(0, 1, (args.population, genome_size(hidden))).astype(np.float32)
+
+    print(f"{'gen':>5} {'best':>9} {'mean':>9} {'score':>7} {'ticks':>7} {'stage':>6} {'secs':>6}")
+    with multiprocessing.Pool(args.workers) as pool:
+        for generation in range(generation, generation + args.generations):
+            start = time.perf_counter()
+            chunks = np.array_split(population, args.workers)
+            jobs = [(chunk, hidden, config, [seed, generation, i], args.episodes, args.max_ticks)
+                    for i, chunk in enumerate(chunks) if len(chunk)]
+            fitness, score, ticks, stage = (np.concatenate(values) for values in zip(*pool.map(evaluate, jobs)))
+            save_checkpoint(args.checkpoint, generation, population, fitness, hidden, seed)
+            best = fitness.argmax()
+            print(f"{generation:>5} {fitness[best]:>9.2f} {fitness.mean():>9.2f} {score[best]:>7.1f} "
+                  f"{ticks[best]:>7.0f} {stage[best]:>6.1f} {time.perf_counter() - start:>6.2f}")
+            rng = np.random.default_rng([seed, generation + 1])
+            population = next_generation(population, fitness, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,17 +3,15 @@ import random
 import sys
 import math
 import os
-import colorsys
 import time
+import numpy as np
 from pygame import gfxdraw
 
-# Initialize Pygame
-pygame.init()
-
-# Initialize pygame mixer with specific settings
-pygame.mixer.quit()  # Quit any existing mixer
-pygame.mixer.init(44100, -16, 2, 2048)  # Increased buffer size for better sound handling
-pygame.mixer.set_num_channels(8)  # Ensure we have enough channels
+import snake_core
+from snake_core import GRID_SIZE, DEFAULT_CONFIG, Simulation
+from snake_particles import ParticleSystem, SPARK, SNOW, PORTAL
+from snake_sprites import ALPHA_CIRCLES, TEXT
+from snake_ai import Autopilot, HamiltonianSolver
 
 # Initialize global sound variables
 SOUND_ENABLED = True
@@ -54,10 +52,6 @@ def initialize_sounds():
         print(f"Error initializing sounds: {e}")
         SOUND_ENABLED = False
 
-# Constants
-WINDOW_SIZE = 720
-GRID_SIZE = 20
-GRID_COUNT = WINDOW_SIZE // GRID_SIZE
 
 # Colors
 BLACK = (0, 0, 0)
@@ -75,40 +69,34 @@ BUTTON_COLOR = (26, 115, 232)  # Google blue
 BUTTON_HOVER_COLOR = (66, 133, 244)  # Lighter blue when hovering
 BUTTON_TEXT_COLOR = (255, 255, 255)  # White text
 
-# Screen dimensions
-SCREEN_WIDTH = WINDOW_SIZE
-SCREEN_HEIGHT = WINDOW_SIZE
-
-# Frame rate
-FPS = 10
-
-# Fruits dictionary with colors and point values
-FRUITS = {
-    'apple': {'color': (255, 0, 0), 'points': 1},
-    'orange': {'color': (255, 165, 0), 'points': 1},
-    'banana': {'color': (255, 255, 0), 'points': 1},
-    'berry': {'color': (138, 43, 226), 'points': 3},
-    'kiwi': {'color': (75, 160, 0), 'points': 2},
-    'ice_cream': {'color': (200, 200, 255), 'points': 2},
-    'poison': {'color': (0, 255, 0), 'points': -2}
-}
-
-# Game settings with defaults
-GAME_SETTINGS = {
-    'reverse_controls': False,
-    'ghost_mode': False,
-    'maze_mode': False,
-    'rainbow_snake': False,
-    'big_food': False,
-    'portal_mode': False,
-    'wrap_around': True,
-    'double_food': False,
-    'infinite_length': False,
-    'speed_increase': False
-}
+# Rendering runs at the display refresh rate, independent of the game tick rate
+DEFAULT_REFRESH_RATE = 60
+MAX_TICKS_PER_FRAME = 5  # Simulation catch-up limit per rendered frame
 
 # Constants
 GRID_COLOR = (240, 240, 240)  # Light grey for grid
+PARTICLE_CAPACITY = 8192  # Hard cap on live particles
+DRAGON_ACCENT_COLOR = (255, 140, 0)  # Orange snout and eye glow
+FOOD_RADIUS = GRID_SIZE // 2 - 2
+BIG_FOOD_SCALE = 1.5  # Fruit sprite scale when big food is enabled
+MAX_DIRTY_RECTS = 256  # Above this many areas drawn last frame, redraw the whole screen
+DIRTY_AREA_LIMIT = 0.1  # Above this fraction of the screen erased and drawn, flip the whole screen
+
+# Arrow keys to movement directions (before reverse controls are applied)
+KEY_DIRECTIONS = {
+    pygame.K_UP: snake_core.UP,
+    pygame.K_DOWN: snake_core.DOWN,
+    pygame.K_LEFT: snake_core.LEFT,
+    pygame.K_RIGHT: snake_core.RIGHT
+}
+
+# Rotation of the dragon head artwork (drawn facing right) for each direction
+HEAD_ANGLES = {
+    snake_core.RIGHT: 0,
+    snake_core.DOWN: 90,
+    snake_core.LEFT: 180,
+    snake_core.UP: 270
+}
 
 # Add new constants
 PARTICLE_COLORS = {
@@ -121,65 +109,18 @@ PARTICLE_COLORS = {
     'ice_cream': [(240, 248, 255), (230, 230, 250)]
 }
 
-# Update evolution stages with more detailed appearances
-EVOLUTION_STAGES = {
-    0: {
-        'color': (24, 128, 56),    # Basic green
-        'head_color': (21, 115, 50),
-        'patterns': []  # Empty list for initial stage
-    },
-    10: {
-        'color': (30, 144, 255),   # Blue stage
-        'head_color': (25, 125, 225),
-        'patterns': ['scales']  # First pattern
-    },
-    15: {
-        'color': (255, 69, 0),     # Fire orange
-        'head_color': (220, 53, 34),
-        'patterns': ['scales', 'fire']  # Add fire effect
-    },
-    20: {
-        'color': (218, 165, 32),   # Golden stage
-        'head_color': (184, 134, 11),
-        'patterns': ['scales', 'fire', 'golden_scales']
-    },
-    30: {
-        'color': (138, 43, 226),   # Purple stage
-        'head_color': (106, 90, 205),
-        'patterns': ['scales', 'fire', 'golden_scales', 'textile']
-    },
-    35: {
-        'color': (255, 215, 0),    # Golden with wings
-        'head_color': (218, 165, 32),
-        'patterns': ['scales', 'fire', 'golden_scales', 'textile', 'wings']
-    },
-    40: {
-        'color': (70, 130, 180),   # Steel blue with feet
-        'head_color': (95, 158, 160),
-        'patterns': ['scales', 'fire', 'golden_scales', 'textile', 'wings', 'feet']
-    },
-    45: {
-        'color': (178, 34, 34),    # Dragon form
-        'head_color': (139, 0, 0),
-        'patterns': ['scales', 'fire', 'golden_scales', 'textile', 'wings', 'feet', 'dragon']
-    }
-}
-
-# Set up the display
-screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
-pygame.display.set_caption('Snake Game')
-clock = pygame.time.Clock()
-
 def draw_gradient_background(surface):
     # Fill with white background
     surface.fill(WHITE)
     
     # Draw subtle grid lines
-    for i in range(0, WINDOW_SIZE, GRID_SIZE):
+    width, height = surface.get_size()
+    for i in range(0, width, GRID_SIZE):
         # Draw vertical lines
-        pygame.draw.line(surface, GRID_COLOR, (i, 0), (i, WINDOW_SIZE))
+        pygame.draw.line(surface, GRID_COLOR, (i, 0), (i, height))
+    for i in range(0, height, GRID_SIZE):
         # Draw horizontal lines
-        pygame.draw.line(surface, GRID_COLOR, (0, i), (WINDOW_SIZE, i))
+        pygame.draw.line(surface, GRID_COLOR, (0, i), (width, i))
 
 def draw_rounded_rectangle(surface, color, rect, radius):
     x, y, width, height = rect
@@ -190,165 +131,165 @@ def draw_rounded_rectangle(surface, color, rect, radius):
     pygame.draw.circle(surface, color, (x + radius, y + height - radius), radius)
     pygame.draw.circle(surface, color, (x + width - radius, y + height - radius), radius)
 
-class Snake:
+def display_format(sprite):
+    # Convert a baked sprite to the display's pixel format for fast blits
+    if pygame.display.get_surface() is not None:
+        return sprite.convert_alpha()
+    return sprite
+
+class Snake(snake_core.Snake):
+    # (evolution stage, head color, direction) -> (sprite, offset), shared by all games
+    head_sprites = {}
+    # (evolution stage, body color) -> rounded body segment, shared by all games
+    segment_sprites = {}
+    ghost_overlay = None  # Semi-transparent white cell drawn over ghost segments
+
     def __init__(self, game):
-        self.game = game  # Store the game reference
-        self.length = 1
-        self.positions = [((GRID_COUNT // 2), (GRID_COUNT // 2))]
-        self.direction = (1, 0)  # Initially move right
-        self.color = (24, 128, 56)  # Google green
-        self.head_color = (21, 115, 50)  # Slightly darker green
-        self.growth_pending = 0
-        self.speed_multiplier = 1.0
-        self.speed_effect_timer = 0
-        self.speed_reduction_timer = 0
-        self.rainbow_offset = 0
-        self.evolution_stage = 0
-        self.score = 0
+        super().__init__(game)
         self.radius = GRID_SIZE // 2 - 1
-        self.speed = 1  # Grid cells per update
         self.glow_factor = 0
         self.glow_increasing = True
-        self.update_colors()  # This will set both color and head_color based on initial stage
-
-    def get_head_position(self):
-        return self.positions[0]
 
-    def update(self):
-        # Handle rainbow snake setting
-        if GAME_SETTINGS['rainbow_snake']:
-            self.rainbow_offset = (self.rainbow_offset + 1) % 360
-            h = (self.rainbow_offset / 360)
-            r, g, b = colorsys.hsv_to_rgb(h, 1.0, 1.0)
-            self.color = (int(r * 255), int(g * 255), int(b * 255))
-            self.head_color = (int(r * 200), int(g * 200), int(b * 200))  # Slightly darker head
-        
-        # Update speed reduction timer
-        if self.speed_reduction_timer > 0:
-            self.speed_reduction_timer -= 1
-            if self.speed_reduction_timer == 0:
-                self.speed = 1  # Restore normal speed
-
-        cur = self.get_head_position()
-        x, y = self.direction
-        new = ((cur[0] + x) % GRID_COUNT, (cur[1] + y) % GRID_COUNT)
-        
-        # Handle wall collision if wrap around is disabled
-        if not GAME_SETTINGS['wrap_around']:
-            if new[0] < 0 or new[0] >= GRID_COUNT or new[1] < 0 or new[1] >= GRID_COUNT:
-                return False
-        
-        # Check for collision with maze walls
-        if hasattr(self.game, 'maze_walls') and new in self.game.maze_walls:
-            return False
-        
-        # Check for self collision (unless ghost mode is enabled)
-        if not GAME_SETTINGS['ghost_mode'] and new in self.positions[3:]:
-            return False
-            
-        self.positions.insert(0, new)
-        
-        # Handle infinite length setting
-        if GAME_SETTINGS['infinite_length']:
-            if len(self.positions) > 3:  # Keep minimum length of 3
-                self.positions.pop()
+    def render(self, screen, alpha=1.0):
+        # Draw snake body `alpha` of the way from the previous tick to the current
+        # one, returning the areas drawn
+        pixels = iter(self.segment_pixels(alpha))
+        head_x, head_y = next(pixels)
+
+        # Head comes pre-rendered for the current stage and direction
+        sprite, offset = self.head_sprite()
+        rects = [screen.blit(sprite, (head_x - offset[0], head_y - offset[1]))]
+
+        # Body segments are pre-rendered rounded rectangles, blitted in one batch
+        segment = self.segment_sprite()
+        if self.game.config.settings['ghost_mode']:
+            # Draw ghost effect over every body segment
+            ghost = self.ghost_sprite()
+            blits = []
+            for pixel in pixels:
+                blits.append((segment, pixel))
+                blits.append((ghost, pixel))
         else:
-            if len(self.positions) > self.length:
-                self.positions.pop()
-
-        if self.growth_pending > 0:
-            self.length += 1
-            self.growth_pending -= 1
-
-        return True
-
-    def reset(self):
-        self.length = 3  # Start with length 3 instead of 1
-        self.positions = [
-            (GRID_COUNT // 2, GRID_COUNT // 2),
-            (GRID_COUNT // 2 - 1, GRID_COUNT // 2),
-            (GRID_COUNT // 2 - 2, GRID_COUNT // 2)
-        ]
-        self.direction = (1, 0)
-        self.score = 0
-
-    def check_evolution(self):
-        # Find current evolution stage
-        current_stage = 0
-        #print(f"Checking evolution for score: {self.score}")  # Debug score check
-        for score, colors in sorted(EVOLUTION_STAGES.items()):
-            if self.score >= score:
-                current_stage = score
-                #print(f"Qualified for stage {score}")  # Debug stage qualification
-        
-        if current_stage != self.evolution_stage:
-            #print(f"Evolution change detected: {self.evolution_stage} -> {current_stage}")  # Debug evolution change
-            self.evolution_stage = current_stage
-            self.update_colors()  # Update colors after evolution
-            return True  # Return True to indicate evolution occurred
-        return False  # Return False if no evolution occurred
-
-    def update_colors(self):
-        # Just update colors based on current evolution stage
-        stage_colors = EVOLUTION_STAGES[self.evolution_stage]
-        self.color = stage_colors['color']
-        self.head_color = stage_colors['head_color']
-        #print(f"New colors - Body: {self.color}, Head: {self.head_color}")  # Debug color change
-
-    def render(self, screen):
-        # Draw snake body
-        for i, pos in enumerate(self.positions):
-            x = pos[0] * GRID_SIZE
-            y = pos[1] * GRID_SIZE
-            color = self.head_color if i == 0 else self.color
-
-            # Draw snake segment with rounded corners if not the head
-            if i == 0:
-                # Head is a rounded rectangle
-                draw_rounded_rectangle(screen, color, (x, y, GRID_SIZE, GRID_SIZE), 4)
+            blits = [(segment, pixel) for pixel in pixels]
+        rects.extend(screen.blits(blits))
+        return rects
+
+    def segment_pixels(self, alpha):
+        # Top-left pixel of every segment, interpolated between ticks. The drawn
+        # snake trails the logical one by render_lag cells along its own path:
+        # the body followed by the cells the tail recently left.
+        positions = self.positions
+        lag = 0.0 if self.game.game_over else self.render_lag(alpha)
+        if lag <= 0:
+            return [(x * GRID_SIZE, y * GRID_SIZE) for x, y in positions]
+        path = list(positions)
+        path.extend(self.trail)
+        last = len(path) - 1
+        steps = int(lag)
+        fraction = lag - steps
+        pixels = []
+        for i in range(len(positions)):
+            x, y = path[min(i + steps, last)]
+            prev_x, prev_y = path[min(i + steps + 1, last)]
+            dx = x - prev_x
+            dy = y - prev_y
+            if abs(dx) + abs(dy) != 1:
+                # Wrapped around the board or went through a portal: don't sweep across
+                pixels.append((x * GRID_SIZE, y * GRID_SIZE))
             else:
-                # Body segments are rounded rectangles
-                draw_rounded_rectangle(screen, color, (x, y, GRID_SIZE, GRID_SIZE), 4)
-
-            # Draw eyes only for head
-            if i == 0:
-                # Draw Google-style eyes (bigger white circles with smaller black pupils)
-                eye_radius = 4
-                pupil_radius = 2
-                eye_offset = 7
-                
-                # Draw eyes based on direction
-                if self.direction == (0, -1):  # Up
-                    left_eye_pos = (x + eye_offset, y + eye_offset)
-                    right_eye_pos = (x + GRID_SIZE - eye_offset, y + eye_offset)
-                elif self.direction == (0, 1):  # Down
-                    left_eye_pos = (x + eye_offset, y + GRID_SIZE - eye_offset)
-                    right_eye_pos = (x + GRID_SIZE - eye_offset, y + GRID_SIZE - eye_offset)
-                elif self.direction == (-1, 0):  # Left
-                    left_eye_pos = (x + eye_offset, y + eye_offset)
-                    right_eye_pos = (x + eye_offset, y + GRID_SIZE - eye_offset)
-                else:  # Right (default)
-                    left_eye_pos = (x + GRID_SIZE - eye_offset, y + eye_offset)
-                    right_eye_pos = (x + GRID_SIZE - eye_offset, y + GRID_SIZE - eye_offset)
-                
-                # Draw the eyes
-                pygame.draw.circle(screen, WHITE, left_eye_pos, eye_radius)
-                pygame.draw.circle(screen, WHITE, right_eye_pos, eye_radius)
-                
-                # Draw pupils
-                pygame.draw.circle(screen, BLACK, left_eye_pos, pupil_radius)
-                pygame.draw.circle(screen, BLACK, right_eye_pos, pupil_radius)
-
-            # Draw ghost effect if enabled
-            if GAME_SETTINGS['ghost_mode'] and i > 0:
-                ghost_surface = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
-                ghost_surface.fill((255, 255, 255, 128))  # Semi-transparent white
-                screen.blit(ghost_surface, (x, y))
+                pixels.append((round((x - dx * fraction) * GRID_SIZE),
+                               round((y - dy * fraction) * GRID_SIZE)))
+        return pixels
+
+    def segment_sprite(self):
+        key = (self.evolution_stage, self.color)
+        sprite = self.segment_sprites.get(key)
+        if sprite is None:
+            sprite = self.segment_sprites[key] = self.bake_segment(self.color)
+        return sprite
+
+    def bake_segment(self, color):
+        sprite = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+        draw_rounded_rectangle(sprite, color, (0, 0, GRID_SIZE, GRID_SIZE), 4)
+        return display_format(sprite)
+
+    @classmethod
+    def ghost_sprite(cls):
+        if cls.ghost_overlay is None:
+            ghost_surface = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+            ghost_surface.fill((255, 255, 255, 128))  # Semi-transparent white
+            cls.ghost_overlay = display_format(ghost_surface)
+        return cls.ghost_overlay
+
+    def head_sprite(self):
+        key = (self.evolution_stage, self.head_color, self.direction)
+        sprite = self.head_sprites.get(key)
+        if sprite is None:
+            sprite = self.head_sprites[key] = self.bake_head(*key)
+        return sprite
+
+    def bake_sprites(self):
+        # Pre-render the head of every evolution stage facing all four directions,
+        # and the body segment of every stage
+        for stage, colors in self.game.config.evolution_stages.items():
+            for direction in HEAD_ANGLES:
+                key = (stage, colors['head_color'], direction)
+                if key not in self.head_sprites:
+                    self.head_sprites[key] = self.bake_head(*key)
+            if (stage, colors['color']) not in self.segment_sprites:
+                self.segment_sprites[(stage, colors['color'])] = self.bake_segment(colors['color'])
+
+    def bake_head(self, stage, head_color, direction):
+        # Returns the head sprite and the sprite's (x, y) offset from the head cell
+        if 'dragon' in self.game.config.evolution_stages[stage]['patterns']:
+            # The dragon head overhangs its cell, so draw it centered in a 3x3-cell
+            # canvas and crop to the pixels actually drawn
+            canvas = pygame.Surface((GRID_SIZE * 3, GRID_SIZE * 3), pygame.SRCALPHA)
+            self.draw_dragon_head(canvas, GRID_SIZE, GRID_SIZE, HEAD_ANGLES[direction])
+            bounds = canvas.get_bounding_rect()
+            sprite = canvas.subsurface(bounds).copy()
+            offset = (GRID_SIZE - bounds.x, GRID_SIZE - bounds.y)
+        else:
+            sprite = pygame.Surface((GRID_SIZE, GRID_SIZE), pygame.SRCALPHA)
+            self.draw_basic_head(sprite, 0, 0, head_color, direction)
+            offset = (0, 0)
+        return display_format(sprite), offset
+
+    def draw_basic_head(self, surface, x, y, color, direction):
+        # Head is a rounded rectangle
+        draw_rounded_rectangle(surface, color, (x, y, GRID_SIZE, GRID_SIZE), 4)
+
+        # Draw Google-style eyes (bigger white circles with smaller black pupils)
+        eye_radius = 4
+        pupil_radius = 2
+        eye_offset = 7
+        
+        # Draw eyes based on direction
+        if direction == (0, -1):  # Up
+            left_eye_pos = (x + eye_offset, y + eye_offset)
+            right_eye_pos = (x + GRID_SIZE - eye_offset, y + eye_offset)
+        elif direction == (0, 1):  # Down
+            left_eye_pos = (x + eye_offset, y + GRID_SIZE - eye_offset)
+            right_eye_pos = (x + GRID_SIZE - eye_offset, y + GRID_SIZE - eye_offset)
+        elif direction == (-1, 0):  # Left
+            left_eye_pos = (x + eye_offset, y + eye_offset)
+            right_eye_pos = (x + eye_offset, y + GRID_SIZE - eye_offset)
+        else:  # Right (default)
+            left_eye_pos = (x + GRID_SIZE - eye_offset, y + eye_offset)
+            right_eye_pos = (x + GRID_SIZE - eye_offset, y + GRID_SIZE - eye_offset)
+        
+        # Draw the eyes
+        pygame.draw.circle(surface, WHITE, left_eye_pos, eye_radius)
+        pygame.draw.circle(surface, WHITE, right_eye_pos, eye_radius)
+        
+        # Draw pupils
+        pygame.draw.circle(surface, BLACK, left_eye_pos, pupil_radius)
+        pygame.draw.circle(surface, BLACK, right_eye_pos, pupil_radius)
 
     def draw_dragon_head(self, surface, x, y, angle):
         # Enhanced colors
         main_color = (178, 34, 34)  # Dark red
-        accent_color = (255, 140, 0)  # Orange
+        accent_color = DRAGON_ACCENT_COLOR  # Orange
         horn_color = (139, 69, 19)  # Brown
         scale_color = (139, 0, 0)  # Darker red for scales
         
@@ -432,14 +373,10 @@ class Snake:
             eye_pos = rotate_point(x + GRID_SIZE - 8, y + GRID_SIZE//2 + eye_offset[1], 
                                  center_x, center_y, angle)
             
-            # Multiple layers of glow
+            # Multiple layers of glow from pre-baked alpha circles
             for r in range(glow_radius, eye_radius-1, -1):
                 glow_alpha = int(255 * (r/glow_radius))
-                glow_surface = pygame.Surface((r*2+1, r*2+1), pygame.SRCALPHA)
-                pygame.draw.circle(glow_surface, (*accent_color, glow_alpha), 
-                                (r+1, r+1), r)
-                surface.blit(glow_surface, 
-                           (eye_pos[0]-r, eye_pos[1]-r))
+                ALPHA_CIRCLES.blit(surface, eye_pos, r, accent_color, glow_alpha)
             
             # Main eye
             pygame.draw.circle(surface, (255, 0, 0), eye_pos, eye_radius)
@@ -465,236 +402,143 @@ class Snake:
                            for px, py in tooth_points]
             pygame.draw.polygon(surface, teeth_color, rotated_tooth)
 
-    def grow(self, amount):
-        self.growth_pending += amount
-
-    def apply_speed_reduction(self):
-        self.speed = max(1, math.ceil(self.speed * 0.2))  # Reduce speed to 20% and round up
-        self.speed_reduction_timer = 100  # 10 seconds at normal game speed (10 FPS)
+def draw_fruit(surface, fruit_type, x, y, radius, fruits=snake_core.FRUITS):
+    # Get fruit color from the game's fruit table
+    fruit_color = fruits.get(fruit_type, {'color': FOOD_COLOR})['color']
+
+    if fruit_type == 'apple':
+        # Improved apple with gradient and better shine
+        darker_color = (max(0, fruit_color[0]-40), max(0, fruit_color[1]-40), max(0, fruit_color[2]-40))
+        # Main apple body
+        pygame.draw.circle(surface, fruit_color, (x, y), radius)
+        # Bottom shadow
+        pygame.draw.circle(surface, darker_color, (x, y+2), radius-1)
+        # Top shine
+        shine_pos = (x - radius//3, y - radius//3)
+        pygame.draw.circle(surface, (255, 255, 255), shine_pos, 2)
+        # Stem
+        stem_start = (x, y - radius + 1)
+        stem_end = (x + 2, y - radius - 3)
+        pygame.draw.line(surface, (83, 40, 30), stem_start, stem_end, 2)
+        # Leaf
+        leaf_points = [(x + 2, y - radius - 2),
+                      (x + 7, y - radius - 4),
+                      (x + 4, y - radius)]
+        pygame.draw.polygon(surface, (67, 160, 71), leaf_points)
+
+    elif fruit_type == 'banana':
+        # Improved banana with better curve and gradient
+        lighter_color = (min(255, fruit_color[0]+40), min(255, fruit_color[1]+40), min(255, fruit_color[2]+40))
+        # Main banana shape
+        points = [
+            (x - 8, y + 2),
+            (x - 6, y - 4),
+            (x + 2, y - 6),
+            (x + 8, y - 2),
+            (x + 6, y + 4),
+            (x - 2, y + 6),
+        ]
+        pygame.draw.polygon(surface, fruit_color, points)
+        # Highlight
+        pygame.draw.line(surface, lighter_color, (x - 4, y - 2), (x + 4, y + 2), 2)
+
+    elif fruit_type == 'orange':
+        # Improved orange with segments
+        pygame.draw.circle(surface, fruit_color, (x, y), radius)
+        # Add texture/segments - ensure colors are valid
+        segment_color = (max(0, min(255, fruit_color[0]-20)), 
+                       max(0, min(255, fruit_color[1]-20)), 
+                       max(0, min(255, fruit_color[2]-20)))
+        for angle in range(0, 360, 60):
+            rad = math.radians(angle)
+            end_x = x + math.cos(rad) * (radius - 1)
+            end_y = y + math.sin(rad) * (radius - 1)
+            pygame.draw.line(surface, segment_color, (x, y), (end_x, end_y), 1)
+
+    elif fruit_type == 'berry':
+        # Draw berry as a cluster of small circles
+        berry_size = radius - 2
+        for dx, dy in [(0, 0), (-2, -2), (2, -2), (-2, 2), (2, 2)]:
+            pygame.draw.circle(surface, fruit_color, (x + dx, y + dy), berry_size)
+
+    elif fruit_type == 'kiwi':
+        # Kiwi as a green circle with seeds, scattered the same way every time
+        pygame.draw.circle(surface, fruit_color, (x, y), radius)
+        seed_rng = random.Random(fruit_type)
+        # Add seeds
+        for _ in range(8):
+            seed_x = x + seed_rng.randint(-radius//2, radius//2)
+            seed_y = y + seed_rng.randint(-radius//2, radius//2)
+            pygame.draw.circle(surface, (0, 0, 0), (seed_x, seed_y), 1)
+
+    elif fruit_type == 'ice_cream':
+        # Draw ice cream cone
+        cone_color = (210, 180, 140)  # Tan color for cone
+        ice_color = (240, 248, 255)   # White for ice cream
+
+        # Draw cone
+        cone_points = [
+            (x, y + radius),
+            (x - radius, y - radius//2),
+            (x + radius, y - radius//2)
+        ]
+        pygame.draw.polygon(surface, cone_color, cone_points)
+
+        # Draw ice cream scoop
+        pygame.draw.circle(surface, ice_color, (x, y - radius//2), radius)
+
+    elif fruit_type == 'poison':
+        # Draw poison as a skull
+        pygame.draw.circle(surface, fruit_color, (x, y), radius)
+        # Draw skull eyes
+        eye_size = radius // 3
+        pygame.draw.circle(surface, (255, 255, 255), (x - eye_size, y - eye_size), eye_size)
+        pygame.draw.circle(surface, (255, 255, 255), (x + eye_size, y - eye_size), eye_size)
+        # Draw skull mouth
+        pygame.draw.rect(surface, (255, 255, 255), (x - eye_size, y + eye_size - 1, eye_size*2, eye_size))
+        # Draw teeth
+        pygame.draw.line(surface, fruit_color, (x - eye_size//2, y + eye_size - 1), 
+                       (x - eye_size//2, y + eye_size*2 - 1), 1)
+        pygame.draw.line(surface, fruit_color, (x + eye_size//2, y + eye_size - 1), 
+                       (x + eye_size//2, y + eye_size*2 - 1), 1)
+    else:
+        # Default circular food
+        pygame.draw.circle(surface, fruit_color, (x, y), radius)
+
+class Food(snake_core.Food):
+    sprites = {}  # (fruit_type, color, big) -> pre-rendered fruit, shared by all games
 
-class Food:
     def __init__(self, game):
-        self.game = game
-        self.positions = []  # List of (position, fruit_type) tuples
-        self.radius = GRID_SIZE // 2 - 2
-        self.randomize()
-
-    def randomize(self):
-        # Clear existing food
-        self.positions = []
-        
-        # Add initial food
-        self.add_food('apple')
-        
-        # Add second food if double food is enabled
-        if GAME_SETTINGS['double_food']:
-            self.add_food('apple')
-
-    def add_food(self, fruit_type):
-        # Find valid position not on snake or other food
-        attempts = 0
-        while attempts < 100:  # Limit attempts to prevent infinite loop
-            # Generate random position
-            new_pos = (random.randint(0, GRID_COUNT-1), random.randint(0, GRID_COUNT-1))
-            
-            # Check for collision with snake
-            if new_pos in self.game.snake.positions:
-                attempts += 1
-                continue
-                
-            # Check for collision with other food
-            if new_pos in [p[0] for p in self.positions]:
-                attempts += 1
+        self.radius = FOOD_RADIUS
+        super().__init__(game)
+
+    @classmethod
+    def bake_sprites(cls, fruits):
+        # Render every fruit once at normal size plus a scaled copy for big food
+        for fruit_type, fruit in fruits.items():
+            if (fruit_type, fruit['color'], False) in cls.sprites:
                 continue
-            
-            # Valid position found
-            break
-        
-        # If no valid position found after max attempts, don't add food
-        if attempts >= 100:
-            return
-            
-        # Determine fruit type
-        if fruit_type == 'apple':
-            # Select random fruit type
-            fruit_types = ['apple', 'banana', 'orange', 'berry', 'kiwi']
-            selected_type = random.choice(fruit_types)
-            self.positions.append((new_pos, selected_type))
-
-    def update(self):
-        # Make sure we always have at least one food
-        if not self.positions:
-            self.add_food('apple')
-            
-        # Make sure we have two foods if double food is enabled
-        if GAME_SETTINGS['double_food'] and len(self.positions) < 2:
-            self.add_food('apple')
+            sprite = pygame.Surface((GRID_SIZE * 2, GRID_SIZE * 2), pygame.SRCALPHA)
+            draw_fruit(sprite, fruit_type, GRID_SIZE, GRID_SIZE, FOOD_RADIUS, fruits)
+            big_size = int(GRID_SIZE * 2 * BIG_FOOD_SCALE)
+            cls.sprites[(fruit_type, fruit['color'], False)] = sprite
+            cls.sprites[(fruit_type, fruit['color'], True)] = pygame.transform.smoothscale(sprite, (big_size, big_size))
 
     def render(self, surface):
+        # Blit every fruit, returning the areas drawn (stems and leaves overhang the cell)
+        config = self.game.config
+        big = config.settings['big_food']
+        rects = []
         for position, fruit_type in self.positions:
             x = position[0] * GRID_SIZE + GRID_SIZE // 2
             y = position[1] * GRID_SIZE + GRID_SIZE // 2
-            
-            # Get fruit color from FRUITS dictionary
-            fruit_color = FRUITS.get(fruit_type, {'color': FOOD_COLOR})['color']
-            
-            if fruit_type == 'apple':
-                # Improved apple with gradient and better shine
-                darker_color = (max(0, fruit_color[0]-40), max(0, fruit_color[1]-40), max(0, fruit_color[2]-40))
-                # Main apple body
-                pygame.draw.circle(surface, fruit_color, (x, y), self.radius)
-                # Bottom shadow
-                pygame.draw.circle(surface, darker_color, (x, y+2), self.radius-1)
-                # Top shine
-                shine_pos = (x - self.radius//3, y - self.radius//3)
-                pygame.draw.circle(surface, (255, 255, 255), shine_pos, 2)
-                # Stem
-                stem_start = (x, y - self.radius + 1)
-                stem_end = (x + 2, y - self.radius - 3)
-                pygame.draw.line(surface, (83, 40, 30), stem_start, stem_end, 2)
-                # Leaf
-                leaf_points = [(x + 2, y - self.radius - 2),
-                              (x + 7, y - self.radius - 4),
-                              (x + 4, y - self.radius)]
-                pygame.draw.polygon(surface, (67, 160, 71), leaf_points)
-                
-            elif fruit_type == 'banana':
-                # Improved banana with better curve and gradient
-                lighter_color = (min(255, fruit_color[0]+40), min(255, fruit_color[1]+40), min(255, fruit_color[2]+40))
-                # Main banana shape
-                points = [
-                    (x - 8, y + 2),
-                    (x - 6, y - 4),
-                    (x + 2, y - 6),
-                    (x + 8, y - 2),
-                    (x + 6, y + 4),
-                    (x - 2, y + 6),
-                ]
-                pygame.draw.polygon(surface, fruit_color, points)
-                # Highlight
-                pygame.draw.line(surface, lighter_color, (x - 4, y - 2), (x + 4, y + 2), 2)
-                
-            elif fruit_type == 'orange':
-                # Improved orange with segments
-                pygame.draw.circle(surface, fruit_color, (x, y), self.radius)
-                # Add texture/segments - ensure colors are valid
-                segment_color = (max(0, min(255, fruit_color[0]-20)), 
-                               max(0, min(255, fruit_color[1]-20)), 
-                               max(0, min(255, fruit_color[2]-20)))
-                for angle in range(0, 360, 60):
-                    rad = math.radians(angle)
-                    end_x = x + math.cos(rad) * (self.radius - 1)
-                    end_y = y + math.sin(rad) * (self.radius - 1)
-                    pygame.draw.line(surface, segment_color, (x, y), (end_x, end_y), 1)
-                
-            elif fruit_type == 'berry':
-                # Draw berry as a cluster of small circles
-                berry_size = self.radius - 2
-                for dx, dy in [(0, 0), (-2, -2), (2, -2), (-2, 2), (2, 2)]:
-                    pygame.draw.circle(surface, fruit_color, (x + dx, y + dy), berry_size)
-                
-            elif fruit_type == 'kiwi':
-                # Kiwi as a green circle with seeds
-                pygame.draw.circle(surface, fruit_color, (x, y), self.radius)
-                # Add seeds
-                for _ in range(8):
-                    seed_x = x + random.randint(-self.radius//2, self.radius//2)
-                    seed_y = y + random.randint(-self.radius//2, self.radius//2)
-                    pygame.draw.circle(surface, (0, 0, 0), (seed_x, seed_y), 1)
-                    
-            elif fruit_type == 'ice_cream':
-                # Draw ice cream cone
-                cone_color = (210, 180, 140)  # Tan color for cone
-                ice_color = (240, 248, 255)   # White for ice cream
-                
-                # Draw cone
-                cone_points = [
-                    (x, y + self.radius),
-                    (x - self.radius, y - self.radius//2),
-                    (x + self.radius, y - self.radius//2)
-                ]
-                pygame.draw.polygon(surface, cone_color, cone_points)
-                
-                # Draw ice cream scoop
-                pygame.draw.circle(surface, ice_color, (x, y - self.radius//2), self.radius)
-                
-            elif fruit_type == 'poison':
-                # Draw poison as a skull
-                pygame.draw.circle(surface, fruit_color, (x, y), self.radius)
-                # Draw skull eyes
-                eye_size = self.radius // 3
-                pygame.draw.circle(surface, (255, 255, 255), (x - eye_size, y - eye_size), eye_size)
-                pygame.draw.circle(surface, (255, 255, 255), (x + eye_size, y - eye_size), eye_size)
-                # Draw skull mouth
-                pygame.draw.rect(surface, (255, 255, 255), (x - eye_size, y + eye_size - 1, eye_size*2, eye_size))
-                # Draw teeth
-                pygame.draw.line(surface, fruit_color, (x - eye_size//2, y + eye_size - 1), 
-                               (x - eye_size//2, y + eye_size*2 - 1), 1)
-                pygame.draw.line(surface, fruit_color, (x + eye_size//2, y + eye_size - 1), 
-                               (x + eye_size//2, y + eye_size*2 - 1), 1)
-            else:
-                # Default circular food
-                pygame.draw.circle(surface, fruit_color, (x, y), self.radius)
-
-class Particle:
-    def __init__(self, x, y, color=(255, 255, 255), velocity=None, lifetime=30, size=3):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.lifetime = lifetime
-        self.original_lifetime = lifetime
-        self.size = size
-        
-        # Initialize random velocity if not provided
-        if velocity is None:
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(1, 3)
-            self.velocity = (math.cos(angle) * speed, math.sin(angle) * speed)
-        else:
-            self.velocity = velocity
-            
-    def update(self):
-        # Move the particle
-        self.x += self.velocity[0]
-        self.y += self.velocity[1]
-        
-        # Decrease lifetime
-        self.lifetime -= 1
-        
-        # Optionally adjust size based on lifetime
-        self.size = max(1, self.size * (self.lifetime / self.original_lifetime))
-        
-    def render(self, surface):
-        # Adjust transparency based on lifetime
-        alpha = int(255 * (self.lifetime / self.original_lifetime))
-        
-        # Draw the particle
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), int(self.size))
-
-class SnowParticle:
-    def __init__(self, x, y, speed=1):
-        self.x = x
-        self.y = y
-        self.speed = speed
-        self.lifetime = random.randint(100, 300)
-        self.original_lifetime = self.lifetime
-        self.size = random.randint(1, 3)
-        self.color = (255, 255, 255)
-        
-    def update(self):
-        # Move downward with slight side-to-side drift
-        self.y += self.speed
-        self.x += random.uniform(-0.5, 0.5)
-        
-        # Decrease lifetime
-        self.lifetime -= 1
-        
-    def render(self, surface):
-        # Adjust transparency based on lifetime
-        alpha = int(255 * (self.lifetime / self.original_lifetime))
-        
-        # Draw the snow particle
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
+            key = (fruit_type, config.fruits[fruit_type]['color'], big)
+            sprite = self.sprites.get(key)
+            if sprite is None:
+                self.bake_sprites(config.fruits)
+                sprite = self.sprites[key]
+            rects.append(surface.blit(sprite, sprite.get_rect(center=(x, y))))
+        return rects
 
 class Button:
     def __init__(self, x, y, width, height, text, action, color=BUTTON_COLOR, hover_color=BUTTON_HOVER_COLOR):
@@ -711,8 +555,7 @@ class Button:
         draw_rounded_rectangle(surface, current_color, self.rect, 8)
         
         # Draw button text
-        font = pygame.font.Font(None, 28)
-        text_surface = font.render(self.text, True, BUTTON_TEXT_COLOR)
+        text_surface = TEXT.render(self.text, 28, BUTTON_TEXT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
         
@@ -725,57 +568,29 @@ class Button:
     def update_scroll_position(self, scroll_offset):
         self.rect.y = self.original_y - scroll_offset
 
-class Portal:
+class Portal(snake_core.Portal):
     def __init__(self, start_pos, end_pos):
-        self.start_pos = start_pos  # (x, y) in grid coordinates
-        self.end_pos = end_pos      # (x, y) in grid coordinates
+        super().__init__(start_pos, end_pos)
         self.radius = GRID_SIZE // 2
-        self.lifetime = 200         # Duration in frames
-        self.start_color = (0, 191, 255)  # Deep sky blue
-        self.end_color = (138, 43, 226)   # Blue violet
-        self.color = self.start_color  # For backward compatibility
-        self.particles = []
+        self.particles = None  # Shared particle pool, attached by Game.add_portal
         self.particle_timer = 0
-        
-        # Create initial particles for both portals
-        self.create_particles(self.start_pos, self.start_color, 20)
-        self.create_particles(self.end_pos, self.end_color, 20)
-    
+
     def create_particles(self, position, color, count):
+        # Swirl particles in a circular pattern drifting toward the center
         x = position[0] * GRID_SIZE + GRID_SIZE // 2
         y = position[1] * GRID_SIZE + GRID_SIZE // 2
-        
-        for _ in range(count):
-            # Create particles in a circular pattern
-            angle = random.uniform(0, 2 * math.pi)
-            distance = random.uniform(0, self.radius)
-            px = x + math.cos(angle) * distance
-            py = y + math.sin(angle) * distance
-            
-            # Random velocity toward center
-            vx = (x - px) * random.uniform(0.01, 0.03)
-            vy = (y - py) * random.uniform(0.01, 0.03)
-            
-            particle = PortalParticle(px, py, color, (vx, vy))
-            self.particles.append(particle)
+        self.particles.emit_portal(x, y, self.radius, color, count)
     
     def update(self):
-        # Update lifetime
-        self.lifetime -= 1
-        
+        super().update()
+
         # Generate new particles periodically
         self.particle_timer += 1
         if self.particle_timer >= 5:  # Every 5 frames
             self.particle_timer = 0
             self.create_particles(self.start_pos, self.start_color, 2)
             self.create_particles(self.end_pos, self.end_color, 2)
-        
-        # Update existing particles
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.lifetime <= 0:
-                self.particles.remove(particle)
-    
+
     def render(self, surface):
         # Draw portals
         start_x = self.start_pos[0] * GRID_SIZE + GRID_SIZE // 2
@@ -790,49 +605,31 @@ class Portal:
         start_pulse_color = tuple(max(0, min(255, int(c * pulse))) for c in self.start_color)
         end_pulse_color = tuple(max(0, min(255, int(c * pulse))) for c in self.end_color)
         
-        pygame.draw.circle(surface, start_pulse_color, (start_x, start_y), self.radius)
-        pygame.draw.circle(surface, end_pulse_color, (end_x, end_y), self.radius)
+        rects = [
+            pygame.draw.circle(surface, start_pulse_color, (start_x, start_y), self.radius),
+            pygame.draw.circle(surface, end_pulse_color, (end_x, end_y), self.radius)
+        ]
         
         # Draw portal centers
         pygame.draw.circle(surface, (255, 255, 255), (start_x, start_y), self.radius // 3)
         pygame.draw.circle(surface, (255, 255, 255), (end_x, end_y), self.radius // 3)
-        
-        # Draw particles
-        for particle in self.particles:
-            particle.render(surface)
-
-class PortalParticle:
-    def __init__(self, x, y, color, velocity):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.velocity = velocity
-        self.lifetime = 20
-        self.size = random.uniform(1, 3)
-    
-    def update(self):
-        self.x += self.velocity[0]
-        self.y += self.velocity[1]
-        self.lifetime -= 1
-        self.size = max(0, self.size - 0.1)
-    
-    def render(self, surface):
-        alpha = int(255 * (self.lifetime / 20))
-        particle_surface = pygame.Surface((int(self.size * 2 + 1), int(self.size * 2 + 1)), pygame.SRCALPHA)
-        pygame.draw.circle(particle_surface, (*self.color, alpha), (int(self.size + 1), int(self.size + 1)), int(self.size))
-        surface.blit(particle_surface, (int(self.x - self.size), int(self.y - self.size)))
-
-class Game:
-    def __init__(self):
-        global SOUND_ENABLED
-        self.snake = Snake(self)
-        self.food = Food(self)
-        self.particles = []
-        self.snow_particles = []
-        self.portals = []
-        self.maze_walls = set()
-        self.high_score = 0
-        self.game_over = False
+        return rects
+
+class Game(Simulation):
+    snake_class = Snake
+    food_class = Food
+    portal_class = Portal
+
+    def __init__(self, config=None, particle_capacity=PARTICLE_CAPACITY, seed=None):
+        # Particles and other effects never touch the gameplay RNG
+        self.cosmetic_rng = random.Random()
+        self.particles = ParticleSystem(particle_capacity)
+        self.static_layer = None  # Background grid and maze walls, baked on demand
+        self.dirty_rects = []  # Screen areas drawn over the static layer last frame
+        self.dirty_area = 0  # Their total area in pixels, overlaps counted twice
+        self.full_redraw = True
+        self.autopilot = None  # Steers the snake when attract mode is on
+        super().__init__(config, seed)
         self.menu_state = 'menu'  # 'menu', 'settings', 'playing', 'game_over'
         self.current_menu = 'menu'  # 'menu', 'settings'
         self.buttons = []
@@ -840,10 +637,6 @@ class Game:
         self.scroll_offset = 0
         self.max_scroll = 0
         
-        # Game speed settings
-        self.current_speed_index = 1  # 0=Slow, 1=Normal, 2=Fast
-        self.speed_levels = [5, 10, 15]  # FPS values for different speeds
-        
         # Load game over image if available
         try:
             self.game_over_img = pygame.image.load('assets/game_over.png')
@@ -854,9 +647,17 @@ class Game:
         # Setup menu buttons
         self.setup_menu()
 
+        # Pre-bake translucent circles for portal particles and dragon eye glow
+        ALPHA_CIRCLES.bake(range(4), [snake_core.PORTAL_START_COLOR, snake_core.PORTAL_END_COLOR])
+        ALPHA_CIRCLES.bake(range(3, 6), [DRAGON_ACCENT_COLOR])
+
+        # Pre-render one sprite per fruit type and the snake of every stage
+        Food.bake_sprites(self.config.fruits)
+        self.snake.bake_sprites()
+
         # Sound setup
         self.sound_channels = {}
-        if SOUND_ENABLED:
+        if SOUND_ENABLED and pygame.mixer.get_init():
             self.initialize_sound_channels()
 
     def initialize_sound_channels(self):
@@ -871,31 +672,27 @@ class Game:
             self.sound_channels['background'].set_volume(0.5)
 
     def play_sound(self, sound_name):
-        if SOUND_ENABLED and sound_name in SOUNDS:
+        if self.sound_channels and sound_name in SOUNDS:
             if sound_name == 'background':
                 self.sound_channels['background'].play(SOUNDS[sound_name], loops=-1)
                 self.sound_channels['background'].set_volume(0.5)
             else:
                 self.sound_channels['effect'].play(SOUNDS[sound_name])
 
+    @property
+    def window_size(self):
+        # Side of the square play area in pixels
+        return self.config.grid_count * GRID_SIZE
+
+    def toggle_autopilot(self, controller=Autopilot):
+        # Hand the snake to the given controller, or take it back if it already has it
+        self.autopilot = None if type(self.autopilot) is controller else controller(self)
+
     def start_game(self):
-        self.snake = Snake(self)
-        self.food = Food(self)
-        self.particles = []
-        self.snow_particles = []
-        self.portals = []
-        self.maze_walls = set()
-        self.game_over = False
+        self.reset()
+        self.particles.clear()
         self.menu_state = 'playing'
-        
-        # Initialize maze if maze mode is enabled
-        if GAME_SETTINGS['maze_mode']:
-            self.generate_maze()
-            self.maze_update_timer = FPS * 15  # Regenerate maze every 15 seconds
-            
-        # Initialize portals if portal mode is enabled
-        if GAME_SETTINGS['portal_mode']:
-            self.generate_portals()
+        self.full_redraw = True
 
         # Play game start sound
         self.play_sound('start')
@@ -911,8 +708,9 @@ class Game:
         print("Settings menu opened")
 
     def toggle_setting(self, setting):
-        # Toggle the setting value
-        GAME_SETTINGS[setting] = not GAME_SETTINGS[setting]
+        # Toggle the setting for the next game; configs are immutable, so swap in a new one
+        enabled = not self.config.settings[setting]
+        self.config = self.config.with_settings(**{setting: enabled})
         
         # Format the setting name for display
         display_name = ' '.join(setting.split('_')).title()
@@ -920,9 +718,9 @@ class Game:
         # Find and update the button text for this setting
         for button in self.settings_buttons:
             if button.text.startswith(display_name):
-                state = "On" if GAME_SETTINGS[setting] else "Off"
+                state = "On" if enabled else "Off"
                 button.text = f"{display_name}: {state}"
-                print(f"Setting '{setting}' changed to {GAME_SETTINGS[setting]}")
+                print(f"Setting '{setting}' changed to {enabled}")
                 break
                 
         # Play sound if enabled
@@ -947,7 +745,7 @@ class Game:
         button_width = 250
         button_height = 50
         button_spacing = 50
-        center_x = WINDOW_SIZE // 2
+        center_x = self.window_size // 2
         start_y = 200
         
         # Main menu buttons
@@ -984,7 +782,7 @@ class Game:
             display_name = ' '.join(setting.split('_')).title()
             
             # Determine if setting is enabled
-            state = "On" if GAME_SETTINGS[setting] else "Off"
+            state = "On" if self.config.settings[setting] else "Off"
             
             # Create button with toggle function
             button = Button(
@@ -1028,7 +826,7 @@ class Game:
                 button.text = f"Speed: {speed_names[self.current_speed_index]}"
         
         # Play sound if enabled
-        if SOUND_ENABLED:
+        if self.sound_channels:
             # Stop all sounds first
             self.sound_channels['background'].stop()
             self.sound_channels['effect'].stop()
@@ -1044,41 +842,11 @@ class Game:
         if self.menu_state != 'playing':
             return
 
-        # Handle reverse controls
-        key_mapping = {
-            pygame.K_UP: (0, -1),
-            pygame.K_DOWN: (0, 1),
-            pygame.K_LEFT: (-1, 0),
-            pygame.K_RIGHT: (1, 0)
-        }
-        
-        if GAME_SETTINGS['reverse_controls']:
-            key_mapping = {
-                pygame.K_UP: (0, 1),     # Up key moves down
-                pygame.K_DOWN: (0, -1),  # Down key moves up
-                pygame.K_LEFT: (1, 0),   # Left key moves right
-                pygame.K_RIGHT: (-1, 0)  # Right key moves left
-            }
-            
-        # Update the snake
-        if not self.snake.update():
-            self.game_over = True
-            self.play_sound('death')
-            return
-            
-        # Check for collisions (both with portals and food)
-        self.check_collisions()
-            
-        # Update particles
-        self.update_particles()
-            
-        # Handle maze regeneration
-        if GAME_SETTINGS['maze_mode']:
-            if hasattr(self, 'maze_update_timer'):
-                self.maze_update_timer -= 1
-                if self.maze_update_timer <= 0:
-                    self.regenerate_maze()
-                    self.maze_update_timer = FPS * 15  # Regenerate maze every 15 seconds
+        # Let the autopilot pick this tick's turns, then advance the simulation.
+        # Particles move per rendered frame in update_particles.
+        if self.autopilot is not None:
+            self.autopilot.steer()
+        self.step()
 
     def create_particles(self, position=None, count=10, color=None):
         # If position not specified, use snake head position
@@ -1093,7 +861,7 @@ class Game:
             for i, (food_pos, food_type) in enumerate(self.food.positions):
                 if position == food_pos:
                     if food_type in PARTICLE_COLORS:
-                        color = random.choice(PARTICLE_COLORS[food_type])
+                        color = self.cosmetic_rng.choice(PARTICLE_COLORS[food_type])
                     else:
                         color = FOOD_COLOR
                     break
@@ -1106,28 +874,49 @@ class Game:
             count = 10  # Default to 10 particles
         
         # Create particles
-        for _ in range(count):
-            self.particles.append(Particle(x, y, color))
-
-    def create_flame_particles(self, x, y, base_color, count, size_range, speed_range):
-        for _ in range(count):
-            color = (
-                min(255, base_color[0] + random.randint(-20, 20)),
-                min(255, base_color[1] + random.randint(-20, 20)),
-                min(255, base_color[2] + random.randint(-20, 20))
-            )
-            particle = Particle(x, y, color)
-            particle.size = random.uniform(*size_range)
-            particle.velocity = (
-                random.uniform(*speed_range),
-                random.uniform(*speed_range)
-            )
-            particle.lifetime = 30
-            self.particles.append(particle)
+        self.particles.emit_burst(x, y, color, count)
+
+    def set_maze_walls(self, walls):
+        super().set_maze_walls(walls)
+        self.static_layer = None  # Re-bake the maze layer on the next frame
+
+    def restore(self, data):
+        super().restore(data)
+
+        # Portals come back without particles; the maze may have changed
+        for portal in self.portals:
+            portal.particles = self.particles
+        self.static_layer = None
+        self.full_redraw = True
+
+    def bake_static_layer(self, screen):
+        # Background grid and maze walls only change when the maze is regenerated
+        self.static_layer = pygame.Surface(screen.get_size(), 0, screen)
+        draw_gradient_background(self.static_layer)
+        if self.config.settings['maze_mode'] and self.maze_walls:
+            for wall in self.maze_walls:
+                x = wall[0] * GRID_SIZE
+                y = wall[1] * GRID_SIZE
+                pygame.draw.rect(self.static_layer, GRAY, (x, y, GRID_SIZE, GRID_SIZE))
+        self.full_redraw = True
+
+    def add_portal(self, portal):
+        super().add_portal(portal)
+
+        # Create initial particles for both portals in the shared pool
+        portal.particles = self.particles
+        portal.create_particles(portal.start_pos, portal.start_color, 20)
+        portal.create_particles(portal.end_pos, portal.end_color, 20)
+
+    def segment_centers(self):
+        # Pixel centers of all snake segments as arrays
+        cells = np.array(self.snake.positions, dtype=np.float32).reshape(-1, 2)
+        centers = cells * GRID_SIZE + GRID_SIZE // 2
+        return centers[:, 0], centers[:, 1]
 
     def create_evolution_particles(self):
         # Create more elaborate particles for evolution
-        new_color = EVOLUTION_STAGES[self.snake.evolution_stage]['color']
+        new_color = self.config.evolution_stages[self.snake.evolution_stage]['color']
         
         # Different particle effects for different stages
         if self.snake.evolution_stage >= 45:  # Dragon form
@@ -1143,13 +932,11 @@ class Game:
             particle_size = (2, 4)
             particle_speed = (-2.5, 2.5)
             # Create symmetric flame effects on both sides
-            for pos in self.snake.positions:
-                x = pos[0] * GRID_SIZE + GRID_SIZE // 2
-                y = pos[1] * GRID_SIZE + GRID_SIZE // 2
-                # Left side flames
-                self.create_flame_particles(x - GRID_SIZE//2, y, new_color, particle_count//2, particle_size, particle_speed)
-                # Right side flames
-                self.create_flame_particles(x + GRID_SIZE//2, y, new_color, particle_count//2, particle_size, particle_speed)
+            xs, ys = self.segment_centers()
+            # Left side flames
+            self.particles.emit_jittered(xs - GRID_SIZE//2, ys, new_color, particle_count//2, particle_size, particle_speed)
+            # Right side flames
+            self.particles.emit_jittered(xs + GRID_SIZE//2, ys, new_color, particle_count//2, particle_size, particle_speed)
             return
         else:
             particle_count = 10
@@ -1157,174 +944,114 @@ class Game:
             particle_speed = (-2, 2)
 
         # Create particles along the entire snake body
-        for pos in self.snake.positions:
-            x = pos[0] * GRID_SIZE + GRID_SIZE // 2
-            y = pos[1] * GRID_SIZE + GRID_SIZE // 2
-            
-            for _ in range(particle_count):
-                color = (
-                    min(255, new_color[0] + random.randint(-20, 20)),
-                    min(255, new_color[1] + random.randint(-20, 20)),
-                    min(255, new_color[2] + random.randint(-20, 20))
-                )
-                particle = Particle(x, y, color)
-                particle.size = random.uniform(*particle_size)
-                particle.velocity = (
-                    random.uniform(*particle_speed),
-                    random.uniform(*particle_speed)
-                )
-                particle.lifetime = 30  # Longer lifetime for evolution particles
-                self.particles.append(particle)
-
-    def spawn_ice_cream(self):
-        # Spawn 10 ice creams when turning into dragon
-        for _ in range(10):
-            self.food.add_food('ice_cream')
-
-    def render(self, screen):
+        xs, ys = self.segment_centers()
+        self.particles.emit_jittered(xs, ys, new_color, particle_count, particle_size, particle_speed)
+
+    def create_snow(self, count):
+        # Add snow particles falling from above the screen
+        self.particles.emit_snow(count, self.window_size)
+
+    def render(self, screen, alpha=1.0):
+        # Returns the screen areas to present, or None when the whole screen changed.
+        # `alpha` is how far the snake is between the previous tick and the current one.
         if self.menu_state == 'menu':
             screen.fill(MENU_BG_COLOR)
-            font = pygame.font.Font(None, 74)
-            title = font.render("Snake Game", True, SCORE_COLOR)
-            screen.blit(title, (WINDOW_SIZE//2 - title.get_width()//2, 100))
+            title = TEXT.render("Snake Game", 74, SCORE_COLOR)
+            screen.blit(title, (self.window_size//2 - title.get_width()//2, 100))
             for button in self.buttons:
                 button.render(screen)
         elif self.menu_state == 'settings':
             screen.fill(MENU_BG_COLOR)
-            font = pygame.font.Font(None, 74)
-            title = font.render("Settings", True, SCORE_COLOR)
-            screen.blit(title, (WINDOW_SIZE//2 - title.get_width()//2, 50))
+            title = TEXT.render("Settings", 74, SCORE_COLOR)
+            screen.blit(title, (self.window_size//2 - title.get_width()//2, 50))
             for button in self.settings_buttons:
                 button.render(screen)
         elif self.menu_state == 'playing':
-            # Draw background
-            draw_gradient_background(screen)
-            
-            # Draw maze walls if enabled
-            if GAME_SETTINGS['maze_mode'] and self.maze_walls:
-                for wall in self.maze_walls:
-                    x = wall[0] * GRID_SIZE
-                    y = wall[1] * GRID_SIZE
-                    pygame.draw.rect(screen, GRAY, (x, y, GRID_SIZE, GRID_SIZE))
+            # Draw background and maze walls from the cached static layer; the game
+            # over overlay is translucent, so it needs a clean full frame
+            if self.static_layer is None:
+                self.bake_static_layer(screen)
+            # A long enough snake costs more to erase piecewise than to redraw. This
+            # frame is taken to draw about what the last one did, so the area
+            # presented is twice the last frame's.
+            screen_rect = screen.get_rect()
+            area_limit = DIRTY_AREA_LIMIT * screen_rect.width * screen_rect.height
+            full_redraw = (self.full_redraw or self.game_over or len(self.dirty_rects) > MAX_DIRTY_RECTS
+                           or 2 * self.dirty_area > area_limit)
+            if full_redraw:
+                screen.blit(self.static_layer, (0, 0))
+            else:
+                # Erase only what was drawn last frame
+                for rect in self.dirty_rects:
+                    screen.blit(self.static_layer, rect, rect)
+            drawn = []
             
             # Draw portals if enabled
-            if GAME_SETTINGS['portal_mode']:
+            if self.config.settings['portal_mode']:
                 for portal in self.portals:
-                    portal.render(screen)
+                    drawn.extend(portal.render(screen))
+                drawn.extend(self.particles.render(screen, PORTAL))
             
             # Draw the food
-            self.food.render(screen)
+            drawn.extend(self.food.render(screen))
             
             # Draw the snake
-            self.snake.render(screen)
+            drawn.extend(self.snake.render(screen, alpha))
             
-            # Draw particles
-            for particle in self.particles:
-                particle.render(screen)
-                
-            # Draw snow particles
-            for particle in self.snow_particles:
-                particle.render(screen)
+            # Draw particles (portal particles were drawn with the portals)
+            for kind in (SPARK, SNOW):
+                drawn.extend(self.particles.render(screen, kind))
             
             # Draw score
-            font = pygame.font.Font(None, 36)
-            score_text = font.render(f"Score: {self.snake.score}", True, SCORE_COLOR)
-            high_score_text = font.render(f"High Score: {self.high_score}", True, SCORE_COLOR)
-            screen.blit(score_text, (10, 10))
-            screen.blit(high_score_text, (10, 50))
+            score_text = TEXT.render(f"Score: {self.snake.score}", 36, SCORE_COLOR)
+            high_score_text = TEXT.render(f"High Score: {self.high_score}", 36, SCORE_COLOR)
+            drawn.append(screen.blit(score_text, (10, 10)))
+            drawn.append(screen.blit(high_score_text, (10, 50)))
+
+            previous = self.dirty_rects
+            previous_area = self.dirty_area
+            self.dirty_rects = [rect.clip(screen_rect) for rect in drawn]
+            self.dirty_area = sum(rect.width * rect.height for rect in self.dirty_rects)
+            self.full_redraw = False
+            if not full_redraw:
+                if previous_area + self.dirty_area > area_limit:
+                    return None  # Merged areas cover enough of the screen to flip it whole
+                return previous + self.dirty_rects
             
             # Draw game over screen if game is over
             if self.game_over:
                 # Semi-transparent overlay
-                overlay = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE), pygame.SRCALPHA)
+                overlay = pygame.Surface((self.window_size, self.window_size), pygame.SRCALPHA)
                 overlay.fill((0, 0, 0, 128))
                 screen.blit(overlay, (0, 0))
                 
                 # Game over text
-                font = pygame.font.Font(None, 74)
-                game_over_text = font.render("Game Over", True, WHITE)
-                screen.blit(game_over_text, (WINDOW_SIZE//2 - game_over_text.get_width()//2, 200))
+                game_over_text = TEXT.render("Game Over", 74, WHITE)
+                screen.blit(game_over_text, (self.window_size//2 - game_over_text.get_width()//2, 200))
                 
                 # Score text
-                font = pygame.font.Font(None, 48)
-                final_score = font.render(f"Score: {self.snake.score}", True, WHITE)
-                screen.blit(final_score, (WINDOW_SIZE//2 - final_score.get_width()//2, 300))
+                final_score = TEXT.render(f"Score: {self.snake.score}", 48, WHITE)
+                screen.blit(final_score, (self.window_size//2 - final_score.get_width()//2, 300))
                 
                 # Restart instructions
-                font = pygame.font.Font(None, 36)
-                restart_text = font.render("Press ESC to return to menu", True, WHITE)
-                screen.blit(restart_text, (WINDOW_SIZE//2 - restart_text.get_width()//2, 400))
+                restart_text = TEXT.render("Press ESC to return to menu", 36, WHITE)
+                screen.blit(restart_text, (self.window_size//2 - restart_text.get_width()//2, 400))
                 
         elif self.menu_state == 'game_over':
             screen.fill(MENU_BG_COLOR)
             if self.game_over_img:
-                screen.blit(self.game_over_img, (WINDOW_SIZE//2 - 150, 150))
+                screen.blit(self.game_over_img, (self.window_size//2 - 150, 150))
                 
-            font = pygame.font.Font(None, 74)
-            game_over_text = font.render("Game Over", True, SCORE_COLOR)
-            screen.blit(game_over_text, (WINDOW_SIZE//2 - game_over_text.get_width()//2, 100))
+            game_over_text = TEXT.render("Game Over", 74, SCORE_COLOR)
+            screen.blit(game_over_text, (self.window_size//2 - game_over_text.get_width()//2, 100))
             
-            font = pygame.font.Font(None, 48)
-            score_text = font.render(f"Score: {self.snake.score}", True, SCORE_COLOR)
-            screen.blit(score_text, (WINDOW_SIZE//2 - score_text.get_width()//2, 300))
+            score_text = TEXT.render(f"Score: {self.snake.score}", 48, SCORE_COLOR)
+            screen.blit(score_text, (self.window_size//2 - score_text.get_width()//2, 300))
             for button in self.buttons:
                 button.render(screen)
 
-    def generate_maze(self):
-        self.maze_walls = set()
-        if not GAME_SETTINGS['maze_mode']:
-            return
-        
-        # Clear existing maze
-        self.maze_walls = set()
-        
-        # Generate random maze obstacles
-        obstacle_count = int(GRID_COUNT * GRID_COUNT * 0.05)  # 5% of grid cells
-        snake_positions = set(self.snake.positions)
-        food_positions = set(pos for pos, _ in self.food.positions)
-        forbidden_positions = snake_positions.union(food_positions)
-        
-        # Add buffer around snake head to prevent immediate collisions
-        head_pos = self.snake.get_head_position()
-        for dx in range(-2, 3):
-            for dy in range(-2, 3):
-                buffer_pos = ((head_pos[0] + dx) % GRID_COUNT, 
-                             (head_pos[1] + dy) % GRID_COUNT)
-                forbidden_positions.add(buffer_pos)
-        
-        # Generate wall positions
-        for _ in range(obstacle_count):
-            # Find valid wall position
-            for _ in range(100):  # Limit attempts to find valid position
-                wall_pos = (random.randint(0, GRID_COUNT-1), 
-                           random.randint(0, GRID_COUNT-1))
-                if wall_pos not in forbidden_positions and wall_pos not in self.maze_walls:
-                    self.maze_walls.add(wall_pos)
-                    forbidden_positions.add(wall_pos)
-                    break
-        
-        # Add some connected walls to make it more maze-like
-        for _ in range(obstacle_count // 2):
-            if not self.maze_walls:
-                break
-                
-            # Pick a random existing wall
-            wall = random.choice(tuple(self.maze_walls))
-            
-            # Try to extend it in a random direction
-            directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-            random.shuffle(directions)
-            
-            for dx, dy in directions:
-                new_wall = ((wall[0] + dx) % GRID_COUNT, 
-                           (wall[1] + dy) % GRID_COUNT)
-                if new_wall not in forbidden_positions and new_wall not in self.maze_walls:
-                    self.maze_walls.add(new_wall)
-                    forbidden_positions.add(new_wall)
-                    break
-    
     def render_maze(self, surface):
-        if not GAME_SETTINGS['maze_mode'] or not self.maze_walls:
+        if not self.config.settings['maze_mode'] or not self.maze_walls:
             return
             
         for wall_pos in self.maze_walls:
@@ -1353,214 +1080,58 @@ class Game:
                     pygame.draw.line(surface, shadow_color, (line_x, y), (line_x, y + GRID_SIZE))
                     pygame.draw.line(surface, highlight_color, (line_x + 1, y), (line_x + 1, y + GRID_SIZE))
 
-    def update_portals(self):
-        # Only handle portals if portal mode is enabled
-        if not GAME_SETTINGS['portal_mode']:
-            self.portals = []  # Clear portals if mode is disabled
-            return
-            
-        # Update existing portals
-        for portal in self.portals:
-            portal.update()
-            if portal.lifetime <= 0:
-                self.portals.remove(portal)
-        
-        # Spawn new portals periodically
-        self.portal_spawn_timer += 1
-        if self.portal_spawn_timer >= self.portal_spawn_interval and len(self.portals) < 2:
-            self.portal_spawn_timer = 0
-            self.create_portal()
-        
-        # Check if snake head is entering a portal
-        if self.portals:
-            self.check_portal_collision()
-    
-    def create_portal(self):
-        # Find valid positions for portal entrance and exit
-        available_positions = []
-        
-        # Positions that are not valid for portals
-        forbidden_positions = set(self.snake.positions)
-        for food_pos, _ in self.food.positions:
-            forbidden_positions.add(food_pos)
-        for portal in self.portals:
-            forbidden_positions.add(portal.start_pos)
-            forbidden_positions.add(portal.end_pos)
-        for wall_pos in self.maze_walls:
-            forbidden_positions.add(wall_pos)
-        
-        # Collect all valid positions
-        for x in range(GRID_COUNT):
-            for y in range(GRID_COUNT):
-                if (x, y) not in forbidden_positions:
-                    available_positions.append((x, y))
-        
-        # Ensure we have at least 2 positions available
-        if len(available_positions) < 2:
-            return
-        
-        # Pick two random positions for the portal
-        start_pos, end_pos = random.sample(available_positions, 2)
-        
-        # Create the portal
-        self.portals.append(Portal(start_pos, end_pos))
-        
-        # Play portal sound if available
-        if SOUND_ENABLED and 'portal' in SOUNDS:
-            self.sound_channels['effect'].play(SOUNDS['portal'])
-    
-    def check_portal_collision(self):
-        head_pos = self.snake.get_head_position()
-        
-        for portal in self.portals:
-            # Check if snake head is at portal entrance
-            if head_pos == portal.start_pos:
-                # Teleport to exit
-                self.snake.positions[0] = portal.end_pos
-                # Create particles at both entrance and exit
-                self.create_particles(portal.start_pos, portal.start_color, 15)
-                self.create_particles(portal.end_pos, portal.end_color, 15)
-                # Play portal sound if available
-                if SOUND_ENABLED and 'portal' in SOUNDS:
-                    self.sound_channels['effect'].play(SOUNDS['portal'])
-                break
-            # Check if snake head is at portal exit
-            elif head_pos == portal.end_pos:
-                # Teleport to entrance
-                self.snake.positions[0] = portal.start_pos
-                # Create particles at both entrance and exit
-                self.create_particles(portal.end_pos, portal.end_color, 15)
-                self.create_particles(portal.start_pos, portal.start_color, 15)
-                # Play portal sound if available
-                if SOUND_ENABLED and 'portal' in SOUNDS:
-                    self.sound_channels['effect'].play(SOUNDS['portal'])
-                break
-
-    def check_collisions(self):
-        # Check portal collisions
-        if self.portals and GAME_SETTINGS['portal_mode']:
-            head_pos = self.snake.get_head_position()
-            for portal in self.portals:
-                if head_pos == portal.start_pos:
-                    # Create particles at portal location
-                    self.create_particles(portal.start_pos, 15, portal.color)
-                    
-                    # Get new position after teleportation
-                    new_pos = portal.end_pos
-                    
-                    # Update snake head position
-                    self.snake.positions[0] = new_pos
-                    self.play_sound('portal')
-                    return True
-        
-        # Check food collisions
-        head_pos = self.snake.get_head_position()
-        to_remove = []
-        
-        for i, (position, fruit_type) in enumerate(self.food.positions):
-            if head_pos == position:
-                # Mark this food item for removal
-                to_remove.append(i)
-                
-                # Handle different fruit types
-                if fruit_type != 'poison':
-                    # Create particles based on fruit color
-                    fruit_color = FRUITS.get(fruit_type, {'color': FOOD_COLOR})['color']
-                    self.create_particles(position, 10, fruit_color)
-                    
-                    # Apple, orange, banana - normal growth
-                    if fruit_type in ['apple', 'orange', 'banana']:
-                        self.snake.growth_pending += 1
-                        self.snake.score += 1
-                    # Berry - extra growth
-                    elif fruit_type == 'berry':
-                        self.snake.growth_pending += 2
-                        self.snake.score += 3
-                    # Kiwi - speed increase
-                    elif fruit_type == 'kiwi':
-                        self.snake.speed_multiplier = 2.0
-                        self.snake.speed_effect_timer = FPS * 5  # 5 seconds
-                        self.snake.score += 2
-                    # Ice cream - snow effect
-                    elif fruit_type == 'ice_cream':
-                        # Add snow particles
-                        for _ in range(50):
-                            x = random.randint(0, SCREEN_WIDTH)
-                            y = random.randint(-50, 0)
-                            speed = random.uniform(1, 3)
-                            self.snow_particles.append(SnowParticle(x, y, speed))
-                        self.snake.score += 2
-                    
-                    self.play_sound('eat')
-                else:
-                    # Poison - negative effect
-                    self.snake.speed_reduction_timer = FPS * 3  # 3 seconds of reduced speed
-                    self.snake.score = max(0, self.snake.score - 2)  # Reduce score, minimum 0
-                    self.play_sound('poison')
-        
-        # Remove eaten food items
-        if to_remove:
-            # Remove in reverse order to avoid index shifts
-            for i in sorted(to_remove, reverse=True):
-                del self.food.positions[i]
-            
-            # Spawn new food
-            self.food.update()
-            
-        return False
-
-    def update_particles(self):
-        # Update regular particles
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.lifetime <= 0:
-                self.particles.remove(particle)
-                
-        # Update snow particles
-        for particle in self.snow_particles[:]:
-            particle.update()
-            if particle.lifetime <= 0:
-                self.snow_particles.remove(particle)
+    def update_particles(self, elapsed=None):
+        # Advance all particles in one vectorized pass by `elapsed` seconds, or by
+        # one simulation tick
+        steps = 1.0 if elapsed is None else elapsed * self.config.fps
+        self.particles.update(steps)
                 
         # Generate more snow particles if ice cream effect is active
         if hasattr(self, 'ice_cream_active') and self.ice_cream_active:
             # Add occasional snow particles from the top of the screen
-            if random.random() < 0.2:  # 20% chance each frame
-                x = random.randint(0, WINDOW_SIZE)
-                y = -5
-                speed = random.uniform(1, 3)
-                self.snow_particles.append(SnowParticle(x, y, speed))
-
-    def generate_portals(self):
-        # Only create portals if portal mode is enabled
-        if not GAME_SETTINGS['portal_mode']:
-            return
-            
-        # Clear existing portals
-        self.portals = []
-        
-        # Create a new portal
-        self.create_portal()
+            if self.cosmetic_rng.random() < 0.2 * steps:  # 20% chance each tick
+                self.particles.emit_snow(1, self.window_size, (-5, -5))
+
+
+def display_refresh_rate():
+    # Refresh rate of the primary display, when pygame can tell
+    get_rates = getattr(pygame.display, 'get_desktop_refresh_rates', None)
+    if get_rates is not None:
+        rates = get_rates()
+        if rates and rates[0] > 0:
+            return rates[0]
+    return DEFAULT_REFRESH_RATE
 
 def main():
-    global SCREEN_WIDTH, SCREEN_HEIGHT, WINDOW_SIZE
-    
     # Initialize pygame and create window
     pygame.init()
-    pygame.mixer.init()
+
+    # Initialize pygame mixer with specific settings
+    pygame.mixer.quit()  # Quit any existing mixer
+    pygame.mixer.init(44100, -16, 2, 2048)  # Increased buffer size for better sound handling
+    pygame.mixer.set_num_channels(8)  # Ensure we have enough channels
     
     # Initialize sounds
     initialize_sounds()
     
-    # Create game screen
-    screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
+    # Create game screen sized to the board
+    config = DEFAULT_CONFIG
+    window_size = config.grid_count * GRID_SIZE
+    screen = pygame.display.set_mode((window_size, window_size))
     pygame.display.set_caption('Snake Evolution')
     
-    # Create clock for controlling game speed
+    # Create clock for pacing rendering at the display refresh rate
     clock = pygame.time.Clock()
+    render_fps = display_refresh_rate()
     
     # Create game instance
-    game = Game()
+    game = Game(config)
+
+    # Fixed-timestep simulation: the game advances at its own tick rate while
+    # input and rendering run once per display frame
+    tick_interval = 1.0 / config.fps
+    accumulator = 0.0
+    previous_time = time.perf_counter()
     
     # Main game loop
     while True:
@@ -1592,48 +1163,49 @@ def main():
                             
             # Handle key presses for snake movement
             if event.type == pygame.KEYDOWN and game.menu_state == 'playing':
-                # Handle control keys based on reverse_controls setting
-                direction = game.snake.direction
-                
-                # Normal controls
-                if not GAME_SETTINGS['reverse_controls']:
-                    if event.key == pygame.K_UP and direction != (0, 1):
-                        game.snake.direction = (0, -1)
-                    elif event.key == pygame.K_DOWN and direction != (0, -1):
-                        game.snake.direction = (0, 1)
-                    elif event.key == pygame.K_LEFT and direction != (1, 0):
-                        game.snake.direction = (-1, 0)
-                    elif event.key == pygame.K_RIGHT and direction != (-1, 0):
-                        game.snake.direction = (1, 0)
-                # Reverse controls
-                else:
-                    if event.key == pygame.K_UP and direction != (0, -1):
-                        game.snake.direction = (0, 1)  # Up key moves down
-                    elif event.key == pygame.K_DOWN and direction != (0, 1):
-                        game.snake.direction = (0, -1)  # Down key moves up
-                    elif event.key == pygame.K_LEFT and direction != (-1, 0):
-                        game.snake.direction = (1, 0)  # Left key moves right
-                    elif event.key == pygame.K_RIGHT and direction != (1, 0):
-                        game.snake.direction = (-1, 0)  # Right key moves left
+                # Buffer turns so several presses within one tick all land
+                if event.key in KEY_DIRECTIONS:
+                    game.queue_turn(KEY_DIRECTIONS[event.key])
                 
+                # A toggles the autopilot, H the Hamiltonian cycle solver
+                if event.key == pygame.K_a:
+                    game.toggle_autopilot()
+                elif event.key == pygame.K_h:
+                    game.toggle_autopilot(HamiltonianSolver)
+
                 # Escape key to return to menu
                 if event.key == pygame.K_ESCAPE:
                     game.show_menu()
                         
-        # Update game state
-        game.update()
-        
-        # Clear the screen
-        screen.fill(BLACK)
-        
-        # Render the game
-        game.render(screen)
-        
-        # Update display
-        pygame.display.flip()
+        # Update game state for every tick that elapsed since the last frame
+        now = time.perf_counter()
+        elapsed = min(now - previous_time, MAX_TICKS_PER_FRAME * tick_interval)
+        accumulator += now - previous_time
+        previous_time = now
+        ticks = 0
+        while accumulator >= tick_interval and ticks < MAX_TICKS_PER_FRAME:
+            game.update()
+            accumulator -= tick_interval
+            ticks += 1
+        if ticks == MAX_TICKS_PER_FRAME:
+            # Too far behind (e.g. the window was dragged): drop the backlog
+            accumulator = min(accumulator, tick_interval)
+
+        # Particles move every frame by the time that passed, not once per tick
+        if game.menu_state == 'playing':
+            game.update_particles(elapsed)
+        
+        # Render the game between the last two ticks
+        dirty_rects = game.render(screen, accumulator / tick_interval)
+        
+        # Update display, pushing only the changed areas while playing
+        if dirty_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
         
-        # Control frame rate
-        clock.tick(FPS)
+        # Pace rendering to the display refresh rate
+        clock.tick(render_fps)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
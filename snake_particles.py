@@ -0,0 +1,170 @@
+"""Pooled struct-of-arrays particle engine for the Snake Evolution renderer."""
+import math
+
+import numpy as np
+import pygame
+
+from snake_sprites import ALPHA_CIRCLES
+
+# Particle kinds, each with its own motion and fade rules
+SPARK = 0   # Food/evolution bursts: shrink with remaining lifetime
+SNOW = 1    # Ice cream snow: falls with random sideways drift
+PORTAL = 2  # Portal swirl: shrinks linearly and fades out
+
+PORTAL_LIFETIME = 20
+
+
+class ParticleSystem:
+    # All live particles are packed into the first `count` slots of preallocated
+    # arrays; dead particles are swap-removed so the live range stays dense.
+    # Velocities, lifetimes and fades are per simulation tick, and update() can
+    # advance by a fraction of a tick so particles move smoothly every frame.
+    def __init__(self, capacity=8192, rng=None):
+        self.capacity = capacity
+        self.count = 0
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.float32)
+        self.original_lifetime = np.ones(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self._fields = (self.kind, self.x, self.y, self.vx, self.vy, self.lifetime,
+                        self.original_lifetime, self.size, self.color)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, kind, count, x, y, vx, vy, lifetime, size, color):
+        # Append up to `count` particles; scalars broadcast, per-particle arrays
+        # must have `count` entries. Particles beyond capacity are dropped.
+        start = self.count
+        count = min(count, self.capacity - start)
+        if count <= 0:
+            return 0
+        end = start + count
+
+        def fit(value):
+            value = np.asarray(value)
+            return value if value.ndim == 0 else value[:count]
+
+        self.kind[start:end] = kind
+        self.x[start:end] = fit(x)
+        self.y[start:end] = fit(y)
+        self.vx[start:end] = fit(vx)
+        self.vy[start:end] = fit(vy)
+        self.lifetime[start:end] = fit(lifetime)
+        self.original_lifetime[start:end] = fit(lifetime)
+        self.size[start:end] = fit(size)
+        color = np.clip(np.asarray(color), 0, 255)
+        self.color[start:end] = color if color.ndim == 1 else color[:count]
+        self.count = end
+        return count
+
+    def emit_burst(self, x, y, color, count, lifetime=30, size=3):
+        # Sparks flying out in random directions at 1-3 px per tick
+        angle = self.rng.uniform(0, 2 * math.pi, count)
+        speed = self.rng.uniform(1, 3, count)
+        return self.emit(SPARK, count, x, y, np.cos(angle) * speed, np.sin(angle) * speed,
+                         lifetime, size, color)
+
+    def emit_jittered(self, x, y, base_color, count, size_range, speed_range, lifetime=30):
+        # Sparks with per-particle color jitter, size and velocity; x and y may be
+        # arrays of emitter positions, each emitting `count` particles
+        x = np.repeat(np.atleast_1d(x), count)
+        y = np.repeat(np.atleast_1d(y), count)
+        total = len(x)
+        color = np.asarray(base_color, dtype=np.int16) + self.rng.integers(-20, 21, (total, 3))
+        return self.emit(SPARK, total, x, y,
+                         self.rng.uniform(*speed_range, total),
+                         self.rng.uniform(*speed_range, total),
+                         lifetime, self.rng.uniform(*size_range, total), color)
+
+    def emit_snow(self, count, width, y_range=(-50, 0)):
+        return self.emit(SNOW, count,
+                         self.rng.integers(0, width + 1, count),
+                         self.rng.integers(y_range[0], y_range[1] + 1, count),
+                         0, self.rng.uniform(1, 3, count),
+                         self.rng.integers(100, 301, count),
+                         self.rng.integers(1, 4, count), (255, 255, 255))
+
+    def emit_portal(self, x, y, radius, color, count):
+        # Particles scattered in a disc, drifting toward its center
+        angle = self.rng.uniform(0, 2 * math.pi, count)
+        distance = self.rng.uniform(0, radius, count)
+        px = x + np.cos(angle) * distance
+        py = y + np.sin(angle) * distance
+        return self.emit(PORTAL, count, px, py,
+                         (x - px) * self.rng.uniform(0.01, 0.03, count),
+                         (y - py) * self.rng.uniform(0.01, 0.03, count),
+                         PORTAL_LIFETIME, self.rng.uniform(1, 3, count), color)
+
+    def update(self, steps=1.0):
+        # Advance every particle by `steps` ticks, which may be fractional
+        n = self.count
+        if n == 0:
+            return
+        kind = self.kind[:n]
+        x, y = self.x[:n], self.y[:n]
+        size, lifetime = self.size[:n], self.lifetime[:n]
+
+        # Move and age every particle
+        x += self.vx[:n] * steps
+        y += self.vy[:n] * steps
+        lifetime -= steps
+
+        snow = kind == SNOW
+        if snow.any():
+            # Random walk: the spread over a tick doesn't depend on the step size
+            drift = self.rng.uniform(-0.5, 0.5, int(snow.sum())) * math.sqrt(steps)
+            x[snow] += drift.astype(np.float32)
+
+        # Sparks shrink by their remaining lifetime fraction each tick
+        spark = kind == SPARK
+        remaining = np.maximum(0, lifetime[spark]) / self.original_lifetime[:n][spark]
+        size[spark] = np.maximum(1, size[spark] * remaining ** steps)
+
+        portal = kind == PORTAL
+        size[portal] = np.maximum(0, size[portal] - 0.1 * steps)
+
+        # Swap-remove dead particles: live particles from the tail fill the holes
+        dead = np.flatnonzero(lifetime <= 0)
+        if len(dead):
+            remaining = n - len(dead)
+            holes = dead[dead < remaining]
+            sources = np.flatnonzero(lifetime[remaining:] > 0) + remaining
+            for field in self._fields:
+                field[holes] = field[sources]
+            self.count = remaining
+
+    def render(self, surface, kind=None):
+        # Draws the particles and returns their bounding area as a list of rects
+        n = self.count
+        if n == 0:
+            return []
+        indices = np.arange(n) if kind is None else np.flatnonzero(self.kind[:n] == kind)
+        if len(indices) == 0:
+            return []
+        xs = self.x[indices].astype(np.int32).tolist()
+        ys = self.y[indices].astype(np.int32).tolist()
+        sizes = self.size[indices].tolist()
+        colors = self.color[indices].tolist()
+        kinds = self.kind[indices].tolist()
+        lifetimes = self.lifetime[indices].tolist()
+        for px, py, size, color, particle_kind, lifetime in zip(xs, ys, sizes, colors, kinds, lifetimes):
+            if particle_kind == PORTAL:
+                # Fade out over the portal particle lifetime using pre-baked sprites
+                alpha = int(255 * (lifetime / PORTAL_LIFETIME))
+                ALPHA_CIRCLES.blit(surface, (px, py), int(size), color, alpha)
+            else:
+                pygame.draw.circle(surface, color, (px, py), int(size))
+
+        reach = int(max(sizes)) + 1
+        left, top = min(xs) - reach, min(ys) - reach
+        return [pygame.Rect(left, top, max(xs) + reach - left + 1, max(ys) + reach - top + 1)]
@@ -0,0 +1,142 @@
+"""Low-resolution pixel frames for agents that learn from images: square RGB or
+grayscale frames drawn straight from the simulation's observation planes, or
+scaled down from the real pygame renderer, written into preallocated NumPy
+buffers and stacked without allocating per step."""
+import numpy as np
+
+from snake_core import (FRUIT_NAMES, FRUIT_PLANES, OBS_BODY, OBS_CHANNELS, OBS_HEAD,
+                        OBS_PORTAL_IN, OBS_PORTAL_OUT, OBS_WALL, PORTAL_END_COLOR,
+                        PORTAL_START_COLOR)
+
+FRAME_SIZE = 84  # Side of a frame in pixels
+BACKGROUND_COLOR = (255, 255, 255)
+WALL_COLOR = (128, 128, 128)  # Same grey as the renderer's maze walls
+HEAD_SHADE = 0.7  # Head color as a fraction of the body color
+GRAY = np.array((0.299, 0.587, 0.114), dtype=np.float32)  # ITU-R 601 luma weights
+
+# Planes in painting order; where planes overlap the later one shows. A cell's
+# palette entry is its plane's channel + 1, and 0 is the background.
+PAINT_ORDER = (OBS_WALL, OBS_PORTAL_IN, OBS_PORTAL_OUT,
+               *(FRUIT_PLANES[name] for name in FRUIT_NAMES), OBS_BODY, OBS_HEAD)
+
+
+class PixelFrames:
+    # Renders games into `size` x `size` frames, (y, x) or (y, x, rgb) uint8, and
+    # keeps the last `stack` of them. Every buffer is allocated up front: the
+    # stack is stored twice over so the newest `stack` frames are always one
+    # contiguous slice, returned as a view (stack, size, size[, 3]), oldest first.
+    #
+    # render(game) paints cells flat from the game's observation planes and the
+    # config's colors, skipping particles, text and sprites. capture(surface)
+    # scales down a screen already drawn by snake_game.Game.render instead.
+    def __init__(self, size=FRAME_SIZE, grayscale=False, stack=1):
+        self.size = size
+        self.grayscale = grayscale
+        self.stack = stack
+        self.shape = (size, size) if grayscale else (size, size, 3)
+        self.frames = np.zeros((2 * stack, *self.shape), dtype=np.uint8)
+        self.slot = 0  # Where the next frame goes
+        self.pixels = np.empty(size * size, dtype=np.uint8)  # Palette entry of each pixel
+        self.palette = np.zeros((OBS_CHANNELS + 1, 3), dtype=np.uint8)
+        self.gray_palette = np.zeros(OBS_CHANNELS + 1, dtype=np.uint8)
+        self.grid_count = None
+        self.source = None  # Observation planes the masks below view
+        self.masks = None
+        self.fruits = None  # Fruit table and stage the palette was built for
+        self.stage = None
+        self.small = None  # Scaled-down screen for capture()
+        self.rgb = None  # capture() scratch buffers for grayscale frames
+        self.rgb_float = None
+        self.gray = None
+
+    def clear(self):
+        # Forget earlier frames, e.g. at the start of an episode
+        self.frames.fill(0)
+        self.slot = 0
+
+    def stacked(self):
+        return self.frames[self.slot:self.slot + self.stack]
+
+    def next_frame(self):
+        # Buffer for the newest frame
+        return self.frames[self.slot]
+
+    def push(self):
+        # Mirror the frame just written and make it the newest in the stack
+        frames = self.frames
+        np.copyto(frames[self.slot + self.stack], frames[self.slot])
+        self.slot = (self.slot + 1) % self.stack
+        return self.stacked()
+
+    def resize(self, grid_count):
+        # Board cell under each pixel, nearest neighbour, in plane order x * grid_count + y
+        self.grid_count = grid_count
+        cells = np.arange(self.size) * grid_count // self.size
+        self.pixel_cells = (cells[None, :] * grid_count + cells[:, None]).ravel()
+        self.labels = np.zeros((grid_count, grid_count), dtype=np.uint8)
+        self.source = None
+
+    def update_palette(self, game):
+        config = game.config
+        stage = game.snake.evolution_stage
+        if config.fruits is self.fruits and stage == self.stage:
+            return
+        self.fruits = config.fruits
+        self.stage = stage
+        body = np.array(config.evolution_stages[stage]['color'])
+        palette = self.palette
+        palette[0] = BACKGROUND_COLOR
+        palette[OBS_BODY + 1] = body
+        palette[OBS_HEAD + 1] = body * HEAD_SHADE
+        for name in FRUIT_NAMES:
+            palette[FRUIT_PLANES[name] + 1] = config.fruits[name]['color']
+        palette[OBS_WALL + 1] = WALL_COLOR
+        palette[OBS_PORTAL_IN + 1] = PORTAL_START_COLOR
+        palette[OBS_PORTAL_OUT + 1] = PORTAL_END_COLOR
+        self.gray_palette[:] = palette @ GRAY
+
+    def render(self, game):
+        # Draw the game's board as the newest frame and return the stack
+        planes, _ = game.observe()
+        if planes.shape[1] != self.grid_count:
+            self.resize(planes.shape[1])
+        if planes is not self.source:
+            self.source = planes
+            masks = planes.view(np.bool_)
+            self.masks = [(channel + 1, masks[channel]) for channel in PAINT_ORDER]
+        self.update_palette(game)
+
+        labels = self.labels
+        labels.fill(0)
+        for label, mask in self.masks:
+            np.copyto(labels, label, where=mask)
+        np.take(labels.reshape(-1), self.pixel_cells, out=self.pixels)
+        frame = self.next_frame()
+        if self.grayscale:
+            np.take(self.gray_palette, self.pixels, out=frame.reshape(-1))
+        else:
+            np.take(self.palette, self.pixels, axis=0, out=frame.reshape(-1, 3))
+        return self.push()
+
+    def capture(self, surface):
+        # Scale a rendered screen down into the newest frame and return the stack
+        import pygame
+
+        size = (self.size, self.size)
+        if self.small is None or self.small.get_bitsize() != surface.get_bitsize():
+            self.small = pygame.Surface(size, 0, surface)
+        pygame.transform.smoothscale(surface, size, self.small)
+        frame = self.next_frame()
+        if not self.grayscale:
+            # surfarray arrays are (x, y, rgb); write through a transposed view
+            pygame.pixelcopy.surface_to_array(frame.transpose(1, 0, 2), self.small)
+            return self.push()
+        if self.rgb is None:
+            self.rgb = np.empty((self.size, self.size, 3), dtype=np.uint8)
+            self.rgb_float = np.empty((self.size, self.size, 3), dtype=np.float32)
+            self.gray = np.empty(size, dtype=np.float32)
+        pygame.pixelcopy.surface_to_array(self.rgb.transpose(1, 0, 2), self.small)
+        np.copyto(self.rgb_float, self.rgb)
+        np.matmul(self.rgb_float, GRAY, out=self.gray)
+        np.copyto(frame, self.gray, casting='unsafe')
+        return self.push()
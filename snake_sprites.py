@@ -0,0 +1,86 @@
+"""Pre-rendered sprite caches shared by the Snake Evolution renderer."""
+from collections import OrderedDict
+
+import pygame
+
+ALPHA_BUCKETS = 16  # Distinct alpha levels kept per (radius, color)
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept before evicting the oldest
+
+
+class AlphaCircleCache:
+    # Alpha-blended circles keyed by (radius, color, alpha bucket), rendered once
+    # and blitted afterwards so per-frame effects allocate no surfaces
+    def __init__(self, alpha_buckets=ALPHA_BUCKETS):
+        self.alpha_buckets = alpha_buckets
+        self.sprites = {}
+        self.allocations = 0  # Surfaces created so far
+
+    def bucket(self, alpha):
+        alpha = max(0, min(255, int(alpha)))
+        return round(alpha * (self.alpha_buckets - 1) / 255)
+
+    def bake(self, radii, colors):
+        # Pre-render every alpha bucket for the given radii and colors
+        for radius in radii:
+            for color in colors:
+                for bucket in range(self.alpha_buckets):
+                    self.sprite_for(radius, tuple(color), bucket)
+
+    def sprite_for(self, radius, color, bucket):
+        key = (radius, color, bucket)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            alpha = bucket * 255 // (self.alpha_buckets - 1)
+            sprite = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (*color, alpha), (radius, radius), radius)
+            self.sprites[key] = sprite
+            self.allocations += 1
+        return sprite
+
+    def blit(self, surface, center, radius, color, alpha):
+        # Draw a translucent circle centered on `center`
+        sprite = self.sprite_for(radius, tuple(color), self.bucket(alpha))
+        surface.blit(sprite, (int(center[0]) - radius, int(center[1]) - radius))
+
+
+class TextCache:
+    # Font registry keyed by size plus an LRU of rendered text keyed by
+    # (text, size, color), so text is only rasterized when it changes
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.renders = 0  # Text surfaces rasterized so far
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+
+    def render(self, text, size, color):
+        key = (text, size, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font(size).render(text, True, color)
+        self.renders += 1
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.fonts.clear()
+        self.surfaces.clear()
+
+
+# Shared by particles and snake heads; sprites depend only on their key
+ALPHA_CIRCLES = AlphaCircleCache()
+
+# Shared by menus and the HUD
+TEXT = TextCache()
@@ -0,0 +1,263 @@
+"""Shared-memory transition stream: headless games write every tick's
+observation, action, reward and done flag into a ring buffer that a trainer in
+another process reads in place, with no pickling or pipes.
+
+Run `python snake_stream.py --help` for a producer/consumer throughput demo.
+"""
+import argparse
+import multiprocessing
+import platform
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from snake_core import DEFAULT_CONFIG, DIRECTIONS, OBS_CHANNELS, OBS_FEATURES, Simulation
+from snake_tournament import POLICIES, parse_settings
+
+MAGIC = 0x534e4b52494e4701  # 'SNKRING' and a format version
+CACHE_LINE = 64
+# Header words (uint64), each counter on its own cache line so the producer and
+# consumer never write to the same one
+WRITTEN = 0  # Transitions published by the producer
+READ = CACHE_LINE // 8  # Transitions released by the consumer
+LAYOUT = 2 * CACHE_LINE // 8  # magic, capacity, grid_count, channels, features, closed
+CLOSED = LAYOUT + 5
+HEADER_SIZE = 3 * CACHE_LINE
+
+DEFAULT_CAPACITY = 4096  # Transitions per ring
+# The lock-free protocol needs stores and loads kept in program order, which
+# x86 hardware guarantees and ARM and POWER don't
+ORDERED_MACHINES = ('x86_64', 'amd64', 'i386', 'i686', 'x86')
+ORDERED_MEMORY = platform.machine().lower() in ORDERED_MACHINES
+CREATED = set()  # Names of the rings created by this process
+
+
+def slot_fields(capacity, grid_count, channels, features):
+    # (name, dtype, shape) of each per-slot array, in buffer order
+    return (
+        ('planes', np.uint8, (capacity, channels, grid_count, grid_count)),
+        ('features', np.int32, (capacity, features)),
+        ('action', np.int8, (capacity,)),
+        ('reward', np.int32, (capacity,)),
+        ('done', np.bool_, (capacity,)),
+    )
+
+
+def check_memory_order():
+    if not ORDERED_MEMORY:
+        raise RuntimeError(f"transition rings need x86 memory ordering; "
+                           f"{platform.machine() or 'this machine'} may reorder their stores")
+
+
+def align(offset):
+    return -(-offset // CACHE_LINE) * CACHE_LINE
+
+
+def ring_size(capacity, grid_count, channels=OBS_CHANNELS, features=len(OBS_FEATURES)):
+    offset = HEADER_SIZE
+    for _, dtype, shape in slot_fields(capacity, grid_count, channels, features):
+        offset = align(offset + np.dtype(dtype).itemsize * int(np.prod(shape)))
+    return offset
+
+
+class TransitionRing:
+    # Single-producer, single-consumer ring of transitions in shared memory. Slot
+    # `i % capacity` holds transition i: the observation the action was chosen on
+    # (Simulation.observe planes and features), the action as the DIRECTIONS index
+    # of the heading taken, the score change over the tick and whether the game ended. The next
+    # transition's observation is the state that followed, or the first state of
+    # a new game after a done one.
+    #
+    # No locks: the producer fills a slot and then advances `written`, the
+    # consumer reads slots and then advances `read`, and each counter has one
+    # writer. NumPy stores carry no memory barriers, so this relies on a slot's
+    # stores becoming visible before the counter store that publishes it, and
+    # on the consumer's loads staying in order, as they do on x86. Elsewhere
+    # claim() and peek() refuse to run rather than hand out torn transitions.
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner  # The creating side unlinks the memory
+        self.header = np.ndarray(HEADER_SIZE // 8, dtype=np.uint64, buffer=shm.buf)
+        magic, capacity, grid_count, channels, features = (int(word) for word in self.header[LAYOUT:CLOSED])
+        if magic != MAGIC:
+            raise ValueError(f"{shm.name} is not a transition ring")
+        self.capacity = capacity
+        self.grid_count = grid_count
+        offset = HEADER_SIZE
+        for name, dtype, shape in slot_fields(capacity, grid_count, channels, features):
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            setattr(self, name, array)
+            offset = align(offset + array.nbytes)
+        self.slot = None  # Slot claimed by the producer and not yet published
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY, grid_count=DEFAULT_CONFIG.grid_count, name=None):
+        shm = shared_memory.SharedMemory(name, create=True, size=ring_size(capacity, grid_count))
+        header = np.ndarray(HEADER_SIZE // 8, dtype=np.uint64, buffer=shm.buf)
+        header[:] = 0
+        header[LAYOUT:CLOSED] = (MAGIC, capacity, grid_count, OBS_CHANNELS, len(OBS_FEATURES))
+        del header
+        CREATED.add(shm.name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        # Open a ring created by another process. Only the creator unlinks it, so
+        # keep the resource tracker from unlinking it when this process exits.
+        shm = shared_memory.SharedMemory(name)
+        if multiprocessing.parent_process() is None and shm.name not in CREATED:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def closed(self):
+        # Set by the producer once it will publish nothing more
+        return bool(self.header[CLOSED])
+
+    def close(self):
+        # Detach; the creator also frees the memory
+        for name in ('header', 'planes', 'features', 'action', 'reward', 'done'):
+            setattr(self, name, None)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            CREATED.discard(self.shm.name)
+
+    # Producer side
+
+    def claim(self):
+        # Slot for the next transition, waiting while the consumer is a full ring behind
+        check_memory_order()
+        header = self.header
+        written = int(header[WRITTEN])
+        while written - int(header[READ]) >= self.capacity:
+            time.sleep(0)
+        self.slot = written % self.capacity
+        return self.slot
+
+    def publish(self):
+        # Hand the claimed slot to the consumer
+        self.header[WRITTEN] += 1
+        self.slot = None
+
+    def finish(self):
+        self.header[CLOSED] = 1
+
+    # Consumer side
+
+    def available(self):
+        return int(self.header[WRITTEN] - self.header[READ])
+
+    def peek(self, limit=None):
+        # First slot and count of the published transitions that can be read
+        # in place, stopping at the end of the buffer: planes[start:start + count]
+        # and so on. Call release(count) once done with them.
+        check_memory_order()
+        start = int(self.header[READ]) % self.capacity
+        count = min(self.available(), self.capacity - start)
+        if limit is not None:
+            count = min(count, limit)
+        return start, count
+
+    def release(self, count):
+        self.header[READ] += count
+
+
+def stream_games(ring_name, policy='autopilot', settings=(), seed=0, max_ticks=None,
+                 grid_count=DEFAULT_CONFIG.grid_count):
+    # Producer: play games back to back and write every tick into the ring
+    ring = TransitionRing.attach(ring_name)
+    config = DEFAULT_CONFIG.replace(grid_count=grid_count).with_settings(**dict(settings))
+    game = Simulation(config)
+    game.reset(seed)
+    controller = POLICIES[policy](game) if POLICIES[policy] is not None else None
+    ticks = 0
+    try:
+        while max_ticks is None or ticks < max_ticks:
+            planes, features = game.observe()
+            slot = ring.claim()
+            np.copyto(ring.planes[slot], planes)
+            np.copyto(ring.features[slot], features)
+            if controller is not None:
+                controller.steer()
+            score = game.snake.score
+            done = not game.step()
+            # The action is the heading the snake moved in (or would have moved in
+            # on ticks it had no movement due); planned moves queued further ahead
+            # aren't actions yet
+            ring.action[slot] = DIRECTIONS.index(game.snake.direction)
+            ring.reward[slot] = game.snake.score - score
+            ring.done[slot] = done
+            ring.publish()
+            ticks += 1
+            if done:
+                seed += 1
+                game.reset(seed)
+                if controller is not None:
+                    controller = POLICIES[policy](game)
+    finally:
+        ring.finish()
+        ring.close()
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream headless games through shared memory "
+                                                 "and measure how fast a consumer reads them.")
+    parser.add_argument('--producers', type=int, default=max(1, multiprocessing.cpu_count() - 1),
+                        help="producer processes, one ring each (default: all cores but one)")
+    parser.add_argument('--ticks', type=int, default=100000, help="ticks per producer")
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help="transitions per ring")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='autopilot')
+    parser.add_argument('--settings', type=parse_settings, default=(),
+                        help="'+'-joined settings to turn on, or off with name=0 (default: none)")
+    parser.add_argument('--grid-count', type=int, default=DEFAULT_CONFIG.grid_count)
+    args = parser.parse_args()
+
+    rings = [TransitionRing.create(args.capacity, args.grid_count) for _ in range(args.producers)]
+    workers = [multiprocessing.Process(target=stream_games,
+                                       args=(ring.name, args.policy, args.settings, seed, args.ticks,
+                                             args.grid_count))
+               for seed, ring in enumerate(rings)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+
+    # Consume in place: sum rewards and count finished games as a stand-in for
+    # a trainer's batch assembly
+    transitions = games = reward = 0
+    live = list(rings)
+    while live:
+        idle = True
+        for ring in list(live):
+            first, count = ring.peek()
+            if not count:
+                if ring.closed and not ring.available():
+                    live.remove(ring)
+                continue
+            idle = False
+            reward += int(ring.reward[first:first + count].sum())
+            games += int(ring.done[first:first + count].sum())
+            ring.release(count)
+            transitions += count
+        if idle:
+            time.sleep(0)
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+
+    slot_bytes = (ring_size(args.capacity, args.grid_count) - HEADER_SIZE) / args.capacity
+    print(f"{transitions:,} transitions from {args.producers} producers in {elapsed:.2f}s: "
+          f"{transitions / elapsed:,.0f}/s, {transitions * slot_bytes / elapsed / 1e6:,.0f} MB/s")
+    print(f"{games} games finished, total reward {reward}")
+    for ring in rings:
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
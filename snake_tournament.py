@@ -0,0 +1,149 @@
+"""Tournament runner: plays headless Snake Evolution games for AI policies across
+seeds and settings on a process pool and summarizes the results.
+
+Run `python snake_tournament.py --help` for options.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+import snake_core
+from snake_core import DEFAULT_CONFIG, SETTING_NAMES, Simulation
+from snake_ai import Autopilot, HamiltonianSolver
+
+# Steering policies by name; 'idle' never turns and serves as a baseline
+POLICIES = {
+    'idle': None,
+    'autopilot': Autopilot,
+    'hamiltonian': HamiltonianSolver,
+}
+
+# wrap_around is on by default, so its row turns it off
+DEFAULT_MATRIX = ['none', 'maze_mode', 'portal_mode', 'wrap_around=0', 'double_food']
+
+
+def parse_settings(spec):
+    # 'maze_mode+wrap_around=0' -> (('maze_mode', True), ('wrap_around', False));
+    # 'none' -> (). A bare name or name=1 turns a setting on, name=0 turns it off.
+    if spec == 'none':
+        return ()
+    settings = []
+    for item in spec.split('+'):
+        name, _, value = item.partition('=')
+        if name not in SETTING_NAMES:
+            raise argparse.ArgumentTypeError(f"unknown setting {name!r}")
+        if value not in ('', '0', '1'):
+            raise argparse.ArgumentTypeError(f"setting values are 0 or 1, not {value!r}")
+        settings.append((name, value != '0'))
+    return tuple(settings)
+
+
+def settings_label(settings):
+    # Inverse of parse_settings
+    return '+'.join(name if value else f"{name}=0" for name, value in settings) or 'none'
+
+
+def play_game(job):
+    # Worker: play one game to the end or the tick limit and report how it went
+    policy, settings, seed, max_ticks, speed_index, grid_count = job
+    config = DEFAULT_CONFIG.replace(grid_count=grid_count).with_settings(**dict(settings))
+    game = Simulation(config)
+    game.current_speed_index = speed_index
+    game.reset(seed)
+    controller = POLICIES[policy](game) if POLICIES[policy] is not None else None
+    while not game.game_over and game.ticks < max_ticks:
+        if controller is not None:
+            controller.steer()
+        game.step()
+
+    snake = game.snake
+    return {
+        'policy': policy,
+        'settings': settings_label(settings),
+        'seed': seed,
+        'score': snake.score,
+        'length': len(snake.positions),
+        'ticks': game.ticks,
+        'death': snake.death_cause if game.game_over else 'timeout',
+        'stage': snake.evolution_stage,
+    }
+
+
+class Summary:
+    # Running aggregate of game results per (policy, settings)
+    def __init__(self):
+        self.groups = {}
+        self.games = 0
+        self.ticks = 0
+
+    def add(self, result):
+        key = (result['policy'], result['settings'])
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {'games': 0, 'score': 0, 'best': 0, 'length': 0,
+                                        'ticks': 0, 'stage': 0, 'deaths': Counter()}
+        group['games'] += 1
+        group['score'] += result['score']
+        group['best'] = max(group['best'], result['score'])
+        group['length'] += result['length']
+        group['ticks'] += result['ticks']
+        group['stage'] = max(group['stage'], result['stage'])
+        group['deaths'][result['death']] += 1
+        self.games += 1
+        self.ticks += result['ticks']
+
+    def print(self, elapsed):
+        print(f"{'policy':>12} {'settings':>24} {'games':>6} {'score':>7} {'best':>5} "
+              f"{'length':>7} {'ticks':>8} {'stage':>5}  deaths")
+        for (policy, settings), group in sorted(self.groups.items()):
+            games = group['games']
+            deaths = ' '.join(f"{cause}:{count}" for cause, count in sorted(group['deaths'].items()))
+            print(f"{policy:>12} {settings:>24} {games:>6} {group['score'] / games:>7.1f} "
+                  f"{group['best']:>5} {group['length'] / games:>7.1f} {group['ticks'] / games:>8.0f} "
+                  f"{group['stage']:>5}  {deaths}")
+        print(f"{self.games} games, {self.ticks} ticks in {elapsed:.1f} s: "
+              f"{self.games / elapsed:.1f} games/s, {self.ticks / elapsed:.0f} ticks/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--policies', nargs='+', choices=sorted(POLICIES), default=['autopilot'])
+    parser.add_argument('--settings', nargs='+', type=parse_settings, default=None,
+                        metavar='SETTING[+SETTING...]',
+                        help=f"settings combinations to play, 'none' for defaults and "
+                             f"name=0 to turn a setting off (default: {' '.join(DEFAULT_MATRIX)})")
+    parser.add_argument('--games', type=int, default=20, help="games per policy and settings")
+    parser.add_argument('--seed', type=int, default=0, help="first game seed")
+    parser.add_argument('--max-ticks', type=int, default=20000)
+    parser.add_argument('--speed', type=int, choices=range(len(snake_core.SPEED_LEVELS)),
+                        default=snake_core.DEFAULT_SPEED_INDEX)
+    parser.add_argument('--grid-count', type=int, default=DEFAULT_CONFIG.grid_count,
+                        help="board width and height in cells")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--results', help="also write every game result to this JSON lines file")
+    args = parser.parse_args()
+    matrix = args.settings or [parse_settings(spec) for spec in DEFAULT_MATRIX]
+
+    jobs = [(policy, settings, args.seed + i, args.max_ticks, args.speed, args.grid_count)
+            for policy in args.policies for settings in matrix for i in range(args.games)]
+    summary = Summary()
+    results = open(args.results, 'w') if args.results else None
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            # Games vary a lot in length, so hand them out one at a time
+            for result in pool.imap_unordered(play_game, jobs):
+                summary.add(result)
+                if results is not None:
+                    results.write(json.dumps(result) + '\n')
+    finally:
+        if results is not None:
+            results.close()
+    summary.print(time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
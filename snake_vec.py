@@ -0,0 +1,373 @@
+"""Batched Snake Evolution environment: many independent games stored as stacked
+NumPy arrays and advanced in lockstep with one step(actions) call, for training
+agents at millions of steps per second."""
+import numpy as np
+
+from snake_core import (DEFAULT_CONFIG, DEFAULT_SPEED_INDEX, DIRECTIONS, FRUIT_NAMES, RIGHT,
+                        SPEED_LEVELS, SPEED_REDUCTION)
+
+# Death causes as stored in VectorEnv.death_cause
+ALIVE = 0
+EDGE = 1
+WALL = 2
+SELF = 3
+DEATH_CAUSES = (None, 'edge', 'wall', 'self')
+
+# Fruits that replace eaten ones, as in Food.add_food('apple')
+SPAWN_FRUITS = ('apple', 'banana', 'orange', 'berry', 'kiwi')
+DRAGON_ICE_CREAMS = 10  # Ice creams spawned on reaching the dragon stage
+
+SPAWN_TRIES = 8  # Random probes per game before scanning its free cells
+WALL_DENSITY = 0.05  # Fraction of the board covered by maze walls
+
+# Direction index arithmetic, in DIRECTIONS order
+DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int64)
+DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int64)
+OPPOSITE = np.array([DIRECTIONS.index((-dx, -dy)) for dx, dy in DIRECTIONS], dtype=np.int8)
+
+# Offsets of the 5x5 area around the head kept clear of new maze walls
+BUFFER_X, BUFFER_Y = (offsets.ravel() for offsets in np.mgrid[-2:3, -2:3])
+
+
+def fruit_code(name):
+    # Food grid value of a fruit; 0 is an empty cell
+    return FRUIT_NAMES.index(name) + 1
+
+
+class VectorEnv:
+    # `num_games` games in struct-of-arrays form. Boards are (games, cells) arrays
+    # indexed by x * grid_count + y like FreeCells, and each body is a ring buffer
+    # of cells with the head at head_slot. One step() is one simulation tick of
+    # every game, following Snake.update and Simulation.check_collisions: movement
+    # credit and fruit speed effects, wrap around or edge deaths, maze walls,
+    # growth, points from the config's fruit table and evolution stages.
+    #
+    # Differences from Simulation: randomness comes from one NumPy generator (so
+    # games don't match a seeded Simulation), each game keeps at most one pending
+    # turn, maze walls regenerate as scattered blocks with short spurs, and portal
+    # mode is not supported.
+    def __init__(self, num_games, config=None, seed=None, speed_index=DEFAULT_SPEED_INDEX,
+                 autoreset=True):
+        config = config if config is not None else DEFAULT_CONFIG
+        settings = config.settings
+        if settings['portal_mode']:
+            raise ValueError("portal mode is not supported by VectorEnv")
+        self.config = config
+        self.num_games = num_games
+        # Restart finished games at the end of their last step; without it they
+        # stay frozen as they ended until reset()
+        self.autoreset = autoreset
+        self.rng = np.random.default_rng(seed)
+        self.grid_count = grid_count = config.grid_count
+        self.cells = cells = grid_count * grid_count
+        self.capacity = 2 * cells  # Ring slots per body; ghost snakes may overlap themselves
+        self.wrap_around = settings['wrap_around']
+        self.ghost_mode = settings['ghost_mode']
+        self.infinite_length = settings['infinite_length']
+        self.double_food = settings['double_food']
+        self.maze_mode = settings['maze_mode']
+        self.reverse_controls = settings['reverse_controls']
+
+        # Movement credit earned per tick, indexed by 2 * kiwi boost + poisoned,
+        # rounded exactly like Snake.scheduled_moves
+        rate = SPEED_LEVELS[speed_index]
+        self.earned = np.array([round(rate * multiplier * speed * 100)
+                                for multiplier in (1.0, 2.0) for speed in (1, SPEED_REDUCTION)],
+                               dtype=np.int64)
+        self.move_cost = config.move_cost
+        self.boost_ticks = config.fps * 5  # Kiwi
+        self.poison_ticks = config.fps * 3
+        self.maze_ticks = config.fps * 15
+
+        # Per fruit code: points and growth from the fruit table
+        self.points = np.zeros(len(FRUIT_NAMES) + 1, dtype=np.int64)
+        self.growth_table = np.zeros(len(FRUIT_NAMES) + 1, dtype=np.int64)
+        for name in FRUIT_NAMES:
+            self.points[fruit_code(name)] = config.fruits[name]['points']
+            self.growth_table[fruit_code(name)] = config.fruits[name]['growth']
+        self.spawn_codes = np.array([fruit_code(name) for name in SPAWN_FRUITS], dtype=np.uint8)
+        self.thresholds = np.array(sorted(config.evolution_stages), dtype=np.int64)
+
+        # Boards
+        self.occupancy = np.zeros((num_games, cells), dtype=np.uint16)  # Body segments per cell
+        self.food = np.zeros((num_games, cells), dtype=np.uint8)  # Fruit code per cell
+        self.walls = np.zeros((num_games, cells), dtype=bool)
+        # Flat views for scattering with game * cells + cell indices
+        self.occupancy_flat = self.occupancy.reshape(-1)
+        self.food_flat = self.food.reshape(-1)
+        self.walls_flat = self.walls.reshape(-1)
+
+        # Snakes
+        self.body = np.zeros((num_games, self.capacity), dtype=np.int32)
+        self.head_slot = np.zeros(num_games, dtype=np.int64)
+        self.head_x = np.zeros(num_games, dtype=np.int64)
+        self.head_y = np.zeros(num_games, dtype=np.int64)
+        self.size = np.zeros(num_games, dtype=np.int64)  # Segments on the board
+        self.length = np.zeros(num_games, dtype=np.int64)  # Target length
+        self.growth = np.zeros(num_games, dtype=np.int64)  # Pending growth
+        self.direction = np.zeros(num_games, dtype=np.int8)  # Index into DIRECTIONS
+        self.pending = np.zeros(num_games, dtype=np.int8)  # Queued turn, -1 for none
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.stage = np.zeros(num_games, dtype=np.int64)
+        self.boost_timer = np.zeros(num_games, dtype=np.int64)
+        self.poison_timer = np.zeros(num_games, dtype=np.int64)
+        self.credit = np.zeros(num_games, dtype=np.int64)
+        self.food_count = np.zeros(num_games, dtype=np.int64)
+        self.maze_timer = np.zeros(num_games, dtype=np.int64)
+        self.ticks = np.zeros(num_games, dtype=np.int64)
+        self.finished = np.zeros(num_games, dtype=bool)  # Over and frozen until reset()
+
+        # Outcome of each game's last finished episode
+        self.death_cause = np.zeros(num_games, dtype=np.uint8)
+        self.final_score = np.zeros(num_games, dtype=np.int64)
+        self.final_length = np.zeros(num_games, dtype=np.int64)
+        self.final_stage = np.zeros(num_games, dtype=np.int64)
+        self.final_ticks = np.zeros(num_games, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, games=None):
+        # Start new episodes for the given game indices, or for every game
+        games = np.arange(self.num_games) if games is None else np.asarray(games, dtype=np.int64)
+        self.death_cause[games] = ALIVE
+        self.reset_games(games)
+
+    def reset_games(self, games):
+        # New games start like Simulation.reset: a one-cell snake in the middle
+        # heading right, then food, then the maze
+        if not len(games):
+            return
+        center = self.grid_count // 2
+        cell = center * self.grid_count + center
+        self.occupancy[games] = 0
+        self.food[games] = 0
+        self.walls[games] = False
+        self.body[games, 0] = cell
+        self.occupancy_flat[games * self.cells + cell] = 1
+        self.head_slot[games] = 0
+        self.head_x[games] = center
+        self.head_y[games] = center
+        self.size[games] = 1
+        self.length[games] = 1
+        self.direction[games] = DIRECTIONS.index(RIGHT)
+        self.pending[games] = -1
+        for state in (self.growth, self.score, self.stage, self.boost_timer, self.poison_timer,
+                      self.credit, self.food_count, self.ticks):
+            state[games] = 0
+        self.maze_timer[games] = self.maze_ticks
+        self.finished[games] = False
+        self.spawn_food(games)
+        if self.double_food:
+            self.spawn_food(games)
+        if self.maze_mode:
+            self.generate_walls(games)
+
+    def step(self, actions):
+        # Advance every game one tick. `actions` holds a DIRECTIONS index per game,
+        # or -1 to keep going; reversals are ignored. Returns the score change and
+        # whether the game ended for each game. Finished games that haven't been
+        # reset (autoreset off) don't change and report neither.
+        actions = np.asarray(actions, dtype=np.int8)
+        score_before = self.score.copy()
+        done = np.zeros(self.num_games, dtype=bool)
+        live = ~self.finished
+
+        # Queue turns, keeping the latest valid one until the snake next moves
+        if self.reverse_controls:
+            actions = np.where(actions >= 0, OPPOSITE[actions], actions)
+        direction = self.direction
+        turns = live & (actions >= 0) & (actions != direction) & (actions != OPPOSITE[direction])
+        self.pending[turns] = actions[turns]
+
+        # Timed fruit effects and movement credit (Snake.update_effects and
+        # Snake.scheduled_moves); frozen games earn nothing, so they never move
+        self.ticks += live
+        np.subtract(self.boost_timer, 1, out=self.boost_timer, where=live & (self.boost_timer > 0))
+        np.subtract(self.poison_timer, 1, out=self.poison_timer, where=live & (self.poison_timer > 0))
+        self.credit += self.earned[(self.boost_timer > 0) * 2 + (self.poison_timer > 0)] * live
+        moves = self.credit // self.move_cost
+        self.credit -= moves * self.move_cost
+
+        # Moving snakes take their queued turn first
+        turning = (moves > 0) & (self.pending >= 0)
+        direction[turning] = self.pending[turning]
+        self.pending[turning] = -1
+
+        for move in range(int(moves.max())):
+            games = np.flatnonzero(moves > move)
+            crashed = self.move(games)
+            if len(crashed):
+                moves[crashed] = 0
+                done[crashed] = True
+
+        # Maze regeneration in games still running
+        if self.maze_mode:
+            running = live & ~done
+            self.maze_timer[running] -= 1
+            expired = np.flatnonzero(running & (self.maze_timer <= 0))
+            if len(expired):
+                self.generate_walls(expired)
+                self.maze_timer[expired] = self.maze_ticks
+
+        rewards = self.score - score_before
+        finished = np.flatnonzero(done)
+        if len(finished):
+            self.final_score[finished] = self.score[finished]
+            self.final_length[finished] = self.size[finished]
+            self.final_stage[finished] = self.stage[finished]
+            self.final_ticks[finished] = self.ticks[finished]
+            if self.autoreset:
+                self.reset_games(finished)
+            else:
+                self.finished[finished] = True
+        return rewards, done
+
+    def move(self, games):
+        # Move the head of each given snake one cell (Snake.update), then handle
+        # what it ran into. Returns the games whose snake crashed.
+        grid_count = self.grid_count
+        direction = self.direction[games]
+        x = self.head_x[games] + DX[direction]
+        y = self.head_y[games] + DY[direction]
+        if self.wrap_around:
+            x %= grid_count
+            y %= grid_count
+            cause = np.zeros(len(games), dtype=np.uint8)
+        else:
+            off_board = (x < 0) | (x >= grid_count) | (y < 0) | (y >= grid_count)
+            cause = np.where(off_board, EDGE, ALIVE).astype(np.uint8)
+            np.clip(x, 0, grid_count - 1, out=x)
+            np.clip(y, 0, grid_count - 1, out=y)
+        cell = x * grid_count + y
+        flat = games * self.cells + cell
+        if self.maze_mode:
+            cause[(cause == ALIVE) & self.walls_flat[flat]] = WALL
+        if not self.ghost_mode:
+            # The tail hasn't moved out yet, so entering its cell is a crash too
+            cause[(cause == ALIVE) & (self.occupancy_flat[flat] > 0)] = SELF
+
+        hit = cause != ALIVE
+        crashed = games[hit]
+        if len(crashed):
+            self.death_cause[crashed] = cause[hit]
+            alive = ~hit
+            games, x, y, cell, flat = games[alive], x[alive], y[alive], cell[alive], flat[alive]
+
+        # Push the new head into the ring
+        slot = self.head_slot[games] + 1
+        slot[slot == self.capacity] = 0
+        self.head_slot[games] = slot
+        self.body[games, slot] = cell
+        self.occupancy_flat[flat] += 1
+        self.head_x[games] = x
+        self.head_y[games] = y
+        size = self.size[games] + 1
+
+        # Drop the tail once the snake is longer than its length allows
+        limit = 3 if self.infinite_length else self.length[games]
+        over = size > limit
+        if over.any():
+            trimmed = games[over]
+            tail_slot = (slot[over] - size[over] + 1) % self.capacity
+            tail = self.body[trimmed, tail_slot]
+            self.occupancy_flat[trimmed * self.cells + tail] -= 1
+            size[over] -= 1
+        self.size[games] = size
+        growing = games[self.growth[games] > 0]
+        if len(growing):
+            self.length[growing] = np.minimum(self.length[growing] + 1, self.capacity)
+            self.growth[growing] -= 1
+
+        # Eat whatever fruit is under the new head
+        fruit = self.food_flat[flat]
+        eating = fruit > 0
+        if eating.any():
+            self.eat(games[eating], flat[eating], fruit[eating])
+        return crashed
+
+    def eat(self, games, flat, fruit):
+        # Fruit effects, evolution and respawning (Simulation.check_collisions)
+        self.food_flat[flat] = 0
+        self.food_count[games] -= 1
+        score_before = self.score[games]
+        score = np.maximum(score_before + self.points[fruit], 0)
+        self.score[games] = score
+        self.growth[games] += self.growth_table[fruit]
+        self.boost_timer[games[fruit == fruit_code('kiwi')]] = self.boost_ticks
+        self.poison_timer[games[fruit == fruit_code('poison')]] = self.poison_ticks
+
+        # Evolve when the score crosses a stage threshold
+        changed = score != score_before
+        if changed.any():
+            scored = games[changed]
+            stage = self.thresholds[np.searchsorted(self.thresholds, score[changed], 'right') - 1]
+            evolved = stage != self.stage[scored]
+            self.stage[scored] = stage
+            dragons = scored[evolved & (stage == self.config.dragon_stage)]
+            for _ in range(DRAGON_ICE_CREAMS if len(dragons) else 0):
+                self.spawn_food(dragons, fruit_code('ice_cream'))
+
+        # Keep at least one fruit on the board, two with double food
+        self.spawn_food(games[self.food_count[games] == 0])
+        if self.double_food:
+            self.spawn_food(games[self.food_count[games] < 2])
+
+    def spawn_food(self, games, code=None):
+        # Put one fruit in a uniformly random free cell of each given game (which
+        # must be distinct); without a code each game draws one of SPAWN_FRUITS.
+        # Games with a full board get nothing, like Food.add_food.
+        if not len(games):
+            return
+        if code is None:
+            codes = self.spawn_codes[self.rng.integers(len(self.spawn_codes), size=len(games))]
+        else:
+            codes = np.full(len(games), code, dtype=np.uint8)
+        # Probing random cells is uniform over the free ones and rarely misses
+        # more than a few times until the board is nearly full
+        for _ in range(SPAWN_TRIES):
+            flat = games * self.cells + self.rng.integers(self.cells, size=len(games))
+            free = (self.occupancy_flat[flat] == 0) & (self.food_flat[flat] == 0) & ~self.walls_flat[flat]
+            self.food_flat[flat[free]] = codes[free]
+            self.food_count[games[free]] += 1
+            games = games[~free]
+            codes = codes[~free]
+            if not len(games):
+                return
+        for game, code in zip(games, codes):
+            free = np.flatnonzero((self.occupancy[game] == 0) & (self.food[game] == 0) & ~self.walls[game])
+            if len(free):
+                self.food[game, free[self.rng.integers(len(free))]] = code
+                self.food_count[game] += 1
+
+    def generate_walls(self, games):
+        # Replace the maze walls of the given games: scattered blocks on 5% of the
+        # board plus spurs off half of them, kept off the snakes, the food and the
+        # area around each head (Simulation.generate_maze)
+        grid_count = self.grid_count
+        count = int(self.cells * WALL_DENSITY)
+        self.walls[games] = False
+        if not count:
+            return
+        rows = np.arange(len(games))[:, None]
+        # Random keys for every cell; forbidden cells get keys above 1
+        keys = self.rng.random((len(games), self.cells))
+        keys[(self.occupancy[games] > 0) | (self.food[games] > 0)] = 2.0
+        near_x = (self.head_x[games, None] + BUFFER_X) % grid_count
+        near_y = (self.head_y[games, None] + BUFFER_Y) % grid_count
+        keys[rows, near_x * grid_count + near_y] = 2.0
+
+        # The `count` lowest keys that are allowed become walls
+        blocks = np.argpartition(keys, count - 1, axis=1)[:, :count]
+        placed = keys[rows, blocks] < 1.0
+        offsets = games[:, None] * self.cells
+        self.walls_flat[(offsets + blocks)[placed]] = True
+
+        # Extend random blocks by one cell in a random direction
+        spurs = blocks[rows, self.rng.integers(count, size=(len(games), count // 2 or 1))]
+        valid = keys[rows, spurs] < 1.0
+        direction = self.rng.integers(len(DIRECTIONS), size=spurs.shape)
+        x = (spurs // grid_count + DX[direction]) % grid_count
+        y = (spurs % grid_count + DY[direction]) % grid_count
+        neighbor = x * grid_count + y
+        valid &= keys[rows, neighbor] < 1.0
+        self.walls_flat[(offsets + neighbor)[valid]] = True